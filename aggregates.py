@@ -0,0 +1,136 @@
+"""
+Agregados de ventas mantenidos de forma incremental.
+
+En lugar de recorrer todo el historial cada vez que se abre un reporte,
+SalesAggregates se actualiza con cada venta registrada y los reportes
+leen directamente los totales ya calculados.
+"""
+
+import math
+
+
+class SalesAggregates:
+    """
+    Totales acumulados del historial de ventas.
+
+    - brand_stats: marca -> {'total_quantity', 'total_net'}
+    - gross_income / net_income / total_discounts: totales globales
+    - sold_by_product: id de producto -> unidades vendidas
+    - sales_count: número de ventas registradas
+    """
+
+    def __init__(self):
+        self.brand_stats = {}
+        self.gross_income = 0.0
+        self.net_income = 0.0
+        self.total_discounts = 0.0
+        self.sold_by_product = {}
+        self.sales_count = 0
+
+    @classmethod
+    def from_sales(cls, sales):
+        """
+        Recalcular todos los agregados desde cero recorriendo las ventas.
+        """
+        aggregates = cls()
+        for sale in sales:
+            aggregates.add(sale)
+        return aggregates
+
+    def add(self, sale):
+        """
+        Actualizar los agregados con una venta nueva (models.Sale o
+        ledger.SaleRow).
+        """
+        brand = sale.brand
+        if brand not in self.brand_stats:
+            self.brand_stats[brand] = {
+                "total_quantity": 0,
+                "total_net": 0.0,
+            }
+        self.brand_stats[brand]["total_quantity"] += sale.quantity
+        self.brand_stats[brand]["total_net"] += sale.net_amount
+
+        self.gross_income += sale.gross_amount
+        self.net_income += sale.net_amount
+        self.total_discounts += sale.discount_amount
+
+        product_id = sale.product_id
+        self.sold_by_product[product_id] = (
+            self.sold_by_product.get(product_id, 0) + sale.quantity
+        )
+        self.sales_count += 1
+
+    def merge(self, other):
+        """
+        Sumar a estos agregados los de otro conjunto de ventas
+        (por ejemplo, los de un intervalo de tiempo de rollups.py).
+        """
+        for brand, stats in other.brand_stats.items():
+            mine = self.brand_stats.get(brand)
+            if mine is None:
+                self.brand_stats[brand] = dict(stats)
+            else:
+                mine["total_quantity"] += stats["total_quantity"]
+                mine["total_net"] += stats["total_net"]
+
+        self.gross_income += other.gross_income
+        self.net_income += other.net_income
+        self.total_discounts += other.total_discounts
+
+        for product_id, quantity in other.sold_by_product.items():
+            self.sold_by_product[product_id] = (
+                self.sold_by_product.get(product_id, 0) + quantity
+            )
+        self.sales_count += other.sales_count
+
+    def income(self):
+        """
+        Devolver 'gross_income', 'total_discounts' y 'net_income'.
+        """
+        return {
+            "gross_income": self.gross_income,
+            "total_discounts": self.gross_income - self.net_income,
+            "net_income": self.net_income,
+        }
+
+    def differences(self, other):
+        """
+        Comparar con otros agregados y devolver una lista de textos
+        describiendo cada diferencia (lista vacía si coinciden).
+        """
+        problems = []
+
+        for name in ("gross_income", "net_income", "total_discounts"):
+            mine = getattr(self, name)
+            theirs = getattr(other, name)
+            if not _close(mine, theirs):
+                problems.append(f"{name}: {mine:.2f} != {theirs:.2f}")
+
+        if self.sales_count != other.sales_count:
+            problems.append(
+                f"sales_count: {self.sales_count} != {other.sales_count}"
+            )
+
+        for brand in self.brand_stats.keys() | other.brand_stats.keys():
+            mine = self.brand_stats.get(brand)
+            theirs = other.brand_stats.get(brand)
+            if (
+                mine is None
+                or theirs is None
+                or mine["total_quantity"] != theirs["total_quantity"]
+                or not _close(mine["total_net"], theirs["total_net"])
+            ):
+                problems.append(f"brand '{brand}': {mine} != {theirs}")
+
+        if self.sold_by_product != other.sold_by_product:
+            problems.append("sold_by_product does not match")
+
+        return problems
+
+
+def _close(a, b):
+    """
+    Comparar dos importes tolerando errores de redondeo.
+    """
+    return math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-6)
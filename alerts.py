@@ -0,0 +1,65 @@
+"""
+Alertas de stock bajo.
+
+Cada producto tiene un punto de pedido (reorder_point, por defecto
+models.DEFAULT_REORDER_POINT): cuando su stock llega a ese valor o baja
+de él hay que reponerlo. El inventario (store.Inventory y
+sqlite_store.SQLiteInventory) avisa a sus listeners con on_low_stock
+en el momento en que una venta o una modificación cruza ese umbral, sin
+recorrer el catálogo; la lista completa de productos en stock bajo se
+pide con inventory.below_reorder_point().
+
+LowStockAlerts es el listener que guarda las últimas alertas (para el
+servicio HTTP) y, si se pide, las muestra en la consola.
+"""
+
+import threading
+from collections import deque
+
+from models import sale_time
+
+# Alertas recientes que se conservan
+RECENT_ALERTS = 100
+
+
+def format_alert(alert):
+    """
+    Devolver la línea con la que se muestra una alerta.
+    """
+    return (
+        f"[ALERT] Low stock: {alert['name']} (ID {alert['product_id']}) | "
+        f"Stock: {alert['stock']} | "
+        f"Reorder point: {alert['reorder_point']}"
+    )
+
+
+class LowStockAlerts:
+    """
+    Listener del inventario que anota cada alerta de stock bajo.
+
+    - echo: mostrar cada alerta en la consola al producirse
+    - recent(): las últimas alertas (las más nuevas al final), como
+      diccionarios con product_id, name, stock, reorder_point y date
+    """
+
+    def __init__(self, echo=False, limit=RECENT_ALERTS):
+        self.echo = echo
+        self._alerts = deque(maxlen=limit)
+        self._lock = threading.Lock()
+
+    def on_low_stock(self, product):
+        alert = {
+            "product_id": product.id,
+            "name": product.name,
+            "stock": product.stock,
+            "reorder_point": product.reorder_point,
+            "date": sale_time()[0],
+        }
+        with self._lock:
+            self._alerts.append(alert)
+        if self.echo:
+            print(format_alert(alert))
+
+    def recent(self):
+        with self._lock:
+            return list(self._alerts)
@@ -0,0 +1,1192 @@
+"""
+Benchmarks de las operaciones críticas del sistema.
+
+Para ejecutarlos:
+    python benchmarks.py ids
+    python benchmarks.py ids --sizes 10000 100000 1000000
+    python benchmarks.py memory --size 100000
+    python benchmarks.py snapshot --size 1000000
+    python benchmarks.py batch --orders 100000
+    python benchmarks.py concurrency --threads 16 --orders 200000
+    python benchmarks.py parallel --size 10000000 --workers 1 2 4 8
+    python benchmarks.py rollups --size 1000000
+    python benchmarks.py search --size 1000000
+    python benchmarks.py velocity --products 1000000 --sold 500000
+    python benchmarks.py records --size 100000
+    python benchmarks.py pricing --rules 100 1000 5000
+
+Suite de rutas críticas (latencias, throughput y memoria; JSON para
+comparar entre ejecuciones):
+    python benchmarks.py suite --products 10000 --sales 100000
+    python benchmarks.py suite --json base.json
+    python benchmarks.py suite --compare base.json
+"""
+
+import argparse
+import contextlib
+import json
+import math
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+
+import conceptos_csv
+import pricing
+import reports
+import velocity
+from binary_snapshot import (
+    MappedInventory,
+    load_inventory,
+    write_inventory_snapshot,
+)
+import reports_parallel
+from aggregates import SalesAggregates
+from ledger import SalesLedger
+from models import (
+    CUSTOMER_DISCOUNTS,
+    Product,
+    Sale,
+    create_initial_inventory,
+    create_sale_record,
+)
+from rollups import period_bounds
+from inventory import find_product_by_id
+from sales import (
+    complete_order,
+    complete_sale,
+    get_next_sale_id,
+    process_sales,
+)
+from search import ProductSearchIndex
+from store import Inventory, SalesHistory
+
+
+def bench_sale_ids(sizes):
+    """
+    Insertar N ventas seguidas (ID + registro + append) para cada N.
+
+    Si la asignación de IDs es O(1), el tiempo por venta debe
+    mantenerse estable al crecer N (crecimiento lineal del total).
+    """
+    product = create_initial_inventory()[0]
+    print("Sales inserted | Total time (s) | Per sale (us)")
+
+    for size in sizes:
+        sales_history = SalesHistory()
+        start = time.perf_counter()
+        for _ in range(size):
+            sale = create_sale_record(
+                sale_id=get_next_sale_id(sales_history),
+                customer_name="Bench",
+                customer_type="regular",
+                product=product,
+                quantity=1,
+                discount_rate=0.0,
+            )
+            sales_history.append(sale)
+        elapsed = time.perf_counter() - start
+        print(
+            f"{size:>14} | {elapsed:>14.3f} | "
+            f"{elapsed / size * 1_000_000:>13.2f}"
+        )
+
+
+def generate_sales(count, inventory=None, seed=0):
+    """
+    Generar ventas sintéticas (models.Sale de create_sale_record)
+    repartidas entre los productos del inventario.
+    """
+    rng = random.Random(seed)
+    products = list(inventory or create_initial_inventory())
+    customer_types = list(CUSTOMER_DISCOUNTS)
+
+    for sale_id in range(1, count + 1):
+        customer_type = rng.choice(customer_types)
+        yield create_sale_record(
+            sale_id=sale_id,
+            customer_name=f"Customer {rng.randrange(1000)}",
+            customer_type=customer_type,
+            product=rng.choice(products),
+            quantity=rng.randint(1, 5),
+            discount_rate=CUSTOMER_DISCOUNTS[customer_type],
+        )
+
+
+def measure_memory(build):
+    """
+    Ejecutar build() y devolver los bytes que quedan reservados
+    por el resultado (según tracemalloc).
+    """
+    tracemalloc.start()
+    result = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current
+
+
+def bench_ledger_memory(size):
+    """
+    Comparar la memoria de N ventas como lista de diccionarios
+    frente al libro columnar (ledger.SalesLedger).
+    """
+    sales = list(generate_sales(size))
+
+    def build_dicts():
+        # Copias independientes, como las guardaba la lista original
+        return [dict(sale) for sale in sales]
+
+    def build_ledger():
+        ledger = SalesLedger()
+        for sale in sales:
+            ledger.append(sale)
+        return ledger
+
+    dict_bytes = measure_memory(build_dicts)
+    ledger_bytes = measure_memory(build_ledger)
+
+    print(f"Sales: {size}")
+    print(
+        f"List of dicts: {dict_bytes / 1_048_576:8.2f} MiB "
+        f"({dict_bytes / size:6.1f} bytes/sale)"
+    )
+    print(
+        f"Columnar:      {ledger_bytes / 1_048_576:8.2f} MiB "
+        f"({ledger_bytes / size:6.1f} bytes/sale)"
+    )
+    print(f"Ratio:         {dict_bytes / ledger_bytes:8.2f}x")
+
+
+def generate_products(count, brands=50, categories=20, seed=0):
+    """
+    Generar un catálogo sintético de 'count' productos (models.Product).
+    """
+    rng = random.Random(seed)
+    for product_id in range(1, count + 1):
+        yield Product(
+            id=product_id,
+            name=f"Product {product_id}",
+            brand=f"Brand {rng.randrange(brands)}",
+            category=f"Category {rng.randrange(categories)}",
+            unit_price=round(rng.uniform(5, 2000), 2),
+            stock=rng.randint(0, 500),
+            warranty_months=rng.choice((0, 6, 12, 24)),
+            total_sold=0,
+        )
+
+
+def bench_snapshot(size):
+    """
+    Medir el arranque desde un snapshot binario de N productos:
+    abrirlo con mmap y consultar en su sitio, frente a cargarlo entero.
+    """
+    inventory = Inventory(generate_products(size))
+    path = os.path.join(tempfile.mkdtemp(), "inventory.snap")
+
+    start = time.perf_counter()
+    write_inventory_snapshot(path, inventory)
+    write_time = time.perf_counter() - start
+    del inventory
+
+    start = time.perf_counter()
+    snapshot = MappedInventory(path)
+    open_time = time.perf_counter() - start
+
+    rng = random.Random(1)
+    lookups = 10_000
+    start = time.perf_counter()
+    for _ in range(lookups):
+        snapshot.get(rng.randint(1, size))
+    lookup_time = time.perf_counter() - start
+    snapshot.close()
+
+    start = time.perf_counter()
+    load_inventory(path)
+    load_time = time.perf_counter() - start
+
+    file_mib = os.path.getsize(path) / 1_048_576
+    print(f"Products: {size} | File: {file_mib:.1f} MiB")
+    print(f"Write snapshot:        {write_time * 1000:10.1f} ms")
+    print(f"Open with mmap:        {open_time * 1000:10.3f} ms")
+    print(f"Lookup by ID (mapped): {lookup_time / lookups * 1e6:10.2f} us")
+    print(f"Full load + indexes:   {load_time * 1000:10.1f} ms")
+    os.remove(path)
+
+
+def generate_orders(count, product_count, seed=0, multi_line=0.0):
+    """
+    Generar pedidos sintéticos para sales.process_sales.
+
+    - multi_line: fracción de pedidos de varias líneas (con 'lines',
+      de 2 a 4 líneas que pueden repetir producto)
+    """
+    rng = random.Random(seed)
+    customer_types = list(CUSTOMER_DISCOUNTS)
+    for _ in range(count):
+        order = {
+            "customer_name": f"Customer {rng.randrange(1000)}",
+            "customer_type": rng.choice(customer_types),
+        }
+        if rng.random() < multi_line:
+            order["lines"] = [
+                {
+                    "product_id": rng.randint(1, product_count),
+                    "quantity": rng.randint(1, 5),
+                }
+                for _ in range(rng.randint(2, 4))
+            ]
+        else:
+            order["product_id"] = rng.randint(1, product_count)
+            order["quantity"] = rng.randint(1, 5)
+        yield order
+
+
+def bench_batch_sales(order_count, product_count, batch_size):
+    """
+    Medir el throughput (ventas por segundo) de sales.process_sales.
+    """
+    inventory = Inventory(generate_products(product_count))
+    for product in inventory:
+        # Stock suficiente para que casi todos los pedidos se acepten
+        product.stock = order_count
+    sales_history = SalesHistory()
+    orders = list(generate_orders(order_count, product_count))
+
+    accepted = 0
+    start = time.perf_counter()
+    for offset in range(0, order_count, batch_size):
+        results = process_sales(
+            inventory, sales_history, orders[offset:offset + batch_size]
+        )
+        accepted += sum(1 for result in results if result["ok"])
+    elapsed = time.perf_counter() - start
+
+    print(f"Orders: {order_count} | Products: {product_count}")
+    print(f"Accepted: {accepted} | Time: {elapsed:.3f} s")
+    print(f"Throughput: {order_count / elapsed:,.0f} sales/second")
+
+
+def stress_concurrent_sales(thread_count, order_count, product_count, stock):
+    """
+    Prueba de estrés: muchos hilos registrando ventas a la vez sobre
+    pocos productos con poco stock (process_sales de a un pedido; uno
+    de cada cinco, de varias líneas).
+
+    Comprueba que:
+    - el stock nunca queda negativo (no hay sobreventa);
+    - stock inicial = stock final + unidades vendidas, por producto;
+    - las unidades del historial coinciden con total_sold;
+    - cada pedido aceptado tiene todas sus líneas en el historial y
+      los rechazados lo son por falta de stock;
+    - los IDs de venta no se repiten;
+    - los agregados de reportes coinciden con las ventas.
+
+    Devuelve la lista de problemas encontrados (vacía si todo cuadra);
+    'benchmarks.py concurrency' termina con código 1 si hay alguno.
+    """
+    inventory = Inventory(generate_products(product_count))
+    for product in inventory:
+        product.stock = stock
+    sales_history = SalesHistory()
+    orders = list(generate_orders(order_count, product_count, multi_line=0.2))
+
+    # Cambiar de hilo muy a menudo para provocar intercalados
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=thread_count) as pool:
+            results = list(
+                pool.map(
+                    lambda order: process_sales(
+                        inventory, sales_history, [order]
+                    )[0],
+                    orders,
+                    chunksize=64,
+                )
+            )
+    finally:
+        sys.setswitchinterval(switch_interval)
+    elapsed = time.perf_counter() - start
+
+    problems = []
+    sold = sales_history.sold_by_product()
+    for product in inventory:
+        if product.stock < 0:
+            problems.append(
+                f"product {product.id}: negative stock {product.stock}"
+            )
+        if product.stock + product.total_sold != stock:
+            problems.append(f"product {product.id}: units do not add up")
+        if sold.get(product.id, 0) != product.total_sold:
+            problems.append(
+                f"product {product.id}: history and total_sold differ"
+            )
+
+    sale_ids = [sale.id for sale in sales_history]
+    if len(set(sale_ids)) != len(sale_ids):
+        problems.append("duplicate sale IDs")
+    problems.extend(sales_history.check_aggregates())
+
+    lines = 0
+    for order, result in zip(orders, results):
+        if result["ok"]:
+            lines += len(order.get("lines", [order]))
+        elif "Not enough stock" not in result["error"]:
+            problems.append(f"unexpected rejection: {result['error']}")
+    if lines != len(sales_history):
+        problems.append(
+            f"{lines} accepted lines but {len(sales_history)} sales"
+        )
+
+    accepted = sum(1 for result in results if result["ok"])
+    print(
+        f"Threads: {thread_count} | Orders: {order_count} | "
+        f"Products: {product_count} x {stock} units"
+    )
+    print(
+        f"Accepted: {accepted} | Rejected: {order_count - accepted} | "
+        f"Time: {elapsed:.3f} s"
+    )
+    if problems:
+        print(f"FAILED: {len(problems)} problems")
+        for problem in problems[:10]:
+            print(f"  {problem}")
+    else:
+        print("OK: no overselling, stock and history are consistent")
+    return problems
+
+
+def build_large_ledger(size, block=100_000):
+    """
+    Construir un libro de 'size' ventas repitiendo un bloque de ventas
+    sintéticas (mucho más rápido que registrar cada venta). Los IDs se
+    renumeran para que sigan siendo únicos.
+    """
+    ledger = SalesLedger()
+    for sale in generate_sales(min(size, block)):
+        ledger.append(sale)
+
+    repeats, rest = divmod(size, len(ledger))
+    for name, column in ledger.columns.items():
+        ledger.columns[name] = column * repeats + column[:rest]
+    ledger.columns["id"] = array("q", range(1, size + 1))
+    return ledger
+
+
+def bench_parallel_reports(size, worker_counts):
+    """
+    Medir el cálculo de ventas por marca + ingresos (reports_parallel)
+    sobre N ventas con distinto número de procesos.
+    """
+    print(f"Building ledger with {size} sales...")
+    ledger = build_large_ledger(size)
+    print(f"CPU cores available: {os.cpu_count()}")
+    print("Workers | Time (s) | Speedup | Sales/second")
+
+    baseline = None
+    reference = None
+    for workers in worker_counts:
+        # La primera llamada con cada número de procesos arranca el pool
+        # (después se reutiliza): no se mide
+        reports_parallel.ledger_totals(ledger, workers)
+        start = time.perf_counter()
+        totals = reports_parallel.ledger_totals(ledger, workers)
+        elapsed = time.perf_counter() - start
+
+        if reference is None:
+            baseline, reference = elapsed, totals
+        elif totals[0].keys() != reference[0].keys() or not math.isclose(
+            totals[2], reference[2]
+        ):
+            print(f"  WARNING: results with {workers} workers differ")
+        print(
+            f"{workers:>7} | {elapsed:>8.3f} | {baseline / elapsed:>6.2f}x"
+            f" | {size / elapsed:>12,.0f}"
+        )
+
+
+def bench_rollups(size, days=365):
+    """
+    Comparar consultas por periodo (rollups.SalesRollups) con
+    recorrer el historial, para N ventas repartidas en 'days' días
+    que terminan ahora.
+    """
+    now = time.time()
+    step = days * 86400 / size
+    sales_history = SalesHistory()
+    start = time.perf_counter()
+    for index, sale in enumerate(generate_sales(size)):
+        sale.timestamp = now - (size - index) * step
+        sales_history.append(sale)
+    print(
+        f"Inserted {size} sales over {days} days "
+        f"in {time.perf_counter() - start:.2f} s"
+    )
+
+    timestamps = sales_history.ledger.columns["timestamp"]
+    print("Period     | Sales     | Rollups (ms) | Scan (ms)")
+    for period in ("today", "this_week", "last_month", "this_year"):
+        first, last = period_bounds(period)
+
+        start = time.perf_counter()
+        totals = sales_history.rollups.between(first, last)
+        rollup_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        scanned = SalesAggregates()
+        for position, timestamp in enumerate(timestamps):
+            if first <= timestamp < last:
+                scanned.add(sales_history[position])
+        scan_time = time.perf_counter() - start
+
+        if totals.differences(scanned):
+            print(f"  WARNING: {period} rollups differ from the scan")
+        print(
+            f"{period:<10} | {totals.sales_count:>9} | "
+            f"{rollup_time * 1000:>12.3f} | {scan_time * 1000:>9.1f}"
+        )
+
+
+# Palabras para generar nombres de producto con aspecto real
+_NAME_ADJECTIVES = (
+    "Smart", "Wireless", "Portable", "Ultra", "Pro", "Mini", "Gaming",
+    "Digital", "Compact", "Premium", "Classic", "Slim",
+)
+_NAME_NOUNS = (
+    "Phone", "Smartphone", "Headphones", "Laptop", "Tablet", "Monitor",
+    "Keyboard", "Speaker", "Camera", "Watch", "Router", "Charger",
+    "Microphone", "Projector", "Printer", "TV",
+)
+
+
+def generate_named_products(count, seed=0):
+    """
+    Catálogo sintético como generate_products, con nombres de la forma
+    "<adjetivo> <nombre> <modelo>" (por ejemplo "Smart TV X12").
+    """
+    rng = random.Random(seed)
+    for product in generate_products(count, seed=seed):
+        product.name = (
+            f"{rng.choice(_NAME_ADJECTIVES)} {rng.choice(_NAME_NOUNS)} "
+            f"{rng.choice('ABCDEFGHKMRSTXZ')}{rng.randrange(1, 100_000)}"
+        )
+        yield product
+
+
+def bench_search(size, repeats=200):
+    """
+    Medir la búsqueda de productos (search.ProductSearchIndex) en un
+    catálogo de N productos, comparada con recorrer el catálogo.
+    """
+    products = list(generate_named_products(size))
+
+    start = time.perf_counter()
+    index = ProductSearchIndex(products)
+    print(
+        f"Indexed {size} products in {time.perf_counter() - start:.2f} s"
+    )
+
+    rare = products[size // 2].name.split()[-1]
+    queries = ("phone", "head", "aptop", "smart x12", rare, "zzzz")
+    print("Query        | Results | Index (us) | Scan (ms)")
+    for query in queries:
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            results = index.search(query)
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+
+        # Referencia: primeras 20 coincidencias por subcadena,
+        # recorriendo el catálogo
+        terms = query.lower().split()
+        start = time.perf_counter()
+        scanned = []
+        for product in products:
+            text = " ".join(
+                (product.name, product.brand, product.category)
+            ).lower()
+            if all(term in text for term in terms):
+                scanned.append(product)
+                if len(scanned) == 20:
+                    break
+        scan_time = time.perf_counter() - start
+
+        print(
+            f"{query:<12} | {len(results):>7} | "
+            f"{timings[len(timings) // 2] * 1e6:>10.1f} | "
+            f"{scan_time * 1000:>9.1f}"
+        )
+
+    # Mantenimiento del índice: alta, cambio de nombre y baja
+    product = products[0].copy()
+    product.id = size + 1
+    start = time.perf_counter()
+    for _ in range(repeats):
+        index.add(product)
+        product.name = product.name + " Plus"
+        index.update(product)
+        index.remove(product.id)
+        product.name = products[0].name
+    elapsed = (time.perf_counter() - start) / repeats
+    print(f"Add + rename + remove: {elapsed * 1e6:.1f} us")
+
+    # Una venta solo cambia el stock: el índice no se modifica
+    product = products[1]
+    start = time.perf_counter()
+    for _ in range(repeats):
+        product.stock -= 1
+        index.update(product)
+    elapsed = (time.perf_counter() - start) / repeats
+    print(f"Stock-only update:     {elapsed * 1e6:.1f} us")
+
+
+def bench_velocity(product_count, sold_count, days=30, k=20, repeats=5):
+    """
+    Medir la proyección de días de cobertura (velocity.forecast y
+    reports.compute_stock_cover) en un catálogo de N productos, de los
+    que 'sold_count' tienen ventas en los últimos 'days' días.
+    """
+    rng = random.Random(0)
+    inventory = Inventory(generate_products(product_count))
+    now = time.time()
+
+    # Velocidades sintéticas: unas pocas ventas por producto vendido,
+    # sin pasar por el historial (mucho más rápido que registrarlas)
+    start = time.perf_counter()
+    state = velocity.SalesVelocity()
+    sold_ids = rng.sample(range(1, product_count + 1), sold_count)
+    for product_id in sold_ids:
+        for _ in range(rng.randint(1, 3)):
+            state.add(
+                product_id,
+                rng.randint(1, 5),
+                now - rng.uniform(0, days * velocity.DAY),
+            )
+    sales_history = SalesHistory()
+    sales_history.velocity = state
+    print(
+        f"Built {product_count} products, {sold_count} with sales, "
+        f"in {time.perf_counter() - start:.2f} s"
+    )
+
+    product_ids, stocks = inventory.stock_levels()
+    cases = (
+        (
+            "forecast",
+            lambda: velocity.forecast(state, product_ids, stocks, now),
+        ),
+        (
+            "compute_stock_cover",
+            lambda: reports.compute_stock_cover(
+                inventory, sales_history, k, now
+            ),
+        ),
+    )
+    print("Step                | Best (s) | Median (s)")
+    for name, run in cases:
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+        print(
+            f"{name:<19} | {timings[0]:>8.3f} | "
+            f"{timings[len(timings) // 2]:>10.3f}"
+        )
+
+
+def generate_pricing_rules(count, brands=50, categories=20, seed=0):
+    """
+    Generar 'count' reglas de descuento sintéticas (pricing.py): por
+    tipo de cliente, marca, categoría, bandas de cantidad y campañas
+    con fechas alrededor de ahora, con nombres de marca y categoría
+    como los de generate_products.
+    """
+    rng = random.Random(seed)
+    customer_types = list(CUSTOMER_DISCOUNTS)
+    now = time.time()
+    for index in range(count):
+        rule = {
+            "name": f"Rule {index}",
+            "discount": round(rng.uniform(0.01, 0.20), 3),
+        }
+        if rng.random() < 0.3:
+            rule["customer_type"] = rng.choice(customer_types)
+        if rng.random() < 0.5:
+            rule["brand"] = f"Brand {rng.randrange(brands)}"
+        if rng.random() < 0.4:
+            rule["category"] = f"Category {rng.randrange(categories)}"
+        if rng.random() < 0.4:
+            rule["min_quantity"] = rng.randint(2, 20)
+        if rng.random() < 0.2:
+            rule["max_quantity"] = (
+                rule.get("min_quantity", 1) + rng.randint(0, 30)
+            )
+        if rng.random() < 0.2:
+            rule["start"] = now - rng.uniform(0, 10 * 86400)
+            rule["end"] = rule["start"] + rng.uniform(3600, 20 * 86400)
+        if rng.random() < 0.1:
+            rule["stackable"] = True
+            rule["discount"] = round(rule["discount"] / 10, 4)
+        yield rule
+
+
+def bench_pricing(rule_counts, evaluations=100_000, checks=2_000):
+    """
+    Medir el motor de reglas de descuento (pricing.PricingEngine) con
+    N reglas activas: tiempo de compilación y evaluaciones por segundo,
+    comparado con recorrer todas las reglas en cada venta. También
+    comprueba que ambos den el mismo descuento.
+    """
+    rng = random.Random(0)
+    products = list(generate_products(1_000))
+    customer_types = list(CUSTOMER_DISCOUNTS)
+    now = time.time()
+    lines = [
+        (
+            rng.choice(customer_types),
+            rng.choice(products),
+            rng.randint(1, 40),
+            now + rng.uniform(-5 * 86400, 15 * 86400),
+        )
+        for _ in range(evaluations)
+    ]
+
+    print(
+        "Rules | Compile (ms) | Evals/s (engine) | Rules/s (engine) "
+        "| Evals/s (scan) | Mismatches"
+    )
+    for count in rule_counts:
+        rules = list(generate_pricing_rules(count))
+        start = time.perf_counter()
+        engine = pricing.PricingEngine(rules)
+        compile_time = time.perf_counter() - start
+
+        discount_rate = engine.discount_rate
+        start = time.perf_counter()
+        for customer_type, product, quantity, when in lines:
+            discount_rate(customer_type, product, quantity, when)
+        engine_rate = evaluations / (time.perf_counter() - start)
+
+        # Referencia: evaluar todas las reglas en cada venta
+        mismatches = 0
+        start = time.perf_counter()
+        for customer_type, product, quantity, when in lines[:checks]:
+            expected = pricing.scan_discount_rate(
+                engine.rules, customer_type, product, quantity, when
+            )
+            actual = discount_rate(customer_type, product, quantity, when)
+            if not math.isclose(expected, actual, abs_tol=1e-9):
+                mismatches += 1
+        scan_rate = checks / (time.perf_counter() - start)
+
+        print(
+            f"{count:>5} | {compile_time * 1000:>12.1f} | "
+            f"{engine_rate:>16,.0f} | {engine_rate * count:>16,.0f} | "
+            f"{scan_rate:>14,.0f} | {mismatches:>10}"
+        )
+
+
+def bench_records(size, repeats=5):
+    """
+    Comparar productos y ventas como diccionarios (formato anterior)
+    frente a models.Product / models.Sale con __slots__: memoria por
+    registro y velocidad de lectura y escritura de un campo.
+    """
+    products = list(generate_products(size))
+    sales = list(generate_sales(size))
+
+    print(f"Records: {size}")
+    print("Record  | dict (bytes) | __slots__ (bytes) | Ratio")
+    for name, records, cls in (
+        ("product", products, Product),
+        ("sale", sales, Sale),
+    ):
+        # Los valores son los mismos objetos: solo se mide el contenedor
+        values = [dict(record) for record in records]
+        dict_bytes = measure_memory(lambda: [dict(v) for v in values])
+        slots_bytes = measure_memory(lambda: [cls(**v) for v in values])
+        print(
+            f"{name:<7} | {dict_bytes / size:>12.1f} | "
+            f"{slots_bytes / size:>17.1f} | "
+            f"{dict_bytes / slots_bytes:>5.2f}x"
+        )
+
+    dicts = [dict(product) for product in products]
+
+    def timed(loop):
+        best = min(_time_loop(loop) for _ in range(repeats))
+        return best / size * 1e9
+
+    def read_dict():
+        total = 0
+        for product in dicts:
+            total += product["stock"]
+        return total
+
+    def read_attribute():
+        total = 0
+        for product in products:
+            total += product.stock
+        return total
+
+    def read_key():
+        total = 0
+        for product in products:
+            total += product["stock"]
+        return total
+
+    def write_dict():
+        for product in dicts:
+            product["stock"] += 1
+
+    def write_attribute():
+        for product in products:
+            product.stock += 1
+
+    print("Access                     | ns/record")
+    for label, loop in (
+        ('dict["stock"]', read_dict),
+        ("product.stock", read_attribute),
+        ('product["stock"] (compat)', read_key),
+        ('dict["stock"] += 1', write_dict),
+        ("product.stock += 1", write_attribute),
+    ):
+        print(f"{label:<26} | {timed(loop):>9.1f}")
+
+
+def _time_loop(loop):
+    start = time.perf_counter()
+    loop()
+    return time.perf_counter() - start
+
+
+# ============================================================
+# Suite de rutas críticas
+# ============================================================
+
+def percentile(values, fraction):
+    """
+    Percentil (0..1) de una lista ya ordenada.
+    """
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def measure_case(func, max_calls, max_time, memory_calls=3):
+    """
+    Medir una función sin argumentos.
+
+    Se llama hasta max_calls veces o hasta pasar max_time segundos
+    (como mínimo 5 llamadas), cronometrando cada llamada. Después, en
+    una pasada aparte con tracemalloc (que ralentiza), se mide el pico
+    de memoria reservada durante una llamada.
+
+    Devuelve un diccionario con calls, ops_per_sec, mean_us, p50_us,
+    p95_us, p99_us, max_us y peak_kib.
+    """
+    perf_counter = time.perf_counter
+    latencies = []
+    deadline = perf_counter() + max_time
+    while len(latencies) < max_calls:
+        start = perf_counter()
+        func()
+        end = perf_counter()
+        latencies.append(end - start)
+        if end > deadline and len(latencies) >= 5:
+            break
+
+    peak = 0
+    tracemalloc.start()
+    for _ in range(memory_calls):
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        func()
+        _, call_peak = tracemalloc.get_traced_memory()
+        peak = max(peak, call_peak - base)
+    tracemalloc.stop()
+
+    total = sum(latencies)
+    latencies.sort()
+    return {
+        "calls": len(latencies),
+        "ops_per_sec": len(latencies) / total if total else 0.0,
+        "mean_us": total / len(latencies) * 1e6,
+        "p50_us": percentile(latencies, 0.50) * 1e6,
+        "p95_us": percentile(latencies, 0.95) * 1e6,
+        "p99_us": percentile(latencies, 0.99) * 1e6,
+        "max_us": latencies[-1] * 1e6,
+        "peak_kib": peak / 1024,
+    }
+
+
+def build_suite_state(product_count, sale_count, days=90, seed=0):
+    """
+    Crear un inventario y un historial sintéticos: N productos y M
+    ventas repartidas en los últimos 'days' días, ya aplicadas al
+    stock y a los rankings del inventario.
+    """
+    inventory = Inventory(generate_products(product_count, seed=seed))
+    for product in inventory:
+        product.stock += sale_count
+    sales_history = SalesHistory()
+
+    now = time.time()
+    step = days * 86400 / max(sale_count, 1)
+    for index, sale in enumerate(
+        generate_sales(sale_count, inventory, seed=seed)
+    ):
+        sale.timestamp = now - (sale_count - index) * step
+        sales_history.append(sale)
+        inventory.record_sale(
+            inventory.get(sale.product_id), sale.quantity, sale.net_amount
+        )
+    return inventory, sales_history
+
+
+def suite_cases(inventory, sales_history, csv_path, seed=0):
+    """
+    Casos de la suite: lista de (nombre, función sin argumentos).
+
+    Los reportes que imprimen se llaman tal cual (con la salida
+    descartada), para medir el mismo camino que el menú.
+    """
+    rng = random.Random(seed)
+    product_ids = [product.id for product in inventory]
+    products = list(inventory)
+    customer_types = list(CUSTOMER_DISCOUNTS)
+    month = period_bounds("this_month")
+
+    def lookup():
+        find_product_by_id(inventory, rng.choice(product_ids))
+
+    def sale_record():
+        customer_type = rng.choice(customer_types)
+        create_sale_record(
+            0,
+            "Customer",
+            customer_type,
+            rng.choice(products),
+            1,
+            CUSTOMER_DISCOUNTS[customer_type],
+        )
+
+    def register():
+        complete_sale(
+            inventory,
+            sales_history,
+            "Customer",
+            rng.choice(customer_types),
+            rng.choice(products),
+            1,
+        )
+
+    def basket():
+        # Pedido de 20 líneas registrado como una sola operación
+        complete_order(
+            inventory,
+            sales_history,
+            "Customer",
+            rng.choice(customer_types),
+            [(rng.choice(products), 1) for _ in range(20)],
+        )
+
+    records = [product.to_dict() for product in inventory]
+    conceptos_csv.guardar_csv(csv_path, records)
+
+    return [
+        ("find_product_by_id", lookup),
+        ("get_next_sale_id", lambda: get_next_sale_id(sales_history)),
+        ("create_sale_record", sale_record),
+        ("complete_sale", register),
+        ("complete_order_20_lines", basket),
+        ("top_3_products", lambda: reports.top_3_products(inventory)),
+        (
+            "top_k_products",
+            lambda: reports.top_k_products(inventory, 10, by="revenue"),
+        ),
+        ("sales_by_brand", lambda: reports.sales_by_brand(sales_history)),
+        ("income_report", lambda: reports.income_report(sales_history)),
+        (
+            "inventory_performance_report",
+            lambda: reports.inventory_performance_report(inventory),
+        ),
+        (
+            "below_reorder_point",
+            lambda: inventory.below_reorder_point(100),
+        ),
+        (
+            "compute_stock_cover",
+            lambda: reports.compute_stock_cover(inventory, sales_history, 20),
+        ),
+        (
+            "compute_period",
+            lambda: reports.compute_period(sales_history, *month),
+        ),
+        ("top_customers", lambda: sales_history.top_customers(10)),
+        (
+            "customer_type_shares",
+            lambda: reports.customer_type_shares(sales_history),
+        ),
+        (
+            "check_report_aggregates",
+            lambda: reports.check_report_aggregates(
+                inventory, sales_history
+            ),
+        ),
+        ("cargar_csv", lambda: conceptos_csv.cargar_csv(csv_path)),
+        ("guardar_csv", lambda: conceptos_csv.guardar_csv(csv_path, records)),
+    ]
+
+
+def run_suite(product_count, sale_count, max_calls, max_time, only=None):
+    """
+    Ejecutar la suite y devolver el resultado (serializable a JSON).
+    """
+    start = time.perf_counter()
+    inventory, sales_history = build_suite_state(product_count, sale_count)
+    setup_time = time.perf_counter() - start
+
+    fd, csv_path = tempfile.mkstemp(suffix=".csv")
+    os.close(fd)
+    results = {}
+    try:
+        cases = suite_cases(inventory, sales_history, csv_path)
+        with open(os.devnull, "w") as devnull:
+            for name, func in cases:
+                if only and name not in only:
+                    continue
+                with contextlib.redirect_stdout(devnull):
+                    results[name] = measure_case(func, max_calls, max_time)
+    finally:
+        os.remove(csv_path)
+
+    return {
+        "meta": {
+            "products": product_count,
+            "sales": sale_count,
+            "setup_s": setup_time,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "report_backend": reports.get_report_backend(),
+            "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def print_suite(suite):
+    """
+    Mostrar los resultados de run_suite como tabla.
+    """
+    meta = suite["meta"]
+    print(
+        f"Products: {meta['products']} | Sales: {meta['sales']} | "
+        f"Setup: {meta['setup_s']:.2f} s | Python {meta['python']}"
+    )
+    print(
+        "Case                         |    ops/s |  p50 (us) |  p95 (us) "
+        "|  p99 (us) | Peak (KiB)"
+    )
+    for name, result in suite["results"].items():
+        print(
+            f"{name:<28} | {result['ops_per_sec']:>8,.0f} | "
+            f"{result['p50_us']:>9.1f} | {result['p95_us']:>9.1f} | "
+            f"{result['p99_us']:>9.1f} | {result['peak_kib']:>10.1f}"
+        )
+
+
+def compare_suites(baseline, current, tolerance):
+    """
+    Comparar la mediana (p50) de cada caso con una ejecución anterior.
+
+    Devuelve la lista de casos más lentos que la base en más de
+    'tolerance' (0.10 = 10 %).
+    """
+    regressions = []
+    print("Case                         | base p50 |  now p50 |  Change")
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            continue
+        change = result["p50_us"] / before["p50_us"] - 1
+        flag = ""
+        if change > tolerance:
+            regressions.append(name)
+            flag = "  SLOWER"
+        print(
+            f"{name:<28} | {before['p50_us']:>8.1f} | "
+            f"{result['p50_us']:>8.1f} | {change:>+7.1%}{flag}"
+        )
+    return regressions
+
+
+def main():
+    """
+    Punto de entrada de los benchmarks.
+    """
+    parser = argparse.ArgumentParser(description="Inventory benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    ids_parser = subparsers.add_parser("ids", help="Sale ID allocation")
+    ids_parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[10_000, 100_000, 1_000_000],
+    )
+
+    memory_parser = subparsers.add_parser(
+        "memory", help="Columnar ledger vs list of dicts"
+    )
+    memory_parser.add_argument("--size", type=int, default=100_000)
+
+    snapshot_parser = subparsers.add_parser(
+        "snapshot", help="Binary snapshot startup and lookups"
+    )
+    snapshot_parser.add_argument("--size", type=int, default=1_000_000)
+
+    batch_parser = subparsers.add_parser(
+        "batch", help="Batch sale processing throughput"
+    )
+    batch_parser.add_argument("--orders", type=int, default=100_000)
+    batch_parser.add_argument("--products", type=int, default=10_000)
+    batch_parser.add_argument("--batch-size", type=int, default=1_000)
+
+    concurrency_parser = subparsers.add_parser(
+        "concurrency", help="Concurrent sales stress test"
+    )
+    concurrency_parser.add_argument("--threads", type=int, default=16)
+    concurrency_parser.add_argument("--orders", type=int, default=50_000)
+    concurrency_parser.add_argument("--products", type=int, default=20)
+    concurrency_parser.add_argument("--stock", type=int, default=2_000)
+
+    parallel_parser = subparsers.add_parser(
+        "parallel", help="Multi-process sales reports scaling"
+    )
+    parallel_parser.add_argument("--size", type=int, default=10_000_000)
+    parallel_parser.add_argument(
+        "--workers", type=int, nargs="+", default=[1, 2, 4, 8]
+    )
+
+    rollups_parser = subparsers.add_parser(
+        "rollups", help="Period queries: rollups vs full scan"
+    )
+    rollups_parser.add_argument("--size", type=int, default=1_000_000)
+
+    search_parser = subparsers.add_parser(
+        "search", help="Indexed product search vs catalogue scan"
+    )
+    search_parser.add_argument("--size", type=int, default=1_000_000)
+
+    velocity_parser = subparsers.add_parser(
+        "velocity", help="Days-of-stock-cover forecast on a catalogue"
+    )
+    velocity_parser.add_argument("--products", type=int, default=1_000_000)
+    velocity_parser.add_argument("--sold", type=int, default=500_000)
+
+    records_parser = subparsers.add_parser(
+        "records", help="Dict records vs __slots__ Product and Sale"
+    )
+    records_parser.add_argument("--size", type=int, default=100_000)
+
+    pricing_parser = subparsers.add_parser(
+        "pricing", help="Compiled discount rules vs scanning every rule"
+    )
+    pricing_parser.add_argument(
+        "--rules", type=int, nargs="+", default=[100, 1_000, 5_000]
+    )
+    pricing_parser.add_argument("--evaluations", type=int, default=100_000)
+
+    suite_parser = subparsers.add_parser(
+        "suite", help="Hot path suite: latency percentiles and memory"
+    )
+    suite_parser.add_argument("--products", type=int, default=10_000)
+    suite_parser.add_argument("--sales", type=int, default=100_000)
+    suite_parser.add_argument(
+        "--calls", type=int, default=10_000, help="Maximum calls per case"
+    )
+    suite_parser.add_argument(
+        "--max-time", type=float, default=1.0, help="Seconds per case"
+    )
+    suite_parser.add_argument(
+        "--only", nargs="+", help="Run only these cases"
+    )
+    suite_parser.add_argument(
+        "--json",
+        metavar="PATH",
+        help="Write the results as JSON ('-' = stdout)",
+    )
+    suite_parser.add_argument(
+        "--compare",
+        metavar="PATH",
+        help="Compare with a previous --json run (exit 1 on regressions)",
+    )
+    suite_parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.10,
+        help="Allowed p50 slowdown for --compare (0.10 = 10%%)",
+    )
+
+    args = parser.parse_args()
+
+    if args.benchmark == "ids":
+        bench_sale_ids(args.sizes)
+    elif args.benchmark == "memory":
+        bench_ledger_memory(args.size)
+    elif args.benchmark == "snapshot":
+        bench_snapshot(args.size)
+    elif args.benchmark == "batch":
+        bench_batch_sales(args.orders, args.products, args.batch_size)
+    elif args.benchmark == "concurrency":
+        problems = stress_concurrent_sales(
+            args.threads, args.orders, args.products, args.stock
+        )
+        if problems:
+            sys.exit(1)
+    elif args.benchmark == "parallel":
+        bench_parallel_reports(args.size, args.workers)
+    elif args.benchmark == "rollups":
+        bench_rollups(args.size)
+    elif args.benchmark == "search":
+        bench_search(args.size)
+    elif args.benchmark == "velocity":
+        bench_velocity(args.products, min(args.sold, args.products))
+    elif args.benchmark == "records":
+        bench_records(args.size)
+    elif args.benchmark == "pricing":
+        bench_pricing(args.rules, args.evaluations)
+    elif args.benchmark == "suite":
+        suite = run_suite(
+            args.products, args.sales, args.calls, args.max_time, args.only
+        )
+        if args.json == "-":
+            json.dump(suite, sys.stdout, indent=2)
+            print()
+        else:
+            print_suite(suite)
+            if args.json:
+                with open(args.json, "w", encoding="utf-8") as f:
+                    json.dump(suite, f, indent=2)
+                print(f"Results written to {args.json}")
+        if args.compare:
+            with open(args.compare, encoding="utf-8") as f:
+                baseline = json.load(f)
+            if compare_suites(baseline, suite, args.tolerance):
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,415 @@
+"""
+Formato binario de snapshots, pensado para abrirse con mmap.
+
+Cada snapshot es una tabla columnar de ancho fijo:
+
+    cabecera      MAGIC, versión, nº de filas, nº de columnas,
+                  tamaño de los metadatos
+    directorio    por columna: nombre (16 bytes), tipo, offset
+    metadatos     JSON (offset del diario, últimos IDs...)
+    cadenas       tabla de textos: nº, offsets y bytes UTF-8
+    columnas      un bloque contiguo por columna (8 bytes por valor)
+
+Los textos (nombre, marca, categoría...) se guardan una sola vez en la
+tabla de cadenas y las columnas de texto guardan su índice.
+
+MappedSnapshot abre el archivo con mmap y lee las columnas en su sitio
+(memoryview, sin copiar): abrir un snapshot de un millón de productos
+solo lee la cabecera, y cada fila o texto se decodifica al pedirlo.
+"""
+
+import json
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left
+from datetime import datetime
+from operator import itemgetter
+
+from ledger import DATE_FORMAT, SALE_FIELDS
+from models import Product, Sale
+from store import Inventory, SalesHistory
+
+MAGIC = b"INVSNAP1"
+VERSION = 1
+
+# MAGIC, versión, nº de filas, nº de columnas, tamaño de metadatos
+_HEADER = struct.Struct("<8sIQII")
+# nombre, tipo ('q' entero, 'd' flotante, 's' texto), offset
+_COLUMN_ENTRY = struct.Struct("<16scQ")
+
+# Columnas de un snapshot de inventario. 'revenue' guarda los ingresos
+# netos acumulados del producto (store.Inventory.revenue). Los
+# snapshots anteriores a 'reorder_point' se leen con el valor por
+# defecto (models.DEFAULT_REORDER_POINT).
+PRODUCT_COLUMNS = (
+    ("id", "q"),
+    ("name", "s"),
+    ("brand", "s"),
+    ("category", "s"),
+    ("unit_price", "d"),
+    ("stock", "q"),
+    ("warranty_months", "q"),
+    ("total_sold", "q"),
+    ("reorder_point", "q"),
+    ("revenue", "d"),
+)
+
+# Columnas de un snapshot de ventas ('date' se deriva de 'timestamp')
+SALE_COLUMNS = (
+    ("id", "q"),
+    ("customer_name", "s"),
+    ("customer_type", "s"),
+    ("product_id", "q"),
+    ("product_name", "s"),
+    ("brand", "s"),
+    ("quantity", "q"),
+    ("unit_price", "d"),
+    ("discount_rate", "d"),
+    ("discount_amount", "d"),
+    ("gross_amount", "d"),
+    ("net_amount", "d"),
+    ("timestamp", "d"),
+)
+
+
+def write_snapshot(path, columns, rows, metadata=None):
+    """
+    Escribir un snapshot binario de forma atómica.
+
+    - columns: secuencia de (nombre, tipo) como PRODUCT_COLUMNS
+    - rows: iterable de tuplas con un valor por columna
+    - metadata: diccionario serializable a JSON
+    """
+    strings = []
+    string_codes = {}
+    values = [array("q" if kind == "s" else kind) for _, kind in columns]
+    kinds = [kind for _, kind in columns]
+
+    for row in rows:
+        for column, kind, value in zip(values, kinds, row):
+            if kind == "s":
+                code = string_codes.get(value)
+                if code is None:
+                    code = string_codes[value] = len(strings)
+                    strings.append(value)
+                value = code
+            column.append(value)
+
+    row_count = len(values[0]) if values else 0
+    meta_bytes = json.dumps(metadata or {}).encode("utf-8")
+    string_bytes = [text.encode("utf-8") for text in strings]
+    string_offsets = array("q", [0])
+    for encoded in string_bytes:
+        string_offsets.append(string_offsets[-1] + len(encoded))
+
+    # Posiciones de cada sección
+    position = _HEADER.size + _COLUMN_ENTRY.size * len(columns)
+    position += len(meta_bytes)
+    position = _align(position)
+    strings_at = position
+    position += 8 + string_offsets.itemsize * len(string_offsets)
+    position = _align(position + string_offsets[-1])
+    column_offsets = []
+    for column in values:
+        column_offsets.append(position)
+        position += column.itemsize * len(column)
+
+    temp_path = path + ".tmp"
+    with open(temp_path, mode="wb") as f:
+        f.write(
+            _HEADER.pack(
+                MAGIC, VERSION, row_count, len(columns), len(meta_bytes)
+            )
+        )
+        for (name, kind), offset in zip(columns, column_offsets):
+            f.write(
+                _COLUMN_ENTRY.pack(
+                    name.encode("ascii"), kind.encode("ascii"), offset
+                )
+            )
+        f.write(meta_bytes)
+        _pad_to(f, strings_at)
+        f.write(struct.pack("<Q", len(strings)))
+        f.write(string_offsets.tobytes())
+        for encoded in string_bytes:
+            f.write(encoded)
+        for column, offset in zip(values, column_offsets):
+            _pad_to(f, offset)
+            f.write(column.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+def _align(position):
+    return (position + 7) // 8 * 8
+
+
+def _pad_to(f, position):
+    f.write(b"\0" * (position - f.tell()))
+
+
+class MappedSnapshot:
+    """
+    Snapshot binario abierto con mmap y leído en su sitio.
+
+    - len(snapshot): número de filas
+    - snapshot.metadata: diccionario de metadatos
+    - snapshot.column(nombre): memoryview tipado con los valores
+    - snapshot.row(i): diccionario con la fila i (se decodifica al pedirla)
+    """
+
+    def __init__(self, path):
+        with open(path, mode="rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = memoryview(self._map)
+
+        magic, version, self._rows, column_count, meta_size = (
+            _HEADER.unpack_from(buffer)
+        )
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Not a snapshot file: {path}")
+
+        self._columns = {}
+        self._kinds = {}
+        position = _HEADER.size
+        for _ in range(column_count):
+            raw_name, raw_kind, offset = _COLUMN_ENTRY.unpack_from(
+                buffer, position
+            )
+            position += _COLUMN_ENTRY.size
+            name = raw_name.rstrip(b"\0").decode("ascii")
+            kind = raw_kind.decode("ascii")
+            typecode = "q" if kind == "s" else kind
+            end = offset + 8 * self._rows
+            self._columns[name] = buffer[offset:end].cast(typecode)
+            self._kinds[name] = kind
+
+        self.metadata = json.loads(
+            bytes(buffer[position:position + meta_size]).decode("utf-8")
+        )
+        position = _align(position + meta_size)
+
+        (string_count,) = struct.unpack_from("<Q", buffer, position)
+        position += 8
+        offsets_end = position + 8 * (string_count + 1)
+        self._string_offsets = buffer[position:offsets_end].cast("q")
+        self._string_data = buffer[offsets_end:]
+        self._string_cache = {}
+
+    def __len__(self):
+        return self._rows
+
+    def column_names(self):
+        """
+        Devolver los nombres de las columnas del snapshot.
+        """
+        return list(self._columns)
+
+    def column(self, name):
+        """
+        Devolver una columna como memoryview tipado (sin copiar).
+        Las columnas de texto devuelven los índices a la tabla de cadenas.
+        """
+        return self._columns[name]
+
+    def column_values(self, name):
+        """
+        Decodificar una columna entera como lista (los textos, ya como
+        cadenas). Mucho más rápido que leer fila a fila con row().
+        """
+        values = self._columns[name].tolist()
+        if self._kinds[name] == "s":
+            codes = set(values)
+            if len(codes) > len(self._string_offsets) // 2:
+                # Casi todos distintos (por ejemplo, los nombres): más
+                # rápido decodificar la tabla entera de una vez
+                strings = self.strings()
+            else:
+                strings = {code: self.string(code) for code in codes}
+            values = [strings[code] for code in values]
+        return values
+
+    def strings(self):
+        """
+        Decodificar la tabla de cadenas entera (lista código -> texto).
+        """
+        data = bytes(self._string_data[:self._string_offsets[-1]])
+        offsets = self._string_offsets.tolist()
+        return [
+            data[start:end].decode("utf-8")
+            for start, end in zip(offsets, offsets[1:])
+        ]
+
+    def string(self, code):
+        """
+        Decodificar un texto de la tabla de cadenas (con caché).
+        """
+        text = self._string_cache.get(code)
+        if text is None:
+            start = self._string_offsets[code]
+            end = self._string_offsets[code + 1]
+            text = bytes(self._string_data[start:end]).decode("utf-8")
+            self._string_cache[code] = text
+        return text
+
+    def value(self, index, name):
+        """
+        Leer el valor de una columna en la fila indicada.
+        """
+        value = self._columns[name][index]
+        if self._kinds[name] == "s":
+            return self.string(value)
+        return value
+
+    def row(self, index):
+        """
+        Decodificar una fila completa como diccionario.
+        """
+        if index < 0:
+            index += self._rows
+        if not 0 <= index < self._rows:
+            raise IndexError("snapshot row out of range")
+        return {name: self.value(index, name) for name in self._columns}
+
+    def __iter__(self):
+        for index in range(self._rows):
+            yield self.row(index)
+
+    def close(self):
+        """
+        Liberar el mapeo de memoria.
+        """
+        for view in self._columns.values():
+            view.release()
+        self._string_offsets.release()
+        self._string_data.release()
+        self._map.close()
+
+
+class MappedInventory(MappedSnapshot):
+    """
+    Snapshot de inventario consultable sin cargarlo: get(product_id)
+    hace una búsqueda binaria sobre la columna de IDs (ordenada).
+    """
+
+    def get(self, product_id):
+        """
+        Devolver el producto (models.Product) con ese ID, o None.
+        """
+        ids = self.column("id")
+        index = bisect_left(ids, product_id)
+        if index == len(ids) or ids[index] != product_id:
+            return None
+        product = self.row(index)
+        del product["revenue"]
+        return Product.from_dict(product)
+
+    def revenue(self, product_id):
+        """
+        Devolver los ingresos netos acumulados de un producto.
+        """
+        ids = self.column("id")
+        index = bisect_left(ids, product_id)
+        if index == len(ids) or ids[index] != product_id:
+            return 0.0
+        return self.column("revenue")[index]
+
+
+class MappedSales(MappedSnapshot):
+    """
+    Snapshot de ventas consultable sin cargarlo. Cada fila es un
+    models.Sale (incluida 'date').
+    """
+
+    def row(self, index):
+        sale = super().row(index)
+        sale["date"] = _format_date(sale["timestamp"])
+        return Sale(**{field: sale[field] for field in SALE_FIELDS})
+
+
+def _format_date(timestamp):
+    return datetime.fromtimestamp(timestamp).strftime(DATE_FORMAT)
+
+
+# ============================================================
+# Inventario y ventas
+# ============================================================
+
+def inventory_rows(inventory):
+    """
+    Copiar las filas del snapshot del inventario (las columnas de
+    PRODUCT_COLUMNS, sin ordenar) para escribirlas después con
+    write_inventory_rows.
+    """
+    return inventory.rows([name for name, _ in PRODUCT_COLUMNS[:-1]])
+
+
+def write_inventory_rows(path, rows, metadata=None):
+    """
+    Escribir filas de inventory_rows (ordenadas por ID) en un snapshot
+    binario.
+    """
+    rows.sort(key=itemgetter(0))
+    write_snapshot(path, PRODUCT_COLUMNS, rows, metadata)
+
+
+def write_inventory_snapshot(path, inventory, metadata=None):
+    """
+    Escribir el inventario (ordenado por ID) en un snapshot binario.
+    """
+    write_inventory_rows(path, inventory_rows(inventory), metadata)
+
+
+def write_sales_snapshot(path, sales_history, metadata=None):
+    """
+    Escribir el historial de ventas en un snapshot binario, leyendo
+    las columnas del libro directamente.
+    """
+    fields = [name for name, _ in SALE_COLUMNS]
+    rows = sales_history.ledger.iter_values(fields)
+    write_snapshot(path, SALE_COLUMNS, rows, metadata)
+
+
+def load_inventory(path):
+    """
+    Construir un store.Inventory a partir de un snapshot binario.
+    Devuelve (inventory, metadata).
+    """
+    snapshot = MappedInventory(path)
+    try:
+        # Columna a columna: los snapshots anteriores a una columna
+        # nueva (reorder_point) no la traen y el producto usa su valor
+        # por defecto
+        products = Product.from_columns(
+            {
+                name: snapshot.column_values(name)
+                for name in snapshot.column_names()
+                if name != "revenue"
+            }
+        )
+        revenues = zip(
+            snapshot.column_values("id"), snapshot.column_values("revenue")
+        )
+        inventory = Inventory(products)
+        inventory.restore_revenue(dict(revenues))
+        return inventory, snapshot.metadata
+    finally:
+        snapshot.close()
+
+
+def load_sales(path):
+    """
+    Construir un store.SalesHistory a partir de un snapshot binario.
+    Devuelve (sales_history, metadata).
+    """
+    snapshot = MappedSnapshot(path)
+    try:
+        sales_history = SalesHistory.from_columns(
+            {name: snapshot.column_values(name) for name, _ in SALE_COLUMNS}
+        )
+        return sales_history, snapshot.metadata
+    finally:
+        snapshot.close()
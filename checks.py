@@ -0,0 +1,356 @@
+"""
+Comprobaciones automáticas de las garantías de ventas y datos.
+
+Cada comprobación monta sus propios datos (en memoria, en un directorio
+temporal o en una base SQLite temporal) y devuelve la lista de
+problemas encontrados (vacía si todo cuadra):
+- check_order_atomicity: un pedido de varias líneas se registra entero
+  o no se registra (falta de stock, error al calcular una línea), en
+  memoria y en SQLite.
+- check_crash_replay: tras un corte (diario sin cerrar, con snapshots
+  periódicos a mitad de un pedido y una última línea a medias) se
+  recupera el mismo inventario e historial.
+- check_csv_import: import_sales rechaza las filas con fecha inválida
+  y las ventas con un ID que ya existe, en memoria y en SQLite.
+- check_import_replay: las ventas importadas sin apply_to_stock no
+  descuentan stock al volver a leer el diario tras un corte.
+- check_concurrent_sales: benchmarks.stress_concurrent_sales en
+  pequeño (sin sobreventa con muchos hilos).
+
+Para ejecutarlas (termina con código 1 si alguna falla):
+    python checks.py
+"""
+
+import contextlib
+import csv
+import io
+import os
+import sys
+import tempfile
+
+import csv_io
+import pricing
+from benchmarks import stress_concurrent_sales
+from ledger import SALE_FIELDS
+from models import create_initial_inventory
+from persistence import JOURNAL_FILE, load_state
+from sales import complete_order, complete_sale
+from sqlite_store import open_database
+from store import Inventory, SalesHistory
+
+
+def _stores(directory):
+    """
+    Devolver (nombre, inventario, historial, cerrar) de cada backend,
+    con el inventario inicial de models.py.
+    """
+    inventory = Inventory(create_initial_inventory())
+    yield "memory", inventory, SalesHistory(), lambda: None
+
+    path = os.path.join(directory, "checks.db")
+    inventory, sales_history, database = open_database(
+        path, create_initial_inventory()
+    )
+    yield "sqlite", inventory, sales_history, database.close
+
+
+def _state(inventory, sales_history):
+    """
+    Estado comparable: id -> (stock, total_sold) y número de ventas.
+    """
+    products = {
+        product.id: (product.stock, product.total_sold)
+        for product in inventory
+    }
+    return products, len(sales_history)
+
+
+class _FailingEngine:
+    """
+    Motor de precios que falla al calcular un producto concreto.
+    """
+
+    def __init__(self, engine, product_id):
+        self.engine = engine
+        self.product_id = product_id
+
+    def discount_rate(self, customer_type, product, quantity, when=None):
+        if product.id == self.product_id:
+            raise RuntimeError("pricing failed")
+        return self.engine.discount_rate(
+            customer_type, product, quantity, when
+        )
+
+
+def check_order_atomicity():
+    """
+    Un pedido que no se puede completar no deja nada registrado; uno
+    que sí, deja todas sus líneas con la misma fecha.
+    """
+    problems = []
+    with tempfile.TemporaryDirectory() as directory:
+        for name, inventory, sales_history, close in _stores(directory):
+            try:
+                problems.extend(
+                    f"{name}: {problem}"
+                    for problem in _order_atomicity(inventory, sales_history)
+                )
+            finally:
+                close()
+    return problems
+
+
+def _order_atomicity(inventory, sales_history):
+    problems = []
+    first, second, third = (inventory.get(i) for i in (1, 2, 3))
+    before = _state(inventory, sales_history)
+
+    # Sin stock en la última línea
+    lines = [(first, 1), (second, 1), (third, third.stock + 1)]
+    try:
+        complete_order(inventory, sales_history, "Check", "vip", lines)
+        problems.append("order without stock was accepted")
+    except ValueError:
+        pass
+    if _state(inventory, sales_history) != before:
+        problems.append("rejected order changed stock or history")
+
+    # Error al calcular la última línea
+    engine = pricing.get_pricing_engine()
+    pricing.set_pricing_engine(_FailingEngine(engine, third.id))
+    try:
+        lines = [(first, 1), (second, 1), (third, 1)]
+        complete_order(inventory, sales_history, "Check", "vip", lines)
+        problems.append("order with a failing line was accepted")
+    except RuntimeError:
+        pass
+    finally:
+        pricing.set_pricing_engine(engine)
+    if _state(inventory, sales_history) != before:
+        problems.append("failed order changed stock or history")
+
+    # Pedido correcto (con un producto repetido)
+    lines = [(first, 1), (second, 2), (first, 1)]
+    summary = complete_order(
+        inventory, sales_history, "Check", "vip", lines
+    )
+    products, count = _state(inventory, sales_history)
+    expected = dict(before[0])
+    for product_id, quantity in ((1, 2), (2, 2)):
+        stock, sold = expected[product_id]
+        expected[product_id] = (stock - quantity, sold + quantity)
+    if products != expected or count != before[1] + 3:
+        problems.append("accepted order not applied exactly once")
+    sales = summary["sales"]
+    if len({sale.date for sale in sales}) != 1:
+        problems.append("order lines have different dates")
+    ids = [sale.id for sale in sales]
+    if ids != list(range(ids[0], ids[0] + len(ids))):
+        problems.append(f"order sale IDs are not consecutive: {ids}")
+    return problems
+
+
+def check_crash_replay():
+    """
+    Registrar pedidos y ventas con snapshots frecuentes, cortar sin
+    cerrar (y con una entrada del diario a medias) y volver a cargar.
+    """
+    problems = []
+    with tempfile.TemporaryDirectory() as data_dir:
+        inventory, sales_history, persistence = load_state(
+            data_dir, create_initial_inventory(), snapshot_every=2
+        )
+        products = [inventory.get(i) for i in range(1, 6)]
+        complete_order(
+            inventory,
+            sales_history,
+            "Check",
+            "regular",
+            [(product, 1) for product in products],
+        )
+        complete_sale(
+            inventory, sales_history, "Check", "vip", products[4], 2
+        )
+        complete_order(
+            inventory,
+            sales_history,
+            "Check",
+            "wholesale",
+            [(products[0], 1), (products[2], 3), (products[4], 1)],
+        )
+        expected = _state(inventory, sales_history)
+
+        # Corte: sin snapshots finales y con una línea a medias (el
+        # snapshot periódico en curso sí llega a escribirse, como
+        # haría su hilo antes de que muera el proceso)
+        persistence.wait_snapshot()
+        persistence.journal.close()
+        with open(os.path.join(data_dir, JOURNAL_FILE), mode="ab") as f:
+            f.write(b'{"type":"sale","sale":{"id"')
+
+        inventory, sales_history, persistence = load_state(
+            data_dir, create_initial_inventory(), snapshot_every=2
+        )
+        try:
+            actual = _state(inventory, sales_history)
+            if actual != expected:
+                problems.append(
+                    f"state after replay {actual} != before crash {expected}"
+                )
+            problems.extend(sales_history.check_aggregates())
+        finally:
+            persistence.close()
+    return problems
+
+
+def check_csv_import():
+    """
+    Importar ventas con una fecha inválida, un ID repetido en el
+    archivo y, en una segunda importación, IDs que ya existen.
+    """
+    problems = []
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "sales.csv")
+        _write_sales_csv(
+            path,
+            [
+                (1, "2024-01-02 10:00:00"),
+                (1, "2024-01-02 11:00:00"),
+                (2, "yesterday"),
+                (3, "2024-01-03 09:30:00"),
+            ],
+        )
+        for name, inventory, sales_history, close in _stores(directory):
+            try:
+                problems.extend(
+                    f"{name}: {problem}"
+                    for problem in _csv_import(inventory, sales_history, path)
+                )
+            finally:
+                close()
+    return problems
+
+
+def _csv_import(inventory, sales_history, path):
+    problems = []
+    stock = inventory.get(1).stock
+    imported, errors = csv_io.import_sales(
+        inventory, sales_history, path, apply_to_stock=True
+    )
+    if imported != 2 or len(errors) != 2:
+        problems.append(f"first import: {imported} imported, {errors}")
+    if [sale.id for sale in sales_history] != [1, 3]:
+        problems.append("first import: unexpected sale IDs")
+    if inventory.get(1).stock != stock - 2:
+        problems.append("first import: stock not applied once per sale")
+
+    imported, errors = csv_io.import_sales(inventory, sales_history, path)
+    if imported != 0 or len(errors) != 4:
+        problems.append(f"second import: {imported} imported, {errors}")
+    if len(sales_history) != 2:
+        problems.append("second import: duplicate sales were added")
+    return problems
+
+
+def _write_sales_csv(path, rows):
+    """
+    Escribir un CSV de ventas (sin timestamp) de un producto inicial.
+    """
+    fields = [field for field in SALE_FIELDS if field != "timestamp"]
+    with open(path, mode="w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        for sale_id, date in rows:
+            writer.writerow(
+                {
+                    "id": sale_id,
+                    "customer_name": "Check",
+                    "customer_type": "regular",
+                    "product_id": 1,
+                    "product_name": "Check product",
+                    "brand": "Check",
+                    "quantity": 1,
+                    "unit_price": 10.0,
+                    "discount_rate": 0.0,
+                    "discount_amount": 0.0,
+                    "gross_amount": 10.0,
+                    "net_amount": 10.0,
+                    "date": date,
+                }
+            )
+
+
+def check_import_replay():
+    """
+    Importar ventas sin apply_to_stock con el diario activo, cortar sin
+    cerrar y volver a cargar: el stock no debe cambiar.
+    """
+    problems = []
+    with tempfile.TemporaryDirectory() as data_dir:
+        path = os.path.join(data_dir, "sales.csv")
+        _write_sales_csv(
+            path,
+            [
+                (1, "2024-01-02 10:00:00"),
+                (2, "2024-01-02 11:00:00"),
+                (3, "2024-01-03 09:30:00"),
+            ],
+        )
+        inventory, sales_history, persistence = load_state(
+            data_dir, create_initial_inventory(), snapshot_every=1000
+        )
+        csv_io.import_sales(inventory, sales_history, path)
+        expected = _state(inventory, sales_history)
+
+        # Corte: sin snapshots finales
+        persistence.wait_snapshot()
+        persistence.journal.close()
+
+        inventory, sales_history, persistence = load_state(
+            data_dir, create_initial_inventory(), snapshot_every=1000
+        )
+        try:
+            actual = _state(inventory, sales_history)
+            if actual != expected:
+                problems.append(
+                    f"state after replay {actual} != before crash {expected}"
+                )
+        finally:
+            persistence.close()
+    return problems
+
+
+def check_concurrent_sales():
+    """
+    Prueba de estrés pequeña: 8 hilos, pocos productos y poco stock.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        return stress_concurrent_sales(8, 5_000, 5, 300)
+
+
+CHECKS = (
+    ("order atomicity", check_order_atomicity),
+    ("crash replay", check_crash_replay),
+    ("CSV import rejection", check_csv_import),
+    ("import replay", check_import_replay),
+    ("concurrent sales", check_concurrent_sales),
+)
+
+
+def main():
+    failed = 0
+    for name, check in CHECKS:
+        problems = check()
+        if problems:
+            failed += 1
+            print(f"FAILED: {name}")
+            for problem in problems[:10]:
+                print(f"  {problem}")
+        else:
+            print(f"OK: {name}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
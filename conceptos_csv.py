@@ -13,6 +13,7 @@ Solo usa módulos estándar de Python.
 """
 
 import csv
+import itertools
 
 
 # ============================================================
@@ -58,7 +59,8 @@ def guardar_csv(ruta, registros):
 
 def generar_id(registros):
     """
-    Genera un ID numérico consecutivo.
+    Genera un ID numérico consecutivo (recorre la lista; para añadir
+    muchos registros seguidos, usar crear_asignador).
     """
     if not registros:
         return 1
@@ -66,13 +68,33 @@ def generar_id(registros):
     return max(ids) + 1
 
 
+def crear_asignador(registros):
+    """
+    Crea un asignador de IDs para una lista de registros: la recorre
+    una sola vez y después cada llamada, asignador(), devuelve el
+    siguiente ID en O(1) (también desde varios hilos).
+
+    Todos los registros nuevos de esa lista deben pedir su ID al mismo
+    asignador. Nunca reutiliza el ID de un registro borrado.
+    """
+    contador = itertools.count(generar_id(registros))
+    return lambda: next(contador)
+
+
 # CREATE
-def agregar_registro(registros, name, price, quantity):
+def agregar_registro(registros, name, price, quantity, asignador=None):
     """
     Crea un nuevo registro con ID automático y lo añade a la lista.
+
+    - asignador (opcional): el de crear_asignador(registros); si no se
+      pasa, el ID se calcula con generar_id.
     """
+    if asignador is None:
+        nuevo_id = generar_id(registros)
+    else:
+        nuevo_id = asignador()
     nuevo = {
-        "id": str(generar_id(registros)),
+        "id": str(nuevo_id),
         "name": str(name),
         "price": str(price),
         "quantity": str(quantity)
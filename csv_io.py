@@ -0,0 +1,299 @@
+"""
+Importación y exportación de productos y ventas en CSV, en streaming.
+
+A diferencia de conceptos_csv.cargar_csv / guardar_csv, aquí nunca se
+carga el archivo completo en memoria:
+- iter_products_csv / iter_sales_csv son generadores que leen fila a
+  fila y convierten cada valor al tipo del modelo (int, float, str).
+- write_products_csv / write_sales_csv escriben a medida que recorren
+  los datos.
+- import_products / import_sales cargan por lotes (batched).
+"""
+
+import csv
+import json
+from datetime import datetime
+from itertools import islice
+
+from ledger import DATE_FORMAT, SALE_FIELDS
+from models import DEFAULT_REORDER_POINT, Product, Sale
+
+# Columnas de un producto y su tipo, en el orden de models.py
+PRODUCT_FIELDS = {
+    "id": int,
+    "name": str,
+    "brand": str,
+    "category": str,
+    "unit_price": float,
+    "stock": int,
+    "warranty_months": int,
+    "total_sold": int,
+    "reorder_point": int,
+}
+
+# Columnas de producto que pueden faltar en el CSV y su valor
+_OPTIONAL_PRODUCT_FIELDS = {
+    "total_sold": 0,
+    "reorder_point": DEFAULT_REORDER_POINT,
+}
+
+# Tipo de cada columna de una venta (el resto son textos)
+SALE_TYPES = {
+    "id": int,
+    "product_id": int,
+    "quantity": int,
+    "unit_price": float,
+    "discount_rate": float,
+    "discount_amount": float,
+    "gross_amount": float,
+    "net_amount": float,
+    "timestamp": float,
+}
+
+# Filas por lote al importar
+DEFAULT_BATCH_SIZE = 10_000
+
+
+def batched(iterable, size):
+    """
+    Agrupar un iterable en listas de como mucho 'size' elementos.
+    """
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _convert(row, types, line_number):
+    """
+    Convertir los textos de una fila CSV a los tipos indicados.
+
+    Las columnas vacías o ausentes se omiten. Lanza ValueError con el
+    número de línea si un valor no se puede convertir.
+    """
+    record = {}
+    for field, value in row.items():
+        if not value or field is None:
+            continue
+        convert = types.get(field)
+        if convert is None:
+            record[field] = value
+            continue
+        try:
+            record[field] = convert(value)
+        except ValueError:
+            raise ValueError(
+                f"line {line_number}: invalid value for '{field}': {value!r}"
+            ) from None
+    return record
+
+
+def iter_products_csv(path, errors=None):
+    """
+    Leer productos de un CSV, uno a uno, con los tipos de models.py.
+
+    - errors (opcional): lista donde se anotan las filas inválidas;
+      si no se pasa, la primera fila inválida lanza ValueError.
+    """
+    with open(path, mode="r", newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            try:
+                product = _convert(row, PRODUCT_FIELDS, reader.line_num)
+                missing = [
+                    field
+                    for field in PRODUCT_FIELDS
+                    if field not in product
+                    and field not in _OPTIONAL_PRODUCT_FIELDS
+                ]
+                if missing:
+                    raise ValueError(
+                        f"line {reader.line_num}: missing {', '.join(missing)}"
+                    )
+            except ValueError as error:
+                if errors is None:
+                    raise
+                errors.append(str(error))
+                continue
+            for field, default in _OPTIONAL_PRODUCT_FIELDS.items():
+                product.setdefault(field, default)
+            yield Product(
+                **{field: product[field] for field in PRODUCT_FIELDS}
+            )
+
+
+def iter_sales_csv(path, errors=None):
+    """
+    Leer ventas de un CSV, una a una, con los tipos de
+    models.create_sale_record.
+
+    - errors: igual que en iter_products_csv.
+
+    Sin columna timestamp, la fecha tiene que tener el formato
+    ledger.DATE_FORMAT; si no, la fila es inválida.
+    """
+    required = [field for field in SALE_FIELDS if field != "timestamp"]
+
+    with open(path, mode="r", newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            try:
+                sale = _convert(row, SALE_TYPES, reader.line_num)
+                missing = [field for field in required if field not in sale]
+                if missing:
+                    raise ValueError(
+                        f"line {reader.line_num}: missing {', '.join(missing)}"
+                    )
+                if "timestamp" not in sale:
+                    sale["timestamp"] = _parse_date(
+                        sale["date"], reader.line_num
+                    )
+            except ValueError as error:
+                if errors is None:
+                    raise
+                errors.append(str(error))
+                continue
+            yield Sale(
+                **{
+                    field: sale[field]
+                    for field in SALE_FIELDS
+                    if field in sale
+                }
+            )
+
+
+def _parse_date(date, line_number):
+    """
+    Convertir la fecha de una venta en su timestamp.
+    """
+    try:
+        return datetime.strptime(date, DATE_FORMAT).timestamp()
+    except ValueError:
+        raise ValueError(
+            f"line {line_number}: invalid value for 'date': {date!r}"
+        ) from None
+
+
+def iter_orders(path):
+    """
+    Leer pedidos para sales.process_sales desde un archivo.
+
+    - .jsonl: un objeto JSON por línea
+    - cualquier otra extensión: CSV con columnas customer_name,
+      customer_type, product_id y quantity
+
+    Los valores se entregan tal cual; process_sales los valida.
+    """
+    with open(path, mode="r", newline="", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(f)
+
+
+def write_products_csv(path, products):
+    """
+    Escribir productos en un CSV a medida que se recorren.
+
+    Devuelve el número de filas escritas.
+    """
+    rows = _as_tuples(products, PRODUCT_FIELDS)
+    return _write_csv(path, list(PRODUCT_FIELDS), rows)
+
+
+def write_sales_csv(path, sales):
+    """
+    Escribir ventas en un CSV a medida que se recorren.
+
+    - sales: store.SalesHistory (se leen las columnas del libro
+      directamente) o cualquier iterable de diccionarios de venta.
+
+    Devuelve el número de filas escritas.
+    """
+    ledger = getattr(sales, "ledger", None)
+    if ledger is not None:
+        rows = ledger.iter_values(SALE_FIELDS)
+    else:
+        rows = _as_tuples(sales, SALE_FIELDS)
+    return _write_csv(path, list(SALE_FIELDS), rows)
+
+
+def _as_tuples(records, fields):
+    """
+    Convertir diccionarios en tuplas con los campos indicados.
+    """
+    for record in records:
+        yield tuple(record.get(field, "") for field in fields)
+
+
+def _write_csv(path, fields, rows):
+    count = 0
+    with open(path, mode="w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(fields)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def import_products(inventory, path, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Importar productos de un CSV al inventario, por lotes.
+
+    Los productos con un ID que ya existe se omiten.
+    Devuelve (importados, lista de errores).
+    """
+    errors = []
+    imported = 0
+    for batch in batched(iter_products_csv(path, errors), batch_size):
+        for product in batch:
+            if inventory.get(product.id) is not None:
+                errors.append(f"product {product.id}: duplicate ID")
+                continue
+            inventory.append(product)
+            imported += 1
+    return imported, errors
+
+
+def import_sales(
+    inventory,
+    sales_history,
+    path,
+    apply_to_stock=False,
+    batch_size=DEFAULT_BATCH_SIZE,
+):
+    """
+    Importar ventas de un CSV al historial, por lotes.
+
+    - apply_to_stock: si es True, cada venta también descuenta stock y
+      suma total_sold del producto (si existe en el inventario). Por
+      defecto se considera que el stock importado ya refleja esas ventas.
+
+    Las ventas con un ID que ya existe (en el historial o antes en el
+    mismo archivo) se omiten. Cada lote se registra dentro de
+    inventory.transaction(), como las ventas de sales.py.
+
+    Devuelve (importadas, lista de errores).
+    """
+    errors = []
+    imported = 0
+    for batch in batched(iter_sales_csv(path, errors), batch_size):
+        with inventory.transaction():
+            for sale in batch:
+                if sales_history.has_sale(sale.id):
+                    errors.append(f"sale {sale.id}: duplicate ID")
+                    continue
+                if apply_to_stock:
+                    product = inventory.get(sale.product_id)
+                    if product is not None:
+                        inventory.record_sale(
+                            product, sale.quantity, sale.net_amount
+                        )
+                sales_history.append(sale, apply_to_stock)
+                imported += 1
+    return imported, errors
@@ -0,0 +1,249 @@
+"""
+Registro de clientes mantenido de forma incremental.
+
+Las ventas solo guardan el nombre y el tipo del cliente
+(customer_name, customer_type), así que cualquier pregunta por cliente
+("cuánto ha comprado X", "los 10 mejores clientes", "qué parte de los
+ingresos viene de los VIP") obligaba a recorrer todo el historial.
+
+CustomerRegistry se actualiza con cada venta registrada y mantiene:
+- un ID por cliente (el nombre, sin distinguir mayúsculas ni espacios
+  repetidos, identifica al cliente);
+- las posiciones de sus ventas en el libro (ledger.SalesLedger);
+- sus totales (compras, unidades, importes, primera y última compra);
+- un ranking por ingresos netos (ranking.Ranking) para el top K;
+- totales por tipo de cliente (los de models.CUSTOMER_DISCOUNTS).
+
+Así cada consulta cuesta en proporción al resultado, no al historial.
+"""
+
+import math
+from array import array
+
+from ranking import Ranking
+
+# Campos de un cliente, en el orden en que se muestran
+CUSTOMER_FIELDS = (
+    "id",
+    "name",
+    "customer_type",
+    "sales_count",
+    "quantity",
+    "gross_amount",
+    "discount_amount",
+    "net_amount",
+    "first_purchase",
+    "last_purchase",
+)
+
+# Importes que se comparan en compare_totals
+_TOTALS = ("quantity", "gross_amount", "discount_amount", "net_amount")
+
+
+def customer_key(name):
+    """
+    Normalizar el nombre de un cliente para identificarlo: sin espacios
+    sobrantes y sin distinguir mayúsculas ("ana  López" = "Ana López").
+    """
+    return " ".join(name.split()).casefold()
+
+
+def new_tier_stats():
+    """
+    Totales vacíos de un tipo de cliente.
+    """
+    return {
+        "customers": 0,
+        "sales_count": 0,
+        "quantity": 0,
+        "gross_amount": 0.0,
+        "discount_amount": 0.0,
+        "net_amount": 0.0,
+    }
+
+
+class CustomerRegistry:
+    """
+    Clientes del historial de ventas con sus totales.
+
+    - customers: id de cliente -> diccionario con CUSTOMER_FIELDS
+      (customer_type es el tipo de su última compra)
+    - tier_stats: tipo de cliente -> totales de las ventas hechas con
+      ese tipo ('customers' cuenta los clientes distintos)
+    """
+
+    def __init__(self):
+        self.customers = {}
+        self.tier_stats = {}
+        self._by_key = {}
+        self._positions = {}
+        self._tiers = {}
+        self._ranking = Ranking()
+
+    @classmethod
+    def from_sales(cls, sales):
+        """
+        Reconstruir el registro desde cero recorriendo las ventas.
+        """
+        registry = cls()
+        for position, sale in enumerate(sales):
+            registry.add(position, sale, sale.timestamp)
+        return registry
+
+    def __len__(self):
+        return len(self.customers)
+
+    def add(self, position, sale, timestamp):
+        """
+        Registrar la venta guardada en 'position' del libro (models.Sale
+        o ledger.SaleRow); 'timestamp' es su fecha tal como quedó en el
+        libro.
+        """
+        customer = self._add(position, sale, timestamp)
+        self._ranking.set(customer["id"], customer["net_amount"])
+
+    def add_many(self, sales, timestamps, first_position=0):
+        """
+        Registrar muchas ventas seguidas del libro (desde la posición
+        'first_position') y ordenar el ranking de clientes una sola vez
+        al final.
+        """
+        position = first_position
+        for sale, timestamp in zip(sales, timestamps):
+            self._add(position, sale, timestamp)
+            position += 1
+        self._ranking = Ranking.from_scores(
+            {
+                customer_id: customer["net_amount"]
+                for customer_id, customer in self.customers.items()
+            }
+        )
+
+    def _add(self, position, sale, timestamp):
+        key = customer_key(sale.customer_name)
+        customer_id = self._by_key.get(key)
+        if customer_id is None:
+            customer_id = len(self._by_key) + 1
+            self._by_key[key] = customer_id
+            self._positions[customer_id] = array("q")
+            self._tiers[customer_id] = set()
+            self.customers[customer_id] = {
+                "id": customer_id,
+                "name": sale.customer_name,
+                "customer_type": sale.customer_type,
+                "sales_count": 0,
+                "quantity": 0,
+                "gross_amount": 0.0,
+                "discount_amount": 0.0,
+                "net_amount": 0.0,
+                "first_purchase": timestamp,
+                "last_purchase": timestamp,
+            }
+        customer = self.customers[customer_id]
+        self._positions[customer_id].append(position)
+
+        tier = sale.customer_type
+        stats = self.tier_stats.get(tier)
+        if stats is None:
+            stats = self.tier_stats[tier] = new_tier_stats()
+        tiers = self._tiers[customer_id]
+        if tier not in tiers:
+            tiers.add(tier)
+            stats["customers"] += 1
+
+        for totals in (customer, stats):
+            totals["sales_count"] += 1
+            totals["quantity"] += sale.quantity
+            totals["gross_amount"] += sale.gross_amount
+            totals["discount_amount"] += sale.discount_amount
+            totals["net_amount"] += sale.net_amount
+
+        # Las ventas importadas pueden llegar fuera de orden
+        if timestamp >= customer["last_purchase"]:
+            customer["last_purchase"] = timestamp
+            customer["customer_type"] = tier
+        if timestamp < customer["first_purchase"]:
+            customer["first_purchase"] = timestamp
+        return customer
+
+    def find(self, name):
+        """
+        Devolver el cliente con ese nombre, o None si no ha comprado.
+        """
+        customer_id = self._by_key.get(customer_key(name))
+        if customer_id is None:
+            return None
+        return self.customers[customer_id]
+
+    def positions(self, customer_id):
+        """
+        Posiciones en el libro de las ventas de un cliente, en el orden
+        en que se registraron.
+        """
+        return self._positions.get(customer_id, array("q"))
+
+    def top(self, k):
+        """
+        Devolver los K clientes con más ingresos netos (mayores primero;
+        ante empate, el cliente más antiguo).
+        """
+        return [self.customers[i] for i in self._ranking.top(k)]
+
+    def differences(self, other):
+        """
+        Comparar con otro registro y devolver una lista de textos
+        describiendo cada diferencia (lista vacía si coinciden).
+        """
+        problems = compare_totals(
+            self.customers.values(), self.tier_stats, other
+        )
+        for key, customer_id in self._by_key.items():
+            other_id = other._by_key.get(key)
+            if other_id is not None and list(
+                self.positions(customer_id)
+            ) != list(other.positions(other_id)):
+                name = self.customers[customer_id]["name"]
+                problems.append(f"customer '{name}': sales do not match")
+        return problems
+
+
+def compare_totals(customers, tier_stats, reference):
+    """
+    Comparar los totales de unos clientes (diccionarios con
+    CUSTOMER_FIELDS) y de cada tipo de cliente con los de un
+    CustomerRegistry de referencia (por ejemplo, recalculado desde
+    cero). Devuelve la lista de diferencias.
+    """
+    problems = []
+    count = 0
+    for customer in customers:
+        count += 1
+        theirs = reference.find(customer["name"])
+        if theirs is None or not _same_totals(customer, theirs):
+            problems.append(
+                f"customer '{customer['name']}': {customer} != {theirs}"
+            )
+    if count != len(reference):
+        problems.append(f"customers: {count} != {len(reference)}")
+
+    for tier in tier_stats.keys() | reference.tier_stats.keys():
+        mine = tier_stats.get(tier)
+        theirs = reference.tier_stats.get(tier)
+        if (
+            mine is None
+            or theirs is None
+            or mine["customers"] != theirs["customers"]
+            or not _same_totals(mine, theirs)
+        ):
+            problems.append(f"customer type '{tier}': {mine} != {theirs}")
+    return problems
+
+
+def _same_totals(mine, theirs):
+    """
+    Comparar los totales de dos clientes o tipos de cliente.
+    """
+    return mine["sales_count"] == theirs["sales_count"] and all(
+        math.isclose(mine[field], theirs[field], rel_tol=1e-9, abs_tol=1e-6)
+        for field in _TOTALS
+    )
@@ -0,0 +1,400 @@
+"""
+Instrumentación opcional de las operaciones del sistema.
+
+Desactivada por defecto (coste casi nulo). Al activarla, cada
+operación que pasa por run() (las opciones del menú principal, los
+reportes y algunas funciones internas como sales.complete_sale) anota:
+- número de llamadas y de errores;
+- tiempo total, mínimo y máximo;
+- un histograma de latencias (HISTOGRAM_BOUNDS_MS), del que se
+  estiman los percentiles.
+
+En las operaciones interactivas no se cuenta el tiempo que el programa
+espera a que el usuario escriba: mientras la instrumentación está
+activa, input() se sustituye por una versión que descuenta esa espera.
+
+Además se puede perfilar cada operación (set_profile_mode):
+- 'cprofile': funciones que más tiempo acumulan (cProfile / pstats);
+- 'tracemalloc': líneas de código que más memoria reservan y pico de
+  memoria de la operación.
+
+Los resultados se muestran con print_stats() (opción del menú) o se
+guardan en JSON con dump(path).
+
+Para activarla desde el inicio:
+    python main.py --instrument
+    python main.py --instrument --profile cprofile --stats-file stats.json
+"""
+
+import builtins
+import cProfile
+import json
+import pstats
+import threading
+import time
+import tracemalloc
+from functools import wraps
+
+# Límites superiores (ms) de los intervalos del histograma; el último
+# intervalo recoge todo lo que supera el mayor límite
+HISTOGRAM_BOUNDS_MS = (
+    0.01, 0.05, 0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000, 5000,
+)
+
+PROFILE_MODES = ("cprofile", "tracemalloc")
+
+# Funciones o líneas que se guardan por operación perfilada
+PROFILE_TOP = 15
+
+_enabled = False
+_profile_mode = None
+_operations = {}
+_lock = threading.Lock()
+# Por hilo: operaciones en curso (solo se perfila la más externa) y
+# tiempo esperando a input() dentro de ellas
+_local = threading.local()
+_original_input = builtins.input
+
+
+class OperationStats:
+    """
+    Contadores e histograma de una operación.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.errors = 0
+        self.total = 0.0
+        self.minimum = None
+        self.maximum = 0.0
+        self.histogram = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+        self.profile = None
+        self.allocations = {}
+        self.peak = 0
+
+    def record(self, elapsed, failed):
+        """
+        Anotar una llamada de 'elapsed' segundos.
+        """
+        self.calls += 1
+        self.errors += failed
+        self.total += elapsed
+        if self.minimum is None or elapsed < self.minimum:
+            self.minimum = elapsed
+        self.maximum = max(self.maximum, elapsed)
+
+        elapsed_ms = elapsed * 1000
+        for index, bound in enumerate(HISTOGRAM_BOUNDS_MS):
+            if elapsed_ms <= bound:
+                break
+        else:
+            index = len(HISTOGRAM_BOUNDS_MS)
+        self.histogram[index] += 1
+
+    def percentile(self, fraction):
+        """
+        Estimar un percentil (0..1) en ms: el límite superior del
+        intervalo del histograma donde cae (o el máximo si es menor).
+        """
+        if not self.calls:
+            return 0.0
+        target = fraction * self.calls
+        seen = 0
+        for index, count in enumerate(self.histogram):
+            seen += count
+            if seen >= target and count:
+                break
+        if index < len(HISTOGRAM_BOUNDS_MS):
+            return min(HISTOGRAM_BOUNDS_MS[index], self.maximum * 1000)
+        return self.maximum * 1000
+
+    def add_profile(self, profiler):
+        if self.profile is None:
+            self.profile = pstats.Stats(profiler)
+        else:
+            self.profile.add(profiler)
+
+    def add_allocations(self, snapshot, peak):
+        self.peak = max(self.peak, peak)
+        for stat in snapshot.statistics("lineno"):
+            frame = stat.traceback[0]
+            key = f"{frame.filename}:{frame.lineno}"
+            size, count = self.allocations.get(key, (0, 0))
+            self.allocations[key] = (size + stat.size, count + stat.count)
+
+    def top_functions(self, limit=PROFILE_TOP):
+        """
+        Funciones con más tiempo acumulado (cProfile), mayores primero.
+        """
+        if self.profile is None:
+            return []
+        rows = []
+        for (filename, line, function), values in self.profile.stats.items():
+            _, calls, own_time, cumulative, _ = values
+            rows.append(
+                {
+                    "function": f"{function} ({filename}:{line})",
+                    "calls": calls,
+                    "tottime_ms": own_time * 1000,
+                    "cumtime_ms": cumulative * 1000,
+                }
+            )
+        rows.sort(key=lambda row: row["cumtime_ms"], reverse=True)
+        return rows[:limit]
+
+    def top_allocations(self, limit=PROFILE_TOP):
+        """
+        Líneas que más memoria reservaron (tracemalloc), mayores primero.
+        """
+        ordered = sorted(
+            self.allocations.items(), key=lambda item: item[1][0], reverse=True
+        )
+        return [
+            {"line": line, "size_kib": size / 1024, "blocks": count}
+            for line, (size, count) in ordered[:limit]
+        ]
+
+    def to_dict(self):
+        calls = self.calls or 1
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "total_ms": self.total * 1000,
+            "mean_ms": self.total * 1000 / calls,
+            "min_ms": (self.minimum or 0.0) * 1000,
+            "max_ms": self.maximum * 1000,
+            "p50_ms": self.percentile(0.50),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "histogram": [
+                {"le_ms": bound, "count": count}
+                for bound, count in zip(
+                    HISTOGRAM_BOUNDS_MS + (None,), self.histogram
+                )
+            ],
+            "top_functions": self.top_functions(),
+            "top_allocations": self.top_allocations(),
+            "peak_kib": self.peak / 1024,
+        }
+
+
+# ============================================================
+# Configuración
+# ============================================================
+
+def enable(active=True):
+    """
+    Activar o desactivar la instrumentación.
+    """
+    global _enabled
+    _enabled = active
+    builtins.input = _timed_input if active else _original_input
+
+
+def is_enabled():
+    return _enabled
+
+
+def set_profile_mode(mode):
+    """
+    Perfilar cada operación con 'cprofile' o 'tracemalloc' (None =
+    solo contadores).
+    """
+    global _profile_mode
+    if mode is not None and mode not in PROFILE_MODES:
+        raise ValueError(f"Unknown profile mode: {mode}")
+    _profile_mode = mode
+
+
+def get_profile_mode():
+    return _profile_mode
+
+
+def reset():
+    """
+    Borrar todo lo medido hasta ahora.
+    """
+    with _lock:
+        _operations.clear()
+
+
+# ============================================================
+# Medición
+# ============================================================
+
+def run(name, func, *args, **kwargs):
+    """
+    Ejecutar func(*args, **kwargs) anotando su duración bajo 'name'.
+
+    Con la instrumentación desactivada solo llama a la función.
+    """
+    if not _enabled:
+        return func(*args, **kwargs)
+
+    depth = getattr(_local, "depth", 0)
+    # Solo la operación más externa se perfila (cProfile y tracemalloc
+    # no se pueden anidar)
+    mode = _profile_mode if depth == 0 else None
+    profiler = None
+    if mode == "cprofile":
+        profiler = cProfile.Profile()
+    elif mode == "tracemalloc" and tracemalloc.is_tracing():
+        mode = None
+
+    _local.depth = depth + 1
+    waited_before = getattr(_local, "waited", 0.0)
+    failed = False
+    if mode == "tracemalloc":
+        tracemalloc.start()
+    start = time.perf_counter()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        return func(*args, **kwargs)
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        elapsed = time.perf_counter() - start
+        _local.depth = depth
+        elapsed -= getattr(_local, "waited", 0.0) - waited_before
+        if depth == 0:
+            _local.waited = 0.0
+
+        snapshot = None
+        if mode == "tracemalloc":
+            # Sin las reservas de este propio módulo
+            snapshot = tracemalloc.take_snapshot().filter_traces(
+                (tracemalloc.Filter(False, __file__),)
+            )
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+        with _lock:
+            stats = _operations.get(name)
+            if stats is None:
+                stats = _operations[name] = OperationStats(name)
+            stats.record(max(elapsed, 0.0), failed)
+            if profiler is not None:
+                stats.add_profile(profiler)
+            if snapshot is not None:
+                stats.add_allocations(snapshot, peak)
+
+
+def instrumented(name):
+    """
+    Decorador: medir cada llamada a la función con run(name, ...).
+    """
+
+    def decorate(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            return run(name, func, *args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def _timed_input(prompt=""):
+    # input() que anota la espera para descontarla de la operación
+    start = time.perf_counter()
+    try:
+        return _original_input(prompt)
+    finally:
+        _local.waited = (
+            getattr(_local, "waited", 0.0) + time.perf_counter() - start
+        )
+
+
+# ============================================================
+# Resultados
+# ============================================================
+
+def snapshot():
+    """
+    Devolver lo medido como diccionario (serializable a JSON).
+    """
+    with _lock:
+        operations = {
+            name: stats.to_dict() for name, stats in _operations.items()
+        }
+    return {
+        "enabled": _enabled,
+        "profile_mode": _profile_mode,
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "operations": operations,
+    }
+
+
+def dump(path):
+    """
+    Guardar lo medido en un archivo JSON.
+    """
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(snapshot(), f, indent=2)
+
+
+def print_stats(show_profiles=True):
+    """
+    Mostrar contadores, latencias e histogramas de cada operación
+    (las más costosas primero) y, si hay, sus perfiles.
+    """
+    data = snapshot()
+    operations = sorted(
+        data["operations"].items(),
+        key=lambda item: item[1]["total_ms"],
+        reverse=True,
+    )
+    if not operations:
+        print("No operations recorded yet.")
+        return
+
+    print(
+        "Operation                      |  Calls | Errors |  Total (ms) "
+        "|  Mean (ms) |  p95 (ms) |   Max (ms)"
+    )
+    for name, stats in operations:
+        print(
+            f"{name:<30} | {stats['calls']:>6} | {stats['errors']:>6} | "
+            f"{stats['total_ms']:>11.2f} | {stats['mean_ms']:>10.3f} | "
+            f"{stats['p95_ms']:>9.3f} | {stats['max_ms']:>10.3f}"
+        )
+
+    for name, stats in operations:
+        print(f"\n{name} (latency histogram)")
+        widest = max(bucket["count"] for bucket in stats["histogram"])
+        for bucket in stats["histogram"]:
+            if not bucket["count"]:
+                continue
+            label = (
+                f"<= {bucket['le_ms']:g} ms"
+                if bucket["le_ms"] is not None
+                else f"> {HISTOGRAM_BOUNDS_MS[-1]:g} ms"
+            )
+            bar = "#" * max(1, round(30 * bucket["count"] / widest))
+            print(f"  {label:>12} | {bucket['count']:>6} {bar}")
+
+        if not show_profiles:
+            continue
+        if stats["top_functions"]:
+            print("  Top functions (cumulative ms / own ms / calls):")
+            for row in stats["top_functions"]:
+                print(
+                    f"  {row['cumtime_ms']:>10.2f} {row['tottime_ms']:>10.2f} "
+                    f"{row['calls']:>8}  {row['function']}"
+                )
+        if stats["peak_kib"]:
+            print(f"  Peak memory: {stats['peak_kib']:.1f} KiB")
+        if stats["top_allocations"]:
+            print("  Top allocations (KiB / blocks):")
+            for row in stats["top_allocations"]:
+                print(
+                    f"  {row['size_kib']:>10.1f} {row['blocks']:>8}  "
+                    f"{row['line']}"
+                )
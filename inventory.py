@@ -3,10 +3,13 @@
 Módulo de inventario: operaciones CRUD sobre productos.
 """
 
+from models import Product
 from utils import (
+    PAGE_SIZE,
     input_non_empty_string,
     input_int,
     input_float,
+    paginate,
     print_error,
     print_success,
 )
@@ -17,56 +20,162 @@ def get_next_product_id(inventory):
     Obtener el siguiente ID disponible para un producto.
 
     - Si el inventario está vacío, devuelve 1.
-    - Si ya hay productos, toma el máximo id y suma 1.
-      Esto permite que, aunque se borren productos, no se repitan IDs.
+    - Si ya hay productos, devuelve el mayor ID usado más 1.
+      Aunque se borren productos, no se repiten IDs.
+
+    El inventario guarda un IdAllocator inicializado al cargarse,
+    así que no se recorre la colección en cada alta.
     """
-    if not inventory:
-        return 1
-    max_id = max(p["id"] for p in inventory)
-    return max_id + 1
+    return inventory.next_id()
 
 
 def find_product_by_id(inventory, product_id):
     """
     Buscar un producto por su ID dentro del inventario.
 
-    - inventory: lista de diccionarios de productos
+    - inventory: store.Inventory con los productos
     - product_id: entero con el ID a buscar
 
+    La búsqueda usa el índice por ID del inventario (O(1)),
+    sin recorrer la lista de productos.
+
     Devuelve:
-    - el producto (diccionario) si lo encuentra
+    - el producto (models.Product) si lo encuentra
     - None si no existe
     """
-    for product in inventory:
-        if product["id"] == product_id:
-            return product
-    return None
+    return inventory.get(product_id)
 
 
-def list_products(inventory):
+def format_product(product):
     """
-    Listar todos los productos del inventario.
+    Devolver la línea con la que se muestra un producto en los listados.
+    """
+    return (
+        f"ID: {product.id} | "
+        f"Name: {product.name} | "
+        f"Brand: {product.brand} | "
+        f"Category: {product.category} | "
+        f"Price: {product.unit_price:.2f} | "
+        f"Stock: {product.stock} | "
+        f"Warranty: {product.warranty_months} months | "
+        f"Reorder point: {product.reorder_point}"
+    )
+
+
+def filter_products(
+    inventory,
+    brand=None,
+    category=None,
+    min_id=None,
+    max_id=None,
+):
+    """
+    Devolver la lista de productos que cumplen los filtros indicados.
 
-    Si no hay productos, muestra un mensaje indicando que
-    el inventario está vacío.
+    La marca y la categoría se resuelven con los índices del
+    inventario, así que solo se recorren los productos de esa marca
+    o categoría.
+    """
+    if brand is not None:
+        products = inventory.by_brand(brand)
+    elif category is not None:
+        products = inventory.by_category(category)
+    else:
+        products = inventory
+
+    if category is None and min_id is None and max_id is None:
+        return list(products)
+    return [
+        product
+        for product in products
+        if (category is None or product.category == category)
+        and (min_id is None or product.id >= min_id)
+        and (max_id is None or product.id <= max_id)
+    ]
+
+
+def list_products(inventory, interactive=True, **filters):
+    """
+    Listar los productos del inventario por páginas.
+
+    - filters (opcionales): brand, category, min_id, max_id
+      (ver filter_products).
+    - interactive: si es False solo se muestra la primera página
+      (por ejemplo, antes de pedir un ID para vender o modificar).
+
+    Cada página se escribe de una vez (utils.paginate). Si no hay
+    productos, muestra un mensaje indicando que el inventario está
+    vacío.
     """
     if not inventory:
         print("\nNo products in inventory.\n")
         return
 
-    print("\n--- Inventory ---")
-    for product in inventory:
-        # Se imprime cada campo importante del producto
-        print(
-            f"ID: {product['id']} | "
-            f"Name: {product['name']} | "
-            f"Brand: {product['brand']} | "
-            f"Category: {product['category']} | "
-            f"Price: {product['unit_price']:.2f} | "
-            f"Stock: {product['stock']} | "
-            f"Warranty: {product['warranty_months']} months"
-        )
-    print("-----------------\n")
+    products = filter_products(inventory, **filters)
+    if not products:
+        print("\nNo products match the filter.\n")
+        return
+
+    paginate(
+        products,
+        format_product,
+        "\n--- Inventory ---",
+        "-----------------\n",
+        interactive=interactive,
+    )
+
+
+def browse_products(inventory):
+    """
+    Listar productos desde el menú principal.
+
+    Si el inventario no cabe en una página, primero se ofrece filtrar
+    por marca, categoría o rango de IDs.
+    """
+    filters = {}
+    if len(inventory) > PAGE_SIZE:
+        print("\nFilter products:")
+        print("1. All products")
+        print("2. By brand")
+        print("3. By category")
+        print("4. By ID range")
+        option = input_int("Choose an option (1-4): ", min_value=1)
+        if option == 2:
+            filters["brand"] = input_non_empty_string("Brand: ")
+        elif option == 3:
+            filters["category"] = input_non_empty_string("Category: ")
+        elif option == 4:
+            filters["min_id"] = input_int("From ID: ", min_value=1)
+            filters["max_id"] = input_int("To ID: ", min_value=1)
+
+    list_products(inventory, **filters)
+
+
+# Máximo de resultados que se muestran en una búsqueda
+SEARCH_RESULTS = 100
+
+
+def search_products(inventory):
+    """
+    Buscar productos por nombre, marca o categoría.
+
+    Acepta palabras completas o partes de ellas ("phone" encuentra
+    "Smartphone"); las mejores coincidencias se muestran primero.
+    """
+    query = input_non_empty_string("Search (name, brand or category): ")
+    products = inventory.search(query, limit=SEARCH_RESULTS)
+    if not products:
+        print("\nNo products match the search.\n")
+        return
+
+    paginate(
+        products,
+        format_product,
+        f"\n--- Search results: {query} ---",
+        "-----------------\n",
+    )
+    if len(products) == SEARCH_RESULTS:
+        print(f"(Showing the first {SEARCH_RESULTS} matches.)")
 
 
 def add_product(inventory):
@@ -74,7 +183,8 @@ def add_product(inventory):
     Agregar un nuevo producto al inventario.
 
     Flujo:
-    - Solicita nombre, marca, categoría, precio, stock y garantía.
+    - Solicita nombre, marca, categoría, precio, stock, garantía y
+      punto de pedido (stock con el que salta la alerta de stock bajo).
     - Valida cada campo usando funciones de utils.
     - Asigna un ID automático.
     - Añade el producto a la lista de inventario.
@@ -95,21 +205,25 @@ def add_product(inventory):
     # Validación: garantía no negativa
     warranty = input_int("Warranty (months): ", min_value=0)
 
+    # Validación: punto de pedido no negativo
+    reorder_point = input_int("Reorder point (stock): ", min_value=0)
+
     # Se genera el nuevo ID
     product_id = get_next_product_id(inventory)
 
-    # Diccionario que representa el nuevo producto
-    new_product = {
-        "id": product_id,
-        "name": name,
-        "brand": brand,
-        "category": category,
-        "unit_price": unit_price,
-        "stock": stock,
-        "warranty_months": warranty,
+    # Producto nuevo (models.Product)
+    new_product = Product(
+        id=product_id,
+        name=name,
+        brand=brand,
+        category=category,
+        unit_price=unit_price,
+        stock=stock,
+        warranty_months=warranty,
         # Campo para reportes: cuánto se ha vendido de este producto
-        "total_sold": 0,
-    }
+        total_sold=0,
+        reorder_point=reorder_point,
+    )
 
     # Se añade al inventario
     inventory.append(new_product)
@@ -123,7 +237,8 @@ def update_product(inventory):
     Flujo:
     - Muestra el inventario.
     - Pide el ID del producto a actualizar.
-    - Permite cambiar nombre, marca, categoría, precio, stock y garantía.
+    - Permite cambiar nombre, marca, categoría, precio, stock, garantía
+      y punto de pedido.
     - Si se deja un campo vacío, se conserva el valor anterior.
     - Realiza validaciones básicas para los valores numéricos.
     """
@@ -134,7 +249,8 @@ def update_product(inventory):
         return
 
     # Primero se listan productos para que el usuario vea los IDs
-    list_products(inventory)
+    # (solo la primera página; el listado completo está en el menú)
+    list_products(inventory, interactive=False)
 
     product_id = input_int("Enter product ID to update: ", min_value=1)
     product = find_product_by_id(inventory, product_id)
@@ -146,21 +262,21 @@ def update_product(inventory):
     print("Press ENTER to keep the current value.\n")
 
     # Para cada campo textual, si el usuario escribe algo se actualiza
-    new_name = input(f"New name ({product['name']}): ").strip()
+    new_name = input(f"New name ({product.name}): ").strip()
     if new_name:
-        product["name"] = new_name
+        product.name = new_name
 
-    new_brand = input(f"New brand ({product['brand']}): ").strip()
+    new_brand = input(f"New brand ({product.brand}): ").strip()
     if new_brand:
-        product["brand"] = new_brand
+        product.brand = new_brand
 
-    new_category = input(f"New category ({product['category']}): ").strip()
+    new_category = input(f"New category ({product.category}): ").strip()
     if new_category:
-        product["category"] = new_category
+        product.category = new_category
 
     # Para los campos numéricos, se permite dejar vacío para no cambiar
     new_price_raw = input(
-        f"New unit price ({product['unit_price']}): "
+        f"New unit price ({product.unit_price}): "
     ).strip()
     if new_price_raw:
         try:
@@ -168,23 +284,26 @@ def update_product(inventory):
             if new_price < 0:
                 print_error("Price cannot be negative. Keeping old value.")
             else:
-                product["unit_price"] = new_price
+                product.unit_price = new_price
         except ValueError:
             print_error("Invalid number. Keeping old value.")
 
-    new_stock_raw = input(f"New stock ({product['stock']}): ").strip()
+    new_stock_raw = input(f"New stock ({product.stock}): ").strip()
     if new_stock_raw:
         try:
             new_stock = int(new_stock_raw)
             if new_stock < 0:
                 print_error("Stock cannot be negative. Keeping old value.")
             else:
-                product["stock"] = new_stock
+                # Con el lock del producto, para no pisar una venta
+                # que otra caja esté registrando en ese momento
+                with inventory.product_lock(product.id):
+                    product.stock = new_stock
         except ValueError:
             print_error("Invalid integer. Keeping old value.")
 
     new_warranty_raw = input(
-        f"New warranty months ({product['warranty_months']}): "
+        f"New warranty months ({product.warranty_months}): "
     ).strip()
     if new_warranty_raw:
         try:
@@ -192,10 +311,29 @@ def update_product(inventory):
             if new_warranty < 0:
                 print_error("Warranty cannot be negative. Keeping old value.")
             else:
-                product["warranty_months"] = new_warranty
+                product.warranty_months = new_warranty
+        except ValueError:
+            print_error("Invalid integer. Keeping old value.")
+
+    new_reorder_raw = input(
+        f"New reorder point ({product.reorder_point}): "
+    ).strip()
+    if new_reorder_raw:
+        try:
+            new_reorder = int(new_reorder_raw)
+            if new_reorder < 0:
+                print_error(
+                    "Reorder point cannot be negative. Keeping old value."
+                )
+            else:
+                product.reorder_point = new_reorder
         except ValueError:
             print_error("Invalid integer. Keeping old value.")
 
+    # Avisar al inventario para que actualice sus índices (la marca,
+    # la categoría, el stock o el punto de pedido pueden haber cambiado)
+    inventory.update(product)
+
     print_success("Product updated successfully.")
 
 
@@ -207,7 +345,8 @@ def delete_product(inventory):
     - Muestra el inventario.
     - Pide el ID del producto.
     - Pide confirmación antes de borrar.
-    - Elimina el producto de la lista si el usuario confirma.
+    - Elimina el producto del inventario (y de sus índices)
+      si el usuario confirma.
     """
     print("\n=== Delete Product ===")
 
@@ -215,7 +354,7 @@ def delete_product(inventory):
         print_error("Inventory is empty.")
         return
 
-    list_products(inventory)
+    list_products(inventory, interactive=False)
     product_id = input_int("Enter product ID to delete: ", min_value=1)
     product = find_product_by_id(inventory, product_id)
 
@@ -225,7 +364,7 @@ def delete_product(inventory):
 
     # Confirmación de seguridad
     confirm = input(
-        f"Are you sure you want to delete '{product['name']}'? (y/n): "
+        f"Are you sure you want to delete '{product.name}'? (y/n): "
     ).strip().lower()
 
     if confirm == "y":
@@ -233,3 +372,92 @@ def delete_product(inventory):
         print_success("Product deleted.")
     else:
         print("\nDeletion cancelled.\n")
+
+
+# Campos editables de un producto y su validación (API no interactiva)
+PRODUCT_TEXT_FIELDS = ("name", "brand", "category")
+PRODUCT_NUMBER_FIELDS = {
+    "unit_price": float,
+    "stock": int,
+    "warranty_months": int,
+    "reorder_point": int,
+}
+# Campos que se pueden omitir al crear un producto (models.Product
+# les da su valor por defecto)
+PRODUCT_OPTIONAL_FIELDS = ("reorder_point",)
+
+
+def validate_product_data(data, partial=False):
+    """
+    Validar los datos de un producto sin interacción con el usuario.
+
+    - data: diccionario con los campos de PRODUCT_TEXT_FIELDS y
+      PRODUCT_NUMBER_FIELDS (los mismos que pide add_product).
+    - partial: si es True, solo se validan los campos presentes
+      (para modificaciones). Los de PRODUCT_OPTIONAL_FIELDS nunca
+      son obligatorios.
+
+    Devuelve (campos validados, None) o (None, mensaje de error).
+    """
+    clean = {}
+
+    for field in PRODUCT_TEXT_FIELDS:
+        if field not in data:
+            if partial:
+                continue
+            return None, f"Missing field: {field}"
+        value = str(data[field]).strip()
+        if not value:
+            return None, f"Field '{field}' cannot be empty."
+        clean[field] = value
+
+    for field, convert in PRODUCT_NUMBER_FIELDS.items():
+        if field not in data:
+            if partial or field in PRODUCT_OPTIONAL_FIELDS:
+                continue
+            return None, f"Missing field: {field}"
+        try:
+            value = convert(data[field])
+        except (TypeError, ValueError):
+            return None, f"Field '{field}' must be a number."
+        if value < 0:
+            return None, f"Field '{field}' cannot be negative."
+        clean[field] = value
+
+    return clean, None
+
+
+def create_product(inventory, data):
+    """
+    Crear un producto a partir de un diccionario (sin prompts).
+
+    Devuelve (producto, None) o (None, mensaje de error).
+    """
+    clean, error = validate_product_data(data)
+    if error:
+        return None, error
+
+    product = Product(
+        id=get_next_product_id(inventory), total_sold=0, **clean
+    )
+    inventory.append(product)
+    return product, None
+
+
+def change_product(inventory, product, changes):
+    """
+    Modificar un producto con los campos de 'changes' (sin prompts).
+
+    Se validan todos los campos antes de tocar el producto, así que
+    un cambio inválido no deja el producto a medias.
+
+    Devuelve None o un mensaje de error.
+    """
+    clean, error = validate_product_data(changes, partial=True)
+    if error:
+        return error
+
+    with inventory.product_lock(product.id):
+        product.update(clean)
+    inventory.update(product)
+    return None
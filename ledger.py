@@ -0,0 +1,242 @@
+"""
+Libro de ventas columnar.
+
+En lugar de guardar un diccionario de 13 claves por venta, cada campo
+se guarda en su propio array tipado (módulo array de la biblioteca
+estándar) y los textos repetidos (marca, tipo de cliente, nombres) se
+codifican como índices a una tabla de cadenas.
+
+Para el resto del sistema cada venta se sigue viendo como una venta de
+solo lectura (SaleRow), con los mismos campos que models.Sale (como
+atributos o como claves de diccionario).
+"""
+
+from array import array
+from collections.abc import Mapping
+from datetime import datetime
+
+# Formato de fecha usado en models.create_sale_record
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Columnas numéricas y su código de tipo de array:
+# 'q' = entero de 64 bits, 'd' = flotante de 64 bits
+NUMERIC_COLUMNS = {
+    "id": "q",
+    "product_id": "q",
+    "quantity": "q",
+    "unit_price": "d",
+    "discount_rate": "d",
+    "discount_amount": "d",
+    "gross_amount": "d",
+    "net_amount": "d",
+    "timestamp": "d",
+}
+
+# Columnas de texto codificadas con una tabla de cadenas
+# ('l' = índice a la tabla)
+STRING_COLUMNS = ("customer_name", "customer_type", "product_name", "brand")
+
+# Claves de cada venta, en el mismo orden que create_sale_record
+SALE_FIELDS = (
+    "id",
+    "customer_name",
+    "customer_type",
+    "product_id",
+    "product_name",
+    "brand",
+    "quantity",
+    "unit_price",
+    "discount_rate",
+    "discount_amount",
+    "gross_amount",
+    "net_amount",
+    "date",
+    "timestamp",
+)
+
+
+class StringTable:
+    """
+    Tabla de cadenas: guarda cada texto distinto una sola vez y
+    lo identifica con un código entero.
+    """
+
+    def __init__(self):
+        self.values = []
+        self._codes = {}
+
+    def __len__(self):
+        return len(self.values)
+
+    def encode(self, value):
+        """
+        Devolver el código de un texto, añadiéndolo si es nuevo.
+        """
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.values.append(value)
+            self._codes[value] = code
+        return code
+
+    def code_of(self, value):
+        """
+        Devolver el código de un texto, o None si no está en la tabla.
+        """
+        return self._codes.get(value)
+
+
+class SalesLedger:
+    """
+    Almacenamiento columnar de ventas.
+
+    - columns: nombre de campo -> array tipado con un valor por venta
+    - strings: tabla de cadenas compartida por las columnas de texto
+    """
+
+    def __init__(self):
+        self.columns = {
+            name: array(typecode) for name, typecode in NUMERIC_COLUMNS.items()
+        }
+        for name in STRING_COLUMNS:
+            self.columns[name] = array("l")
+        self.strings = StringTable()
+
+    def __len__(self):
+        return len(self.columns["id"])
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield SaleRow(self, index)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [SaleRow(self, i) for i in range(len(self))[index]]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("sale index out of range")
+        return SaleRow(self, index)
+
+    def append(self, sale):
+        """
+        Añadir una venta (models.Sale o SaleRow) codificándola en las
+        columnas.
+        """
+        timestamp = getattr(sale, "timestamp", None)
+        if timestamp is None:
+            date = datetime.strptime(sale.date, DATE_FORMAT)
+            timestamp = date.timestamp()
+
+        columns = self.columns
+        for name in NUMERIC_COLUMNS:
+            if name != "timestamp":
+                columns[name].append(getattr(sale, name))
+        columns["timestamp"].append(timestamp)
+        for name in STRING_COLUMNS:
+            columns[name].append(self.strings.encode(getattr(sale, name)))
+
+    def extend_columns(self, columns):
+        """
+        Añadir muchas ventas de una vez a partir de columnas (campo ->
+        lista de valores, con todos los campos de NUMERIC_COLUMNS y
+        STRING_COLUMNS; los textos como cadenas). Mucho más rápido que
+        append venta a venta.
+        """
+        names = (*NUMERIC_COLUMNS, *STRING_COLUMNS)
+        if len({len(columns[name]) for name in names}) > 1:
+            raise ValueError("Sale columns have different lengths")
+        for name in NUMERIC_COLUMNS:
+            self.columns[name].extend(columns[name])
+        encode = self.strings.encode
+        for name in STRING_COLUMNS:
+            self.columns[name].extend(map(encode, columns[name]))
+
+    def iter_values(self, fields=SALE_FIELDS):
+        """
+        Recorrer las ventas como tuplas con los campos pedidos, leyendo
+        las columnas directamente (más rápido que usar SaleRow).
+        """
+        strings = self.strings.values
+        readers = []
+        for field in fields:
+            if field == "date":
+                readers.append(_date_reader(self.columns["timestamp"]))
+            elif field in STRING_COLUMNS:
+                column = self.columns[field]
+                readers.append(
+                    lambda i, column=column: strings[column[i]]
+                )
+            else:
+                readers.append(self.columns[field].__getitem__)
+
+        for index in range(len(self)):
+            yield tuple(read(index) for read in readers)
+
+    def value(self, index, field):
+        """
+        Devolver el valor de un campo para la venta en la posición dada.
+        """
+        if field == "date":
+            timestamp = self.columns["timestamp"][index]
+            return datetime.fromtimestamp(timestamp).strftime(DATE_FORMAT)
+        column = self.columns[field]
+        if field in STRING_COLUMNS:
+            return self.strings.values[column[index]]
+        return column[index]
+
+
+def _date_reader(timestamps):
+    """
+    Devolver una función índice -> fecha formateada que reutiliza el
+    último resultado (las ventas consecutivas suelen compartir segundo).
+    """
+    cache = {"timestamp": None, "date": None}
+
+    def read(index):
+        timestamp = timestamps[index]
+        if timestamp != cache["timestamp"]:
+            cache["timestamp"] = timestamp
+            cache["date"] = datetime.fromtimestamp(timestamp).strftime(
+                DATE_FORMAT
+            )
+        return cache["date"]
+
+    return read
+
+
+class SaleRow(Mapping):
+    """
+    Vista de solo lectura de una venta del libro columnar.
+
+    Se lee como models.Sale (sale.net_amount) o como el diccionario
+    original de la venta (sale['net_amount'], sale.get(...),
+    dict(sale)...), pero los valores se leen de las columnas bajo
+    demanda.
+    """
+
+    __slots__ = ("_ledger", "_index")
+
+    def __init__(self, ledger, index):
+        self._ledger = ledger
+        self._index = index
+
+    def __getitem__(self, field):
+        if field not in SALE_FIELDS:
+            raise KeyError(field)
+        return self._ledger.value(self._index, field)
+
+    def __getattr__(self, field):
+        # Solo se llama para nombres que no son atributos de la clase
+        if field not in SALE_FIELDS:
+            raise AttributeError(field)
+        return self._ledger.value(self._index, field)
+
+    def __iter__(self):
+        return iter(SALE_FIELDS)
+
+    def __len__(self):
+        return len(SALE_FIELDS)
+
+    def __repr__(self):
+        return f"SaleRow({dict(self)!r})"
@@ -0,0 +1,234 @@
+"""
+Prueba de carga del servicio HTTP (service.py) en localhost.
+
+Abre muchas conexiones keep-alive a la vez, cada una enviando una mezcla
+de ventas (POST /sales), consultas de productos y reportes, y mide el
+throughput y la latencia (percentiles) por tipo de petición.
+
+Para ejecutarla:
+    python main.py --serve --port 8080          (en otra terminal)
+    python loadtest.py --port 8080 --clients 100 --requests 200
+
+    python loadtest.py --spawn   (arranca y detiene el servicio solo)
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import time
+
+from models import CUSTOMER_DISCOUNTS
+from service import DEFAULT_HOST, DEFAULT_PORT
+
+# Mezcla de peticiones: (nombre, peso)
+REQUEST_MIX = (
+    ("sale", 60),
+    ("product", 20),
+    ("top", 10),
+    ("income", 5),
+    ("brands", 5),
+)
+
+
+class Client:
+    """
+    Conexión HTTP/1.1 keep-alive mínima para la prueba de carga.
+    """
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection(
+            self.host, self.port
+        )
+
+    async def request(self, method, path, payload=None):
+        """
+        Enviar una petición y devolver (estado, datos JSON).
+        """
+        body = b"" if payload is None else json.dumps(payload).encode()
+        self.writer.write(
+            (
+                f"{method} {path} HTTP/1.1\r\n"
+                f"Host: {self.host}\r\n"
+                "Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                "\r\n"
+            ).encode("latin-1")
+            + body
+        )
+        await self.writer.drain()
+
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            if name.lower() == "content-length":
+                length = int(value)
+        return status, json.loads(await self.reader.readexactly(length))
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+async def run_client(host, port, request_count, product_ids, seed, stats):
+    """
+    Enviar request_count peticiones por una conexión y anotar la
+    latencia de cada una en stats[tipo].
+    """
+    rng = random.Random(seed)
+    names = [name for name, _ in REQUEST_MIX]
+    weights = [weight for _, weight in REQUEST_MIX]
+    customer_types = list(CUSTOMER_DISCOUNTS)
+
+    client = Client(host, port)
+    await client.connect()
+    try:
+        for _ in range(request_count):
+            kind = rng.choices(names, weights)[0]
+            if kind == "sale":
+                order = {
+                    "customer_name": f"Customer {rng.randrange(1000)}",
+                    "customer_type": rng.choice(customer_types),
+                    "product_id": rng.choice(product_ids),
+                    "quantity": 1,
+                }
+                request = ("POST", "/sales", order)
+            elif kind == "product":
+                request = ("GET", f"/products/{rng.choice(product_ids)}", None)
+            elif kind == "top":
+                request = ("GET", "/reports/top?k=10", None)
+            elif kind == "income":
+                request = ("GET", "/reports/income", None)
+            else:
+                request = ("GET", "/reports/sales-by-brand", None)
+
+            start = time.perf_counter()
+            status, _ = await client.request(*request)
+            elapsed = time.perf_counter() - start
+            stats.setdefault(kind, []).append(elapsed)
+            if status >= 500:
+                stats.setdefault("errors", []).append(elapsed)
+    finally:
+        await client.close()
+
+
+def percentile(values, fraction):
+    """
+    Percentil (0..1) de una lista ya ordenada.
+    """
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+async def load_test(host, port, client_count, request_count):
+    """
+    Lanzar client_count clientes concurrentes e imprimir el resumen.
+    """
+    setup = Client(host, port)
+    await setup.connect()
+    _, products = await setup.request("GET", "/products")
+    # Stock de sobra para que las ventas no se rechacen por falta de stock
+    for product in products:
+        await setup.request(
+            "PATCH",
+            f"/products/{product['id']}",
+            {"stock": client_count * request_count},
+        )
+    await setup.close()
+    product_ids = [product["id"] for product in products]
+
+    stats = {}
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(
+            run_client(host, port, request_count, product_ids, seed, stats)
+            for seed in range(client_count)
+        )
+    )
+    elapsed = time.perf_counter() - start
+
+    total = client_count * request_count
+    errors = len(stats.pop("errors", []))
+    print(f"Clients: {client_count} | Requests: {total} | Errors: {errors}")
+    print(f"Time: {elapsed:.3f} s | Throughput: {total / elapsed:,.0f} req/s")
+    print("Request  |  Count |  p50 (ms) |  p95 (ms) |  p99 (ms)")
+    for kind, latencies in sorted(stats.items()):
+        latencies.sort()
+        print(
+            f"{kind:<8} | {len(latencies):>6} | "
+            f"{percentile(latencies, 0.50) * 1000:>9.2f} | "
+            f"{percentile(latencies, 0.95) * 1000:>9.2f} | "
+            f"{percentile(latencies, 0.99) * 1000:>9.2f}"
+        )
+
+
+async def wait_for_port(host, port, timeout=10.0):
+    """
+    Esperar a que el servicio acepte conexiones.
+    """
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection(host, port)
+        except OSError:
+            if time.perf_counter() > deadline:
+                raise
+            await asyncio.sleep(0.05)
+            continue
+        writer.close()
+        return
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument(
+        "--spawn",
+        action="store_true",
+        help="Start 'main.py --serve' for the test and stop it afterwards",
+    )
+    args = parser.parse_args()
+
+    server = None
+    if args.spawn:
+        server = subprocess.Popen(
+            [
+                sys.executable,
+                "main.py",
+                "--serve",
+                "--host",
+                args.host,
+                "--port",
+                str(args.port),
+            ],
+            stdout=subprocess.DEVNULL,
+        )
+    try:
+        asyncio.run(wait_for_port(args.host, args.port))
+        asyncio.run(
+            load_test(args.host, args.port, args.clients, args.requests)
+        )
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -5,17 +5,56 @@ gestión de inventario y ventas.
 
 Para ejecutar el programa:
     python main.py
+    python main.py --data-dir data   (guarda los datos en disco)
+    python main.py --backend sqlite --db inventory.db
+    python main.py --import-sales ventas.csv --export-sales copia.csv
+    python main.py --sales-batch pedidos.csv   (registrar ventas en lote)
+    python main.py --serve --port 8080   (servicio HTTP/JSON, service.py)
+    python main.py --instrument --profile cprofile   (instrumentation.py)
+    python main.py --pricing-rules reglas.json   (descuentos, pricing.py)
 """
 
+import argparse
+
+from alerts import LowStockAlerts
 from models import create_initial_inventory
-from utils import input_int, pause
-from inventory import list_products, add_product, update_product, delete_product
-from sales import register_sale, show_sales_history
+from store import Inventory, SalesHistory
+from persistence import load_state
+from sqlite_store import open_database
+import csv_io
+import instrumentation
+import pricing
+from instrumentation import run
+import service
+from utils import (
+    input_int,
+    input_non_empty_string,
+    pause,
+    print_error,
+    print_success,
+)
+from inventory import (
+    browse_products,
+    search_products,
+    add_product,
+    update_product,
+    delete_product,
+)
+from sales import register_sale, show_sales_history, process_sales
 from reports import (
     top_3_products,
     sales_by_brand,
     income_report,
     inventory_performance_report,
+    check_report_aggregates,
+    top_k_report,
+    choose_report_backend,
+    period_report,
+    top_customers_report,
+    customer_report,
+    customer_type_report,
+    low_stock_report,
+    stock_cover_report,
 )
 
 
@@ -36,6 +75,8 @@ def show_main_menu():
     print("5. Register sale")
     print("6. Show sales history")
     print("7. Reports")
+    print("8. Search products")
+    print("9. Instrumentation")
     print("0. Exit")
     print("=========================================")
 
@@ -49,12 +90,29 @@ def show_reports_menu():
     - Ventas por marca
     - Ingresos brutos y netos
     - Rendimiento del inventario
+    - Verificación de los agregados de reportes
+    - Top K configurable (por unidades o ingresos, marca o categoría)
+    - Elección del backend de cálculo (Python, NumPy o en paralelo)
+    - Ingresos y ventas por marca de un periodo
+    - Top K clientes, compras de un cliente y ventas por tipo de
+      cliente (registro de clientes)
+    - Productos en stock bajo (en su punto de pedido o por debajo)
+    - Velocidad de venta y días de cobertura del stock
     """
     print("\n========== Reports Menu ==========")
     print("1. Top 3 best-selling products")
     print("2. Sales by brand")
     print("3. Income report (gross and net)")
     print("4. Inventory performance")
+    print("5. Check report aggregates")
+    print("6. Top K products (custom)")
+    print("7. Report backend (python / numpy / parallel)")
+    print("8. Sales for a period (today, this week, last month...)")
+    print("9. Top K customers")
+    print("10. Customer purchases and lifetime value")
+    print("11. Sales by customer type (share of revenue)")
+    print("12. Low stock (at or below reorder point)")
+    print("13. Sales velocity and days of stock cover")
     print("0. Back to main menu")
     print("==================================")
 
@@ -75,16 +133,57 @@ def handle_reports_menu(inventory, sales_history):
         choice = input_int("Choose an option: ")
 
         if choice == 1:
-            top_3_products(inventory)
+            run("report.top_3_products", top_3_products, inventory)
             pause()
         elif choice == 2:
-            sales_by_brand(sales_history)
+            run("report.sales_by_brand", sales_by_brand, sales_history)
             pause()
         elif choice == 3:
-            income_report(sales_history)
+            run("report.income", income_report, sales_history)
             pause()
         elif choice == 4:
-            inventory_performance_report(inventory)
+            run(
+                "report.inventory_performance",
+                inventory_performance_report,
+                inventory,
+            )
+            pause()
+        elif choice == 5:
+            run(
+                "report.check_aggregates",
+                check_report_aggregates,
+                inventory,
+                sales_history,
+            )
+            pause()
+        elif choice == 6:
+            run("report.top_k", top_k_report, inventory)
+            pause()
+        elif choice == 7:
+            choose_report_backend()
+            pause()
+        elif choice == 8:
+            run("report.period", period_report, sales_history)
+            pause()
+        elif choice == 9:
+            run("report.top_customers", top_customers_report, sales_history)
+            pause()
+        elif choice == 10:
+            run("report.customer", customer_report, sales_history)
+            pause()
+        elif choice == 11:
+            run("report.customer_types", customer_type_report, sales_history)
+            pause()
+        elif choice == 12:
+            run("report.low_stock", low_stock_report, inventory)
+            pause()
+        elif choice == 13:
+            run(
+                "report.stock_cover",
+                stock_cover_report,
+                inventory,
+                sales_history,
+            )
             pause()
         elif choice == 0:
             # Salir del submenú de reportes y volver al menú principal
@@ -93,21 +192,309 @@ def handle_reports_menu(inventory, sales_history):
             print("Invalid option. Please try again.\n")
 
 
+def show_instrumentation_menu():
+    """
+    Mostrar el submenú de instrumentación (instrumentation.py).
+
+    Indica si está activa y el modo de perfilado actual.
+    """
+    state = "on" if instrumentation.is_enabled() else "off"
+    mode = instrumentation.get_profile_mode() or "none"
+    print("\n======= Instrumentation Menu =======")
+    print(f"Status: {state} | Profiling: {mode}")
+    print("1. Show operation statistics")
+    print("2. Turn instrumentation on / off")
+    print("3. Profiling (none / cprofile / tracemalloc)")
+    print("4. Save statistics to a JSON file")
+    print("5. Reset statistics")
+    print("0. Back to main menu")
+    print("====================================")
+
+
+def handle_instrumentation_menu():
+    """
+    Manejar el submenú de instrumentación: ver contadores, latencias
+    y perfiles de cada operación, activarla, elegir el perfilado y
+    guardar los resultados.
+    """
+    while True:
+        show_instrumentation_menu()
+        choice = input_int("Choose an option: ")
+
+        if choice == 1:
+            print()
+            instrumentation.print_stats()
+            pause()
+        elif choice == 2:
+            instrumentation.enable(not instrumentation.is_enabled())
+            state = "on" if instrumentation.is_enabled() else "off"
+            print_success(f"Instrumentation turned {state}.")
+        elif choice == 3:
+            modes = (None,) + instrumentation.PROFILE_MODES
+            print("\nProfiling mode:")
+            for number, mode in enumerate(modes, start=1):
+                print(f"{number}. {mode or 'none'}")
+            option = input_int(
+                f"Choose an option (1-{len(modes)}): ", min_value=1
+            )
+            if option > len(modes):
+                print_error("Invalid option.")
+                continue
+            instrumentation.set_profile_mode(modes[option - 1])
+            if modes[option - 1] and not instrumentation.is_enabled():
+                instrumentation.enable()
+            print_success(
+                f"Profiling mode: {modes[option - 1] or 'none'}."
+            )
+        elif choice == 4:
+            path = input_non_empty_string("File name: ")
+            try:
+                instrumentation.dump(path)
+            except OSError as e:
+                print_error(f"Could not save the statistics: {e}")
+            else:
+                print_success(f"Statistics saved to {path}.")
+        elif choice == 5:
+            instrumentation.reset()
+            print_success("Statistics reset.")
+        elif choice == 0:
+            break
+        else:
+            print("Invalid option. Please try again.\n")
+
+
+def parse_args():
+    """
+    Leer las opciones de línea de comandos.
+    """
+    parser = argparse.ArgumentParser(
+        description="Inventory and Sales Management System"
+    )
+    parser.add_argument(
+        "--backend",
+        choices=("memory", "sqlite"),
+        default="memory",
+        help="Storage backend (default: memory)",
+    )
+    parser.add_argument(
+        "--db",
+        default="inventory.db",
+        help="SQLite database file for --backend sqlite",
+    )
+    parser.add_argument(
+        "--data-dir",
+        help="Directory to persist inventory and sales (default: memory)",
+    )
+    parser.add_argument(
+        "--fsync-every",
+        type=int,
+        default=1,
+        help="Force the journal to disk every N entries (default: 1)",
+    )
+    parser.add_argument(
+        "--snapshot-every",
+        type=int,
+        default=1000,
+        help="Write an inventory snapshot every N journal entries",
+    )
+    parser.add_argument("--import-products", metavar="CSV")
+    parser.add_argument("--import-sales", metavar="CSV")
+    parser.add_argument(
+        "--apply-sales-to-stock",
+        action="store_true",
+        help="Imported sales also reduce stock and increase total_sold",
+    )
+    parser.add_argument(
+        "--sales-batch",
+        metavar="FILE",
+        help="Register the orders in a CSV or JSON Lines file",
+    )
+    parser.add_argument("--export-products", metavar="CSV")
+    parser.add_argument("--export-sales", metavar="CSV")
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=csv_io.DEFAULT_BATCH_SIZE,
+        help="Rows per batch when importing CSV files",
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Run the HTTP/JSON service instead of the console menu",
+    )
+    parser.add_argument(
+        "--pricing-rules",
+        metavar="JSON",
+        help="Discount rules file (default: discount by customer type)",
+    )
+    parser.add_argument(
+        "--instrument",
+        action="store_true",
+        help="Record per-operation counters and latencies from the start",
+    )
+    parser.add_argument(
+        "--profile",
+        choices=instrumentation.PROFILE_MODES,
+        help="Profile each operation (implies --instrument)",
+    )
+    parser.add_argument(
+        "--stats-file",
+        metavar="JSON",
+        help="Save the instrumentation statistics here on exit",
+    )
+    parser.add_argument("--host", default=service.DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=service.DEFAULT_PORT)
+    args = parser.parse_args()
+    if args.backend == "sqlite" and args.data_dir:
+        parser.error("--data-dir only applies to the memory backend")
+    if args.pricing_rules:
+        try:
+            rules = pricing.load_rules(args.pricing_rules)
+            pricing.set_pricing_engine(pricing.PricingEngine(rules))
+        except (OSError, ValueError) as error:
+            parser.error(f"--pricing-rules: {error}")
+    return args
+
+
+def run_csv_commands(args, inventory, sales_history):
+    """
+    Ejecutar las importaciones y exportaciones CSV pedidas por línea
+    de comandos (primero las importaciones).
+
+    Devuelve True si se ejecutó alguna.
+    """
+    done = False
+
+    if args.import_products:
+        imported, errors = csv_io.import_products(
+            inventory, args.import_products, args.batch_size
+        )
+        _report_import("products", imported, errors)
+        done = True
+
+    if args.import_sales:
+        imported, errors = csv_io.import_sales(
+            inventory,
+            sales_history,
+            args.import_sales,
+            apply_to_stock=args.apply_sales_to_stock,
+            batch_size=args.batch_size,
+        )
+        _report_import("sales", imported, errors)
+        done = True
+
+    if args.sales_batch:
+        run_sales_batch(args.sales_batch, inventory, sales_history, args)
+        done = True
+
+    if args.export_products:
+        count = csv_io.write_products_csv(args.export_products, inventory)
+        print(f"Exported {count} products to {args.export_products}")
+        done = True
+
+    if args.export_sales:
+        count = csv_io.write_sales_csv(args.export_sales, sales_history)
+        print(f"Exported {count} sales to {args.export_sales}")
+        done = True
+
+    return done
+
+
+def run_sales_batch(path, inventory, sales_history, args):
+    """
+    Registrar las ventas de un archivo de pedidos con process_sales,
+    por lotes, y mostrar un resumen con los pedidos rechazados.
+    """
+    processed = 0
+    failures = []
+
+    for batch in csv_io.batched(csv_io.iter_orders(path), args.batch_size):
+        for position, result in enumerate(
+            process_sales(inventory, sales_history, batch),
+            start=processed + 1,
+        ):
+            if not result["ok"]:
+                failures.append(f"order {position}: {result['error']}")
+        processed += len(batch)
+
+    print(
+        f"Processed {processed} orders: "
+        f"{processed - len(failures)} sales registered, "
+        f"{len(failures)} rejected."
+    )
+    for failure in failures[:10]:
+        print_error(failure)
+    if len(failures) > 10:
+        print(f"... and {len(failures) - 10} more rejected orders.")
+
+
+def _report_import(kind, imported, errors):
+    """
+    Mostrar el resumen de una importación CSV.
+    """
+    print(f"Imported {imported} {kind}.")
+    for error in errors[:10]:
+        print_error(error)
+    if len(errors) > 10:
+        print(f"... and {len(errors) - 10} more errors.")
+
+
 def main():
     """
     Punto de entrada de la aplicación.
 
     Responsabilidades:
-    - Crear el inventario inicial con 5 productos (requisito).
-    - Crear la lista vacía de historial de ventas.
+    - Crear el inventario inicial con 5 productos (requisito), o
+      cargarlo desde disco si se indica --data-dir o --backend sqlite.
+    - Crear (o recuperar) el historial de ventas.
     - Controlar el bucle principal del menú.
     - Manejar algunas excepciones para que el programa
       no se cierre de forma abrupta.
     """
-    # Inventario inicial precargado
-    inventory = create_initial_inventory()
-    # Historial de ventas inicialmente vacío
-    sales_history = []
+    args = parse_args()
+    if args.instrument or args.profile or args.stats_file:
+        instrumentation.enable()
+        instrumentation.set_profile_mode(args.profile)
+    # Objeto a cerrar al salir (diario de persistencia o base SQLite)
+    persistence = None
+
+    if args.backend == "sqlite":
+        # Inventario e historial en SQLite (mismas operaciones)
+        inventory, sales_history, persistence = open_database(
+            args.db, create_initial_inventory()
+        )
+    elif args.data_dir:
+        # Snapshot + diario: cada cambio se guarda al momento
+        inventory, sales_history, persistence = load_state(
+            args.data_dir,
+            create_initial_inventory(),
+            fsync_every=args.fsync_every,
+            snapshot_every=args.snapshot_every,
+        )
+    else:
+        # Inventario inicial precargado, envuelto en el store con índices
+        inventory = Inventory(create_initial_inventory())
+        # Historial de ventas inicialmente vacío
+        sales_history = SalesHistory()
+
+    # Modo no interactivo: importar / exportar CSV y salir
+    if run_csv_commands(args, inventory, sales_history):
+        if persistence is not None:
+            persistence.close()
+        return
+
+    # Modo servicio: atender peticiones HTTP hasta Ctrl+C
+    if args.serve:
+        service.run(
+            inventory, sales_history, persistence, args.host, args.port
+        )
+        if persistence is not None:
+            persistence.close()
+        return
+
+    # Avisar en la consola cuando una venta o una modificación deja un
+    # producto en su punto de pedido
+    inventory.listeners.append(LowStockAlerts(echo=True))
 
     # Bucle principal del programa
     while True:
@@ -116,26 +503,36 @@ def main():
             choice = input_int("Choose an option: ")
 
             if choice == 1:
-                list_products(inventory)
+                run("product.list", browse_products, inventory)
                 pause()
             elif choice == 2:
-                add_product(inventory)
+                run("product.add", add_product, inventory)
                 pause()
             elif choice == 3:
-                update_product(inventory)
+                run("product.update", update_product, inventory)
                 pause()
             elif choice == 4:
-                delete_product(inventory)
+                run("product.delete", delete_product, inventory)
                 pause()
             elif choice == 5:
-                register_sale(inventory, sales_history)
+                run("sale.register", register_sale, inventory, sales_history)
                 pause()
             elif choice == 6:
-                show_sales_history(sales_history)
+                run("sale.history", show_sales_history, sales_history)
                 pause()
             elif choice == 7:
                 handle_reports_menu(inventory, sales_history)
+            elif choice == 8:
+                run("product.search", search_products, inventory)
+                pause()
+            elif choice == 9:
+                handle_instrumentation_menu()
             elif choice == 0:
+                if persistence is not None:
+                    persistence.close()
+                if args.stats_file:
+                    instrumentation.dump(args.stats_file)
+                    print(f"Instrumentation saved to {args.stats_file}.")
                 print("\nExiting the program. Goodbye!\n")
                 break
             else:
@@ -3,8 +3,12 @@
 Modelos de dominio y constantes para el sistema de inventario y ventas.
 """
 
+from collections import deque
+from collections.abc import MutableMapping
 from datetime import datetime
 
+from ledger import SALE_FIELDS
+
 # Diccionario con los tipos de cliente y su descuento asociado (en forma decimal)
 # regular -> 0%, vip -> 10%, wholesale -> 15%
 CUSTOMER_DISCOUNTS = {
@@ -13,12 +17,160 @@ CUSTOMER_DISCOUNTS = {
     "wholesale": 0.15,
 }
 
+# Campos de un producto, en el orden en que se muestran y se guardan
+PRODUCT_FIELDS = (
+    "id",
+    "name",
+    "brand",
+    "category",
+    "unit_price",
+    "stock",
+    "warranty_months",
+    "total_sold",
+    "reorder_point",
+)
+
+# Punto de pedido por defecto: con este stock o menos el producto
+# aparece como "stock bajo" (ver store.Inventory.below_reorder_point)
+DEFAULT_REORDER_POINT = 5
+
+
+class Record(MutableMapping):
+    """
+    Registro compacto con __slots__: los valores se guardan en huecos
+    fijos del objeto, sin un diccionario por registro ni las claves
+    repetidas en cada uno.
+
+    El código nuevo lee y escribe atributos (product.stock). Para no
+    romper el formato anterior, el registro también se comporta como
+    el diccionario de siempre: product["stock"], product.get(...),
+    dict(product), "timestamp" in sale... (más lento que el atributo).
+    Un campo que no se ha asignado se comporta como una clave que no
+    está en el diccionario.
+
+    Las subclases definen FIELDS y __slots__ = FIELDS.
+    """
+
+    __slots__ = ()
+    FIELDS = ()
+
+    def __init__(self, **values):
+        for field, value in values.items():
+            try:
+                setattr(self, field, value)
+            except AttributeError:
+                raise KeyError(field) from None
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Crear un registro a partir de un diccionario (o registro) con
+        las mismas claves; las claves desconocidas dan KeyError.
+        """
+        if type(data) is cls:
+            return data
+        return cls(**data)
+
+    @classmethod
+    def from_columns(cls, columns):
+        """
+        Crear muchos registros a la vez a partir de columnas (campo ->
+        lista de valores, todas del mismo largo), por ejemplo desde un
+        snapshot binario. Asigna cada campo a todos los registros de
+        una vez: mucho más rápido que crear cada uno con sus claves.
+        """
+        count = len(next(iter(columns.values()), ()))
+        records = [object.__new__(cls) for _ in range(count)]
+        for field, values in columns.items():
+            if field not in cls.FIELDS:
+                raise KeyError(field)
+            # deque(maxlen=0) consume el map sin guardar los None
+            deque(map(getattr(cls, field).__set__, records, values), 0)
+        return records
+
+    def to_dict(self):
+        """
+        Devolver una copia como diccionario normal (para JSON, CSV...).
+        """
+        return dict(self)
+
+    def __getitem__(self, field):
+        if field not in self.FIELDS:
+            raise KeyError(field)
+        try:
+            return getattr(self, field)
+        except AttributeError:
+            raise KeyError(field) from None
+
+    def __setitem__(self, field, value):
+        if field not in self.FIELDS:
+            raise KeyError(field)
+        setattr(self, field, value)
+
+    def __delitem__(self, field):
+        raise TypeError(f"Cannot delete field '{field}'")
+
+    def __iter__(self):
+        for field in self.FIELDS:
+            if hasattr(self, field):
+                yield field
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({dict(self)!r})"
+
+    # Copias y pickle (multiprocessing) sin __dict__
+    def __getstate__(self):
+        return dict(self)
+
+    def __setstate__(self, state):
+        for field, value in state.items():
+            setattr(self, field, value)
+
+    def copy(self):
+        return type(self)(**self)
+
+
+class Product(Record):
+    """
+    Producto del inventario (ver PRODUCT_FIELDS).
+    """
+
+    FIELDS = PRODUCT_FIELDS
+    __slots__ = FIELDS
+
+    def __init__(self, **values):
+        # Los productos guardados antes de existir reorder_point no lo
+        # traen (diario, snapshots, CSV...)
+        self.reorder_point = DEFAULT_REORDER_POINT
+        super().__init__(**values)
+
+    @classmethod
+    def from_columns(cls, columns):
+        if "reorder_point" not in columns:
+            count = len(next(iter(columns.values()), ()))
+            columns = dict(
+                columns, reorder_point=[DEFAULT_REORDER_POINT] * count
+            )
+        return super().from_columns(columns)
+
+
+class Sale(Record):
+    """
+    Venta registrada (ver ledger.SALE_FIELDS y create_sale_record).
+    """
+
+    FIELDS = SALE_FIELDS
+    __slots__ = FIELDS
+
 
 def create_initial_inventory():
     """
     Crear el inventario inicial con 5 productos precargados.
 
-    Cada producto es un diccionario con:
+    Cada producto es un Product con:
     - id: identificador único del producto
     - name: nombre del producto
     - brand: marca
@@ -27,8 +179,10 @@ def create_initial_inventory():
     - stock: cantidad en inventario
     - warranty_months: garantía en meses
     - total_sold: cantidad total vendida (para reportes)
+    - reorder_point: stock a partir del cual hay que reponer
+      (DEFAULT_REORDER_POINT)
     """
-    return [
+    products = [
         {
             "id": 1,
             "name": "Smartphone X100",
@@ -80,6 +234,7 @@ def create_initial_inventory():
             "total_sold": 0,
         },
     ]
+    return [Product.from_dict(product) for product in products]
 
 
 def create_sale_record(
@@ -89,41 +244,59 @@ def create_sale_record(
     product,
     quantity,
     discount_rate,
+    now=None,
 ):
     """
-    Crear y devolver un diccionario que representa una venta.
+    Crear y devolver la venta (Sale).
 
     Parámetros:
     - sale_id: identificador único de la venta
     - customer_name: nombre del cliente
     - customer_type: tipo de cliente (regular, vip, wholesale)
-    - product: diccionario de producto tomado del inventario
+    - product: producto tomado del inventario
     - quantity: cantidad vendida
     - discount_rate: tasa de descuento en forma decimal (0.10 = 10%)
+    - now (opcional): (fecha 'YYYY-MM-DD HH:MM:SS', timestamp) de la
+      venta, para que todas las líneas de un pedido compartan la fecha
+      (ver sale_time); por defecto, el momento actual
 
     Cálculos:
     - gross_amount: total bruto (precio * cantidad)
     - discount_amount: valor del descuento aplicado
     - net_amount: total neto después del descuento
+    - timestamp: fecha y hora en segundos epoch (para el libro columnar)
     """
-    unit_price = product["unit_price"]
+    unit_price = product.unit_price
     gross_amount = unit_price * quantity
     discount_amount = gross_amount * discount_rate
     net_amount = gross_amount - discount_amount
+    if now is None:
+        now = sale_time()
 
-    return {
-        "id": sale_id,
-        "customer_name": customer_name,
-        "customer_type": customer_type,
-        "product_id": product["id"],
-        "product_name": product["name"],
-        "brand": product["brand"],
-        "quantity": quantity,
-        "unit_price": unit_price,
-        "discount_rate": discount_rate,
-        "discount_amount": discount_amount,
-        "gross_amount": gross_amount,
-        "net_amount": net_amount,
-        # Fecha y hora actual como string legible
-        "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-    }
+    # Asignar los atributos uno a uno es más rápido que Sale(**campos)
+    sale = Sale()
+    sale.id = sale_id
+    sale.customer_name = customer_name
+    sale.customer_type = customer_type
+    sale.product_id = product.id
+    sale.product_name = product.name
+    sale.brand = product.brand
+    sale.quantity = quantity
+    sale.unit_price = unit_price
+    sale.discount_rate = discount_rate
+    sale.discount_amount = discount_amount
+    sale.gross_amount = gross_amount
+    sale.net_amount = net_amount
+    # Fecha y hora como string legible y como timestamp
+    sale.date, sale.timestamp = now
+    return sale
+
+
+def sale_time():
+    """
+    Devolver (fecha 'YYYY-MM-DD HH:MM:SS', timestamp) del momento
+    actual, como se guardan en una venta.
+    """
+    # Se descartan los microsegundos: la fecha se muestra al segundo
+    now = datetime.now().replace(microsecond=0)
+    return now.strftime("%Y-%m-%d %H:%M:%S"), now.timestamp()
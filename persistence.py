@@ -0,0 +1,490 @@
+"""
+Persistencia en disco: diario de solo-añadir + snapshots binarios.
+
+Archivos dentro del directorio de datos:
+- journal.jsonl: una línea JSON por cambio (venta, alta/cambio de
+  producto, borrado). Guardar una venta es añadir una línea (O(1) de
+  E/S), en vez de reescribir un archivo completo.
+- inventory.snap: estado completo del inventario (formato de
+  binary_snapshot) escrito cada cierto número de entradas del diario,
+  con la posición (offset en bytes) del diario que ya incluye. Lo
+  escribe un hilo aparte a partir de una copia de las filas.
+- sales.snap: historial de ventas completo, escrito al cerrar, también
+  con su offset del diario.
+
+Al arrancar se cargan los snapshots y se vuelve a leer el diario desde
+el menor de sus offsets:
+- solo se añaden al historial las ventas posteriores al offset de
+  sales.snap;
+- solo se aplican al inventario los cambios posteriores al offset de
+  inventory.snap.
+
+Al cerrar, cuando los dos snapshots ya incluyen todo el diario, este se
+rota: se sustituye por uno vacío de la época siguiente (la primera línea
+del diario, {"type": "journal", "epoch": n}). Cada snapshot guarda la
+época del diario de su offset; si es anterior a la del diario actual, el
+snapshot ya incluye todo el diario anterior y su offset en el actual
+es 0.
+"""
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+from binary_snapshot import (
+    inventory_rows,
+    load_inventory,
+    load_sales,
+    write_inventory_rows,
+    write_sales_snapshot,
+)
+from models import Product, Sale
+from store import Inventory, SalesHistory
+
+JOURNAL_FILE = "journal.jsonl"
+INVENTORY_SNAPSHOT_FILE = "inventory.snap"
+SALES_SNAPSHOT_FILE = "sales.snap"
+
+
+class SalesJournal:
+    """
+    Diario de solo-añadir en formato JSON Lines.
+
+    - fsync_every: cada cuántas entradas se fuerza la escritura a disco
+      con os.fsync (1 = en cada entrada, lo más seguro; valores mayores
+      agrupan los fsync y son más rápidos). Cada entrada se vacía
+      siempre al sistema operativo con flush().
+    - group(): dentro del bloque no se hace fsync; se hace uno solo al
+      salir (group commit, útil para lotes de ventas).
+
+    Se puede usar desde varios hilos: cada entrada se escribe entera
+    antes de empezar la siguiente.
+    """
+
+    def __init__(self, path, fsync_every=1):
+        self.path = path
+        self.fsync_every = max(1, fsync_every)
+        self._pending = 0
+        self._groups = 0
+        self._lock = threading.RLock()
+        self._file = open(path, mode="ab")
+
+    def append(self, entry):
+        """
+        Añadir una entrada al final del diario.
+        """
+        line = json.dumps(entry, separators=(",", ":")) + "\n"
+        with self._lock:
+            self._file.write(line.encode("utf-8"))
+            self._file.flush()
+            self._pending += 1
+            if self._pending >= self.fsync_every and not self._groups:
+                self.sync()
+
+    @contextmanager
+    def group(self):
+        """
+        Agrupar las entradas del bloque en un solo fsync (anidable).
+        """
+        with self._lock:
+            self._groups += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._groups -= 1
+                if not self._groups:
+                    self.sync()
+
+    def sync(self):
+        """
+        Forzar a disco las entradas pendientes.
+        """
+        with self._lock:
+            if self._pending:
+                os.fsync(self._file.fileno())
+                self._pending = 0
+
+    def offset(self):
+        """
+        Posición actual (en bytes) del final del diario.
+        """
+        with self._lock:
+            return self._file.tell()
+
+    def close(self):
+        """
+        Sincronizar y cerrar el diario.
+        """
+        with self._lock:
+            self.sync()
+            self._file.close()
+
+
+def read_journal(path, start=0):
+    """
+    Leer el diario desde el offset 'start' y devolver (entrada, offset
+    final de la entrada).
+
+    Si la última línea quedó a medias (por ejemplo, por un corte de
+    luz mientras se escribía) se ignora y se trunca el archivo para que
+    las nuevas entradas empiecen en una línea válida.
+    """
+    if not os.path.exists(path):
+        return
+
+    with open(path, mode="r+b") as f:
+        f.seek(start)
+        offset = start
+        for line in f:
+            try:
+                if not line.endswith(b"\n"):
+                    raise ValueError("incomplete journal line")
+                entry = json.loads(line)
+            except ValueError:
+                f.truncate(offset)
+                return
+            offset += len(line)
+            yield entry, offset
+
+
+def read_journal_epoch(path):
+    """
+    Devolver la época del diario (0 si no existe o no tiene cabecera).
+    """
+    if not os.path.exists(path):
+        return 0
+    with open(path, mode="rb") as f:
+        line = f.readline()
+    try:
+        entry = json.loads(line)
+    except ValueError:
+        return 0
+    if entry.get("type") != "journal":
+        return 0
+    return entry["epoch"]
+
+
+def rotate_journal(path, epoch):
+    """
+    Sustituir el diario por uno que solo tiene la cabecera de la época
+    'epoch' (llamar con el diario cerrado y los dos snapshots escritos).
+
+    Se escribe en un archivo temporal y se renombra: si hay un corte
+    antes, queda el diario anterior, que los snapshots ya incluyen.
+    """
+    temp_path = path + ".tmp"
+    with open(temp_path, mode="wb") as f:
+        header = {"type": "journal", "epoch": epoch}
+        f.write(json.dumps(header, separators=(",", ":")).encode("utf-8"))
+        f.write(b"\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+class Persistence:
+    """
+    Conecta el inventario y el historial con el diario y los snapshots.
+
+    Se registra como listener de store.Inventory y store.SalesHistory,
+    así que las funciones de inventory.py y sales.py no cambian.
+
+    - snapshot_every: cada cuántas entradas del diario se reescribe el
+      snapshot del inventario.
+    - journal_epoch: época del diario actual (ver read_journal_epoch).
+
+    El snapshot del inventario guarda el offset del diario que ya
+    incluye, así que no puede escribirse entre un cambio del inventario
+    y su entrada en el diario: en un pedido (sales.complete_order) las
+    líneas se aplican al inventario antes de anotarse las ventas, y un
+    snapshot a mitad haría que al arrancar se aplicaran otra vez. Por
+    eso, mientras haya alguna transaction() abierta (en cualquier hilo)
+    el snapshot se aplaza hasta que se cierre la última, y mientras se
+    copian las filas no puede empezar ninguna.
+
+    Solo la copia se hace en el hilo que vende; escribir el archivo y
+    hacer fsync (lo lento con muchos productos) lo hace un hilo aparte.
+    """
+
+    def __init__(
+        self,
+        data_dir,
+        inventory,
+        sales_history,
+        fsync_every=1,
+        snapshot_every=1000,
+        journal_epoch=0,
+    ):
+        self.inventory = inventory
+        self.sales_history = sales_history
+        self.data_dir = data_dir
+        self.snapshot_every = max(1, snapshot_every)
+        self.journal_epoch = journal_epoch
+        self.journal = SalesJournal(
+            os.path.join(data_dir, JOURNAL_FILE), fsync_every
+        )
+        self._since_snapshot = 0
+        self._groups = 0
+        self._lock = threading.RLock()
+        # Snapshot pendiente de escribir (filas, metadatos), el hilo que
+        # los escribe y el último error que tuvo
+        self._pending_snapshot = None
+        self._writer = None
+        self._writer_error = None
+        self._writer_done = threading.Condition()
+
+        inventory.listeners.append(self)
+        sales_history.listeners.append(self)
+
+    # Eventos de store.Inventory / store.SalesHistory
+
+    def on_product_added(self, product):
+        self._log({"type": "product", "product": dict(product)})
+
+    def on_product_updated(self, product):
+        self._log({"type": "product", "product": dict(product)})
+
+    def on_product_removed(self, product):
+        self._log({"type": "delete", "id": product.id})
+
+    def on_sale_added(self, sale, applied_to_stock=True):
+        entry = {"type": "sale", "sale": dict(sale)}
+        if not applied_to_stock:
+            # Al arrancar no hay que descontarla del stock
+            entry["applied_to_stock"] = False
+        self._log(entry)
+
+    def snapshot(self):
+        """
+        Copiar ahora el inventario y escribir el snapshot en segundo
+        plano (llamar fuera de transaction(), o quedará con cambios que
+        el diario todavía no tiene). Si todavía se está escribiendo el
+        anterior, después solo se escribe la copia más reciente.
+
+        wait_snapshot() espera a que esté en disco.
+        """
+        with self._lock:
+            metadata = {
+                "journal_epoch": self.journal_epoch,
+                "journal_offset": self.journal.offset(),
+                "last_product_id": self.inventory.ids.last_id,
+            }
+            rows = inventory_rows(self.inventory)
+            self._since_snapshot = 0
+            with self._writer_done:
+                self._pending_snapshot = rows, metadata
+                if self._writer is None:
+                    self._writer = threading.Thread(
+                        target=self._write_snapshots, daemon=True
+                    )
+                    self._writer.start()
+
+    def wait_snapshot(self):
+        """
+        Esperar a que el último snapshot del inventario esté en disco
+        (lanza el error del hilo que lo escribía, si lo hubo).
+        """
+        with self._writer_done:
+            while self._writer is not None:
+                self._writer_done.wait()
+            error, self._writer_error = self._writer_error, None
+        if error is not None:
+            raise error
+
+    def _write_snapshots(self):
+        path = os.path.join(self.data_dir, INVENTORY_SNAPSHOT_FILE)
+        while True:
+            with self._writer_done:
+                pending, self._pending_snapshot = self._pending_snapshot, None
+                if pending is None:
+                    self._writer = None
+                    self._writer_done.notify_all()
+                    return
+            rows, metadata = pending
+            try:
+                # Las entradas que incluye deben estar en disco antes
+                self.journal.sync()
+                write_inventory_rows(path, rows, metadata)
+            except Exception as error:
+                self._writer_error = error
+
+    def snapshot_sales(self):
+        """
+        Escribir ahora el snapshot del historial de ventas.
+
+        Es O(ventas), por eso solo se hace al cerrar: durante la
+        ejecución las ventas nuevas ya están a salvo en el diario.
+        """
+        self.journal.sync()
+        write_sales_snapshot(
+            os.path.join(self.data_dir, SALES_SNAPSHOT_FILE),
+            self.sales_history,
+            {
+                "journal_epoch": self.journal_epoch,
+                "journal_offset": self.journal.offset(),
+            },
+        )
+
+    @contextmanager
+    def transaction(self):
+        """
+        Agrupar varios cambios con un solo fsync del diario al final.
+        El snapshot periódico que toque se escribe al cerrar la última
+        transacción abierta.
+
+        Tiene el mismo nombre que sqlite_store.SQLiteDatabase.transaction
+        para que quien registra lotes (por ejemplo, service.py) use
+        cualquiera de los dos igual.
+        """
+        with self._lock:
+            self._groups += 1
+        try:
+            with self.journal.group():
+                yield
+        finally:
+            with self._lock:
+                self._groups -= 1
+                if self._snapshot_due():
+                    self.snapshot()
+
+    def close(self):
+        """
+        Escribir los snapshots finales, cerrar el diario y rotarlo
+        (los dos snapshots ya lo incluyen entero).
+        """
+        self.snapshot()
+        self.wait_snapshot()
+        self.snapshot_sales()
+        self.journal.close()
+        rotate_journal(self.journal.path, self.journal_epoch + 1)
+
+    def _log(self, entry):
+        with self._lock:
+            self.journal.append(entry)
+            self._since_snapshot += 1
+            if self._snapshot_due():
+                self.snapshot()
+
+    def _snapshot_due(self):
+        # Con self._lock tomado
+        return (
+            not self._groups and self._since_snapshot >= self.snapshot_every
+        )
+
+
+def load_state(
+    data_dir,
+    initial_products,
+    fsync_every=1,
+    snapshot_every=1000,
+):
+    """
+    Cargar el inventario y el historial desde el directorio de datos.
+
+    - initial_products: productos a usar si todavía no hay snapshot
+      (por ejemplo, models.create_initial_inventory()).
+
+    Devuelve (inventory, sales_history, persistence). A partir de aquí
+    cada cambio se guarda automáticamente en el diario.
+    """
+    os.makedirs(data_dir, exist_ok=True)
+    journal_path = os.path.join(data_dir, JOURNAL_FILE)
+    epoch = read_journal_epoch(journal_path)
+
+    inventory_path = os.path.join(data_dir, INVENTORY_SNAPSHOT_FILE)
+    first_run = not os.path.exists(inventory_path)
+    if first_run:
+        inventory = Inventory(initial_products)
+        inventory_offset = 0
+    else:
+        inventory, metadata = load_inventory(inventory_path)
+        inventory.ids.observe(metadata["last_product_id"])
+        inventory_offset = _journal_offset(metadata, epoch)
+
+    sales_path = os.path.join(data_dir, SALES_SNAPSHOT_FILE)
+    if os.path.exists(sales_path):
+        sales_history, metadata = load_sales(sales_path)
+        sales_offset = _journal_offset(metadata, epoch)
+    else:
+        sales_history = SalesHistory()
+        sales_offset = 0
+
+    start = min(inventory_offset, sales_offset)
+    for entry, end_offset in read_journal(journal_path, start):
+        _replay(
+            entry,
+            inventory,
+            sales_history,
+            apply_to_inventory=end_offset > inventory_offset,
+            add_to_history=end_offset > sales_offset,
+        )
+
+    persistence = Persistence(
+        data_dir,
+        inventory,
+        sales_history,
+        fsync_every,
+        snapshot_every,
+        epoch,
+    )
+    if first_run:
+        # Primer arranque: guardar ya el inventario inicial
+        persistence.snapshot()
+    return inventory, sales_history, persistence
+
+
+def _journal_offset(metadata, epoch):
+    """
+    Offset del diario actual que ya incluye un snapshot: 0 si el
+    snapshot es de una época anterior (el diario se rotó después).
+    """
+    if metadata.get("journal_epoch", 0) < epoch:
+        return 0
+    return metadata["journal_offset"]
+
+
+def _replay(
+    entry,
+    inventory,
+    sales_history,
+    apply_to_inventory,
+    add_to_history,
+):
+    """
+    Aplicar una entrada del diario al estado en memoria.
+
+    - apply_to_inventory: False si el snapshot del inventario ya
+      incluye la entrada.
+    - add_to_history: False si el snapshot de ventas ya incluye la venta.
+    """
+    kind = entry["type"]
+
+    if kind == "sale":
+        sale = Sale.from_dict(entry["sale"])
+        if apply_to_inventory and entry.get("applied_to_stock", True):
+            product = inventory.get(sale.product_id)
+            if product is not None:
+                inventory.record_sale(
+                    product, sale.quantity, sale.net_amount
+                )
+        if add_to_history:
+            sales_history.append(sale)
+
+    elif kind == "product":
+        data = entry["product"]
+        inventory.ids.observe(data["id"])
+        if not apply_to_inventory:
+            return
+        product = inventory.get(data["id"])
+        if product is None:
+            inventory.append(Product.from_dict(data))
+        else:
+            product.update(data)
+            inventory.update(product)
+
+    elif kind == "delete" and apply_to_inventory:
+        product = inventory.get(entry["id"])
+        if product is not None:
+            inventory.remove(product)
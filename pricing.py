@@ -0,0 +1,421 @@
+"""
+Motor de reglas de precios y descuentos.
+
+Las reglas se declaran como datos (diccionarios, por ejemplo leídos de
+un archivo JSON) y se compilan una sola vez en PricingEngine. Cada
+regla puede limitarse a:
+- customer_type: un tipo de cliente (ver models.CUSTOMER_DISCOUNTS);
+- brand / category: una marca o una categoría de producto;
+- min_quantity / max_quantity: una banda de cantidades (volumen);
+- start / end: una campaña con fechas ("YYYY-MM-DD", fin incluido, o
+  "YYYY-MM-DD HH:MM:SS" / timestamp, fin excluido).
+
+Un campo ausente (o None) no limita la regla. Ejemplo:
+
+    [
+        {"name": "VIP", "customer_type": "vip", "discount": 0.10},
+        {"name": "TV week", "category": "Televisions",
+         "discount": 0.05, "stackable": true,
+         "start": "2026-11-23", "end": "2026-11-29"},
+        {"name": "Bulk 10+", "min_quantity": 10, "discount": 0.08}
+    ]
+
+Cómo se combinan las reglas que aplican a una línea de venta:
+- de las reglas normales gana la de mayor descuento;
+- las reglas 'stackable' se suman a ese descuento;
+- el total nunca pasa de MAX_DISCOUNT.
+
+Compilación: las reglas se agrupan por la combinación (tipo de
+cliente, marca, categoría) que exigen, con None como comodín, y dentro
+de cada grupo se parte el eje de cantidades en bandas (bisect). Cada
+banda guarda ya resuelto el mejor descuento y la suma de los
+acumulables de sus reglas sin fechas; solo las campañas con fechas se
+comprueban al evaluar. Así evaluar una venta son unas pocas búsquedas
+en diccionarios y un bisect por grupo, sin recorrer las reglas.
+
+El motor activo (set_pricing_engine / get_pricing_engine) es el que
+usa sales.complete_sale; por defecto aplica models.CUSTOMER_DISCOUNTS.
+"""
+
+import json
+import math
+import time
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timedelta
+
+from models import CUSTOMER_DISCOUNTS
+
+# Descuento máximo de una línea (1.0 = 100%)
+MAX_DISCOUNT = 1.0
+
+# Campos de una regla y su valor por defecto
+RULE_FIELDS = {
+    "name": None,
+    "discount": None,
+    "customer_type": None,
+    "brand": None,
+    "category": None,
+    "min_quantity": 1,
+    "max_quantity": None,
+    "start": None,
+    "end": None,
+    "stackable": False,
+}
+
+# Campos por los que se indexan las reglas (None = cualquiera)
+_KEY_FIELDS = ("customer_type", "brand", "category")
+
+
+def default_rules():
+    """
+    Reglas equivalentes a models.CUSTOMER_DISCOUNTS (un descuento por
+    tipo de cliente).
+    """
+    return [
+        {
+            "name": customer_type,
+            "customer_type": customer_type,
+            "discount": rate,
+        }
+        for customer_type, rate in CUSTOMER_DISCOUNTS.items()
+        if rate
+    ]
+
+
+def load_rules(path):
+    """
+    Leer una lista de reglas de un archivo JSON.
+    """
+    with open(path, encoding="utf-8") as f:
+        rules = json.load(f)
+    if not isinstance(rules, list):
+        raise ValueError("The pricing rules file must contain a list.")
+    return rules
+
+
+def normalize_rule(rule, index=0):
+    """
+    Validar una regla y devolverla con todos los campos de RULE_FIELDS
+    (fechas como timestamps, fin excluido).
+
+    Lanza ValueError si la regla no es válida.
+    """
+    if not isinstance(rule, dict):
+        raise ValueError(f"Rule {index}: must be an object.")
+    unknown = rule.keys() - RULE_FIELDS.keys()
+    if unknown:
+        raise ValueError(f"Rule {index}: unknown fields {sorted(unknown)}")
+
+    clean = dict(RULE_FIELDS, **rule)
+    if clean["name"] is None:
+        clean["name"] = f"rule {index}"
+    label = f"Rule '{clean['name']}'"
+
+    try:
+        clean["discount"] = float(clean["discount"])
+    except (TypeError, ValueError):
+        raise ValueError(f"{label}: discount must be a number.") from None
+    if not 0 <= clean["discount"] <= MAX_DISCOUNT:
+        raise ValueError(
+            f"{label}: discount must be between 0 and {MAX_DISCOUNT}."
+        )
+
+    for field in ("min_quantity", "max_quantity"):
+        if clean[field] is not None:
+            try:
+                clean[field] = int(clean[field])
+            except (TypeError, ValueError):
+                raise ValueError(
+                    f"{label}: {field} must be an integer."
+                ) from None
+    if clean["min_quantity"] < 1:
+        clean["min_quantity"] = 1
+    if (
+        clean["max_quantity"] is not None
+        and clean["max_quantity"] < clean["min_quantity"]
+    ):
+        raise ValueError(f"{label}: max_quantity is below min_quantity.")
+
+    clean["start"] = _parse_time(clean["start"], label, end=False)
+    clean["end"] = _parse_time(clean["end"], label, end=True)
+    if (
+        clean["start"] is not None
+        and clean["end"] is not None
+        and clean["end"] <= clean["start"]
+    ):
+        raise ValueError(f"{label}: end is before start.")
+
+    clean["stackable"] = bool(clean["stackable"])
+    return clean
+
+
+def _parse_time(value, label, end):
+    """
+    Convertir una fecha de regla en timestamp. Una fecha sin hora como
+    fin incluye todo ese día.
+    """
+    if value is None or isinstance(value, (int, float)):
+        return value
+    for pattern in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d"):
+        try:
+            moment = datetime.strptime(value, pattern)
+        except (TypeError, ValueError):
+            continue
+        if end and pattern == "%Y-%m-%d":
+            moment += timedelta(days=1)
+        return moment.timestamp()
+    raise ValueError(f"{label}: invalid date {value!r}.")
+
+
+class _Band:
+    """
+    Reglas de un grupo que cubren un tramo de cantidades.
+
+    Las campañas con fechas parten el tiempo en intervalos; para cada
+    intervalo se guarda ya resuelto el mejor descuento normal y la
+    suma de los acumulables vigentes:
+    - times: instantes (ordenados) en que empieza o acaba una campaña
+    - best / stacked: listas con len(times) + 1 valores; el valor i
+      vale para times[i - 1] <= instante < times[i]
+    - rules: todas las reglas del tramo (para explain)
+    """
+
+    __slots__ = ("times", "best", "stacked", "rules")
+
+    def __init__(self, rules):
+        self.rules = rules
+        events = {}
+        active = []
+        for rule in rules:
+            if rule["start"] is None:
+                active.append(rule)
+            else:
+                events.setdefault(rule["start"], []).append((rule, True))
+            if rule["end"] is not None:
+                events.setdefault(rule["end"], []).append((rule, False))
+
+        # Barrido por los instantes de cambio: descuentos normales
+        # vigentes ordenados (el mejor, al final) y suma de acumulables
+        normal = sorted(r["discount"] for r in active if not r["stackable"])
+        stacked = math.fsum(r["discount"] for r in active if r["stackable"])
+        self.times = sorted(events)
+        self.best = [normal[-1] if normal else 0.0]
+        self.stacked = [stacked]
+        for moment in self.times:
+            for rule, starts in events[moment]:
+                discount = rule["discount"]
+                if rule["stackable"]:
+                    stacked += discount if starts else -discount
+                elif starts:
+                    insort(normal, discount)
+                else:
+                    del normal[bisect_left(normal, discount)]
+            self.best.append(normal[-1] if normal else 0.0)
+            # Sin restos de redondeo cuando ya no queda ninguna
+            self.stacked.append(max(stacked, 0.0))
+
+
+def rule_applies(rule, when):
+    """
+    Indicar si una regla está vigente en el instante 'when'.
+    """
+    return (rule["start"] is None or rule["start"] <= when) and (
+        rule["end"] is None or when < rule["end"]
+    )
+
+
+def _compile_group(rules):
+    """
+    Partir el eje de cantidades de un grupo en bandas.
+
+    Devuelve (límites, bandas): la banda i cubre las cantidades
+    límites[i] <= q < límites[i + 1].
+    """
+    bounds = {rule["min_quantity"] for rule in rules}
+    bounds.update(
+        rule["max_quantity"] + 1
+        for rule in rules
+        if rule["max_quantity"] is not None
+    )
+    bounds = sorted(bounds)
+    bands = []
+    for low in bounds:
+        covering = [
+            rule
+            for rule in rules
+            if rule["min_quantity"] <= low
+            and (rule["max_quantity"] is None or low <= rule["max_quantity"])
+        ]
+        bands.append(_Band(covering) if covering else None)
+    return bounds, bands
+
+
+class PricingEngine:
+    """
+    Reglas de descuento compiladas.
+
+    - rules: las reglas normalizadas (normalize_rule), en el orden dado
+    - discount_rate(customer_type, product, quantity, when=None):
+      tasa de descuento de una línea de venta
+    - customer_discount(customer_type, when=None): descuento de un
+      tipo de cliente en cualquier producto (para mostrarlo)
+    - explain(...): nombres de las reglas que aplican a esa línea
+    """
+
+    def __init__(self, rules):
+        self.rules = [
+            normalize_rule(rule, index) for index, rule in enumerate(rules)
+        ]
+        groups = {}
+        for rule in self.rules:
+            key = tuple(rule[field] for field in _KEY_FIELDS)
+            groups.setdefault(key, []).append(rule)
+
+        self._groups = {
+            key: _compile_group(rules) for key, rules in groups.items()
+        }
+        # Combinaciones de comodines que existen, para no probar claves
+        # que no tienen reglas: (usa tipo, usa marca, usa categoría)
+        self._shapes = sorted(
+            {tuple(value is not None for value in key) for key in groups}
+        )
+
+    def __len__(self):
+        return len(self.rules)
+
+    def _bands(self, customer_type, product, quantity):
+        """
+        Bandas de los grupos que aplican a una línea de venta.
+        """
+        brand = product.brand
+        category = product.category
+        groups = self._groups
+        found = []
+        for by_type, by_brand, by_category in self._shapes:
+            group = groups.get(
+                (
+                    customer_type if by_type else None,
+                    brand if by_brand else None,
+                    category if by_category else None,
+                )
+            )
+            if group is None:
+                continue
+            bounds, bands = group
+            index = bisect_right(bounds, quantity) - 1
+            if index >= 0 and bands[index] is not None:
+                found.append(bands[index])
+        return found
+
+    def discount_rate(self, customer_type, product, quantity, when=None):
+        """
+        Devolver la tasa de descuento (0..MAX_DISCOUNT) para vender
+        'quantity' unidades de 'product' a un cliente de ese tipo en el
+        instante 'when' (timestamp; por defecto, ahora).
+        """
+        best = 0.0
+        stacked = 0.0
+        if when is None:
+            when = time.time()
+        for band in self._bands(customer_type, product, quantity):
+            index = bisect_right(band.times, when) if band.times else 0
+            if band.best[index] > best:
+                best = band.best[index]
+            stacked += band.stacked[index]
+        return min(best + stacked, MAX_DISCOUNT)
+
+    def customer_discount(self, customer_type, when=None):
+        """
+        Devolver el descuento de un tipo de cliente en cualquier
+        producto y cantidad (sus reglas sin marca, categoría ni banda
+        de cantidades) en el instante 'when'. Es el que se muestra al
+        elegir el tipo de cliente; en cada venta otras reglas pueden
+        dar más.
+        """
+        if when is None:
+            when = time.time()
+        best = 0.0
+        stacked = 0.0
+        for rule in self.rules:
+            if (
+                rule["customer_type"] in (None, customer_type)
+                and rule["brand"] is None
+                and rule["category"] is None
+                and rule["min_quantity"] <= 1
+                and rule["max_quantity"] is None
+                and rule_applies(rule, when)
+            ):
+                if rule["stackable"]:
+                    stacked += rule["discount"]
+                else:
+                    best = max(best, rule["discount"])
+        return min(best + stacked, MAX_DISCOUNT)
+
+    def explain(self, customer_type, product, quantity, when=None):
+        """
+        Devolver los nombres de las reglas que aplican a la línea: la
+        mejor regla normal (si hay) y todas las acumulables.
+        """
+        if when is None:
+            when = time.time()
+        best = None
+        stacked = []
+        for band in self._bands(customer_type, product, quantity):
+            for rule in band.rules:
+                if not rule_applies(rule, when):
+                    continue
+                if rule["stackable"]:
+                    stacked.append(rule["name"])
+                elif best is None or rule["discount"] > best["discount"]:
+                    best = rule
+        return ([best["name"]] if best is not None else []) + stacked
+
+
+def matches(rule, customer_type, product, quantity, when):
+    """
+    Indicar si una regla aplica a una línea de venta, comprobando
+    todos sus campos (sin compilar; para verificar el motor).
+    """
+    return (
+        (rule["customer_type"] in (None, customer_type))
+        and (rule["brand"] in (None, product.brand))
+        and (rule["category"] in (None, product.category))
+        and rule["min_quantity"] <= quantity
+        and (rule["max_quantity"] is None or quantity <= rule["max_quantity"])
+        and rule_applies(rule, when)
+    )
+
+
+def scan_discount_rate(rules, customer_type, product, quantity, when):
+    """
+    Calcular la tasa de descuento recorriendo todas las reglas
+    normalizadas (referencia para comprobar PricingEngine).
+    """
+    best = 0.0
+    stacked = 0.0
+    for rule in rules:
+        if matches(rule, customer_type, product, quantity, when):
+            if rule["stackable"]:
+                stacked += rule["discount"]
+            else:
+                best = max(best, rule["discount"])
+    return min(best + stacked, MAX_DISCOUNT)
+
+
+# Motor activo (se cambia con set_pricing_engine)
+_engine = PricingEngine(default_rules())
+
+
+def set_pricing_engine(engine):
+    """
+    Usar otro motor de reglas en las ventas nuevas.
+    """
+    global _engine
+    _engine = engine
+
+
+def get_pricing_engine():
+    """
+    Devolver el motor de reglas activo.
+    """
+    return _engine
@@ -0,0 +1,76 @@
+"""
+Ranking ordenado de productos mantenido de forma incremental.
+
+Se usa para responder "top K productos" sin ordenar todo el inventario
+en cada consulta: cada venta solo mueve un producto dentro del ranking.
+"""
+
+from bisect import bisect_left, insort
+
+
+class Ranking:
+    """
+    Lista ordenada de (puntuación, -id) para un grupo de productos.
+
+    - set(product_id, score): inserta o mueve un producto (O(log n) de
+      búsqueda más el desplazamiento de la lista, muy rápido en C).
+    - remove(product_id): quita un producto del ranking.
+    - iter_desc(): recorre los IDs de mayor a menor puntuación;
+      ante empate sale primero el ID menor (el orden del inventario).
+    """
+
+    def __init__(self):
+        self._entries = []
+        self._scores = {}
+
+    @classmethod
+    def from_scores(cls, scores):
+        """
+        Construir el ranking de una vez a partir de id -> puntuación
+        (una sola ordenación en vez de una inserción por producto).
+        """
+        ranking = cls()
+        ranking._scores = dict(scores)
+        ranking._entries = sorted(
+            (score, -product_id)
+            for product_id, score in ranking._scores.items()
+        )
+        return ranking
+
+    def __len__(self):
+        return len(self._entries)
+
+    def set(self, product_id, score):
+        """
+        Fijar la puntuación de un producto.
+        """
+        self.remove(product_id)
+        self._scores[product_id] = score
+        insort(self._entries, (score, -product_id))
+
+    def remove(self, product_id):
+        """
+        Quitar un producto del ranking (si está).
+        """
+        score = self._scores.pop(product_id, None)
+        if score is None:
+            return
+        entry = (score, -product_id)
+        del self._entries[bisect_left(self._entries, entry)]
+
+    def iter_desc(self):
+        """
+        Recorrer los IDs de producto de mayor a menor puntuación.
+        """
+        for _, negative_id in reversed(self._entries):
+            yield -negative_id
+
+    def top(self, k):
+        """
+        Devolver los K IDs con mayor puntuación.
+        """
+        if k <= 0:
+            return []
+        return [
+            -negative_id for _, negative_id in reversed(self._entries[-k:])
+        ]
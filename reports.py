@@ -2,17 +2,158 @@
 """
 Módulo de reportes: generación de reportes dinámicos
 a partir del inventario y del historial de ventas.
+
+Cada reporte separa el cálculo (funciones compute_*) de la impresión.
+Los cálculos se resuelven con un "backend" elegible en tiempo de
+ejecución:
+- 'python': consultas al propio store (agregados incrementales y
+  rankings en memoria, o SQL en sqlite_store).
+- 'numpy': cálculo vectorizado sobre arrays (reports_numpy), solo si
+  NumPy está instalado.
+- 'parallel': ventas por marca e ingresos recorriendo el historial
+  repartido entre varios procesos (reports_parallel); el resto de
+  cálculos, como en 'python'.
 """
 
-from utils import print_error
+import time
+from datetime import datetime
+
+import instrumentation
+import reports_numpy
+import reports_parallel
+from aggregates import _close
+from rollups import PERIODS, period_bounds
+from sales import format_sale
+from utils import input_int, input_non_empty_string, paginate, print_error
+from velocity import (
+    COVER_WINDOW,
+    DAY,
+    VELOCITY_WINDOWS,
+    count_within,
+    forecast,
+    lowest_cover,
+)
+
+
+# ============================================================
+# Cálculos (backend 'python')
+# ============================================================
+
+def compute_top_products(inventory, k):
+    """
+    Devolver los K productos con más unidades vendidas (total_sold > 0).
+    """
+    return inventory.top_products(k)
+
+
+def compute_sales_by_brand(sales_history):
+    """
+    Devolver marca -> {'total_quantity', 'total_net'}.
+
+    Lo resuelve el propio historial: en memoria se lee de los agregados
+    que se actualizan en cada venta; en SQLite es un GROUP BY.
+    """
+    return sales_history.brand_totals()
+
+
+def compute_income(sales_history):
+    """
+    Devolver un diccionario con 'gross_income', 'total_discounts'
+    y 'net_income'.
+    """
+    return sales_history.income_totals()
+
+
+def compute_inventory_performance(inventory):
+    """
+    Devolver una fila por producto con 'product', 'stock', 'sold'
+    y 'turnover_ratio' (ver store.Inventory.performance_rows).
+    """
+    return inventory.performance_rows()
+
+
+# Backends disponibles: nombre -> {nombre del cálculo: función}
+REPORT_BACKENDS = {
+    "python": {
+        "top_products": compute_top_products,
+        "sales_by_brand": compute_sales_by_brand,
+        "income": compute_income,
+        "inventory_performance": compute_inventory_performance,
+    },
+}
+if reports_numpy.is_available():
+    REPORT_BACKENDS["numpy"] = reports_numpy.BACKEND
+REPORT_BACKENDS["parallel"] = {
+    **REPORT_BACKENDS["python"],
+    **reports_parallel.BACKEND,
+}
+
+# Backend activo (se cambia con set_report_backend)
+_active_backend = "python"
+
+
+def set_report_backend(name):
+    """
+    Elegir el backend de cálculo de los reportes ('python', 'numpy'
+    o 'parallel').
+
+    Lanza ValueError si el backend no existe o no está disponible
+    (por ejemplo, 'numpy' sin NumPy instalado).
+    """
+    global _active_backend
+    if name not in REPORT_BACKENDS:
+        raise ValueError(f"Report backend not available: {name}")
+    _active_backend = name
+
+
+def get_report_backend():
+    """
+    Devolver el nombre del backend de reportes activo.
+    """
+    return _active_backend
+
+
+def _backend():
+    return REPORT_BACKENDS[_active_backend]
+
+
+def compute_report(name, *args):
+    """
+    Calcular un reporte con el backend activo, sin imprimirlo.
+
+    - name: 'top_products', 'sales_by_brand', 'income' o
+      'inventory_performance'
+    - args: los argumentos del cálculo (inventario o historial, y K
+      para 'top_products')
+    """
+    return instrumentation.run(
+        f"compute.{name}", _backend()[name], *args
+    )
+
+
+# ============================================================
+# Reportes
+# ============================================================
+
+def top_k_products(inventory, k, by="units", brand=None, category=None):
+    """
+    Devolver los K productos más vendidos (lista de productos).
+
+    - by: 'units' (unidades vendidas) o 'revenue' (ingresos netos)
+    - brand / category (opcionales): filtrar por marca o categoría
+
+    Se apoya en los rankings que el inventario mantiene en cada venta
+    (store.Inventory.top_products), así que no ordena todo el catálogo.
+    """
+    return inventory.top_products(k, by=by, brand=brand, category=category)
 
 
 def top_3_products(inventory):
     """
     Mostrar el top 3 de productos más vendidos.
 
-    - Usa una función lambda para ordenar la lista de productos
-      por el campo 'total_sold' de forma descendente.
+    - Usa top_k_products con K = 3, ordenado por 'total_sold'
+      de forma descendente.
     - Solo se consideran productos con total_sold > 0.
     """
     print("\n=== Top 3 Best-Selling Products ===")
@@ -21,27 +162,53 @@ def top_3_products(inventory):
         print_error("Inventory is empty.")
         return
 
-    # Ordenar productos por 'total_sold' usando una lambda (requisito de lambda)
-    sorted_products = sorted(
-        inventory,
-        key=lambda p: p["total_sold"],
-        reverse=True,
-    )
-
-    # Filtrar productos que realmente se han vendido
-    sold_products = [p for p in sorted_products if p["total_sold"] > 0]
+    top_3 = compute_report("top_products", inventory, 3)
 
-    if not sold_products:
+    if not top_3:
         print("No products have been sold yet.\n")
         return
 
-    # Tomar los tres primeros
-    top_3 = sold_products[:3]
-
     for idx, product in enumerate(top_3, start=1):
         print(
-            f"{idx}. {product['name']} | Brand: {product['brand']} | "
-            f"Sold: {product['total_sold']} units"
+            f"{idx}. {product.name} | Brand: {product.brand} | "
+            f"Sold: {product.total_sold} units"
+        )
+    print("")
+
+
+def top_k_report(inventory):
+    """
+    Mostrar un top K configurable de productos.
+
+    Pide K, la métrica (unidades o ingresos netos) y, opcionalmente,
+    una marca y una categoría para filtrar.
+    """
+    print("\n=== Top K Products ===")
+
+    if not inventory:
+        print_error("Inventory is empty.")
+        return
+
+    k = input_int("How many products (K): ", min_value=1)
+    metric = input_int("Rank by 1) units sold or 2) net revenue: ")
+    by = "revenue" if metric == 2 else "units"
+    brand = input("Brand (ENTER for all): ").strip() or None
+    category = input("Category (ENTER for all): ").strip() or None
+
+    products = top_k_products(
+        inventory, k, by=by, brand=brand, category=category
+    )
+
+    if not products:
+        print("No matching products have been sold yet.\n")
+        return
+
+    for idx, product in enumerate(products, start=1):
+        print(
+            f"{idx}. {product.name} | Brand: {product.brand} | "
+            f"Category: {product.category} | "
+            f"Sold: {product.total_sold} units | "
+            f"Net revenue: {inventory.revenue(product.id):.2f}"
         )
     print("")
 
@@ -55,10 +222,10 @@ def sales_by_brand(sales_history):
     - Total de ingresos netos.
 
     Implementación:
-    - Recorre la lista de ventas.
-    - Usa un diccionario auxiliar 'brand_stats' con:
+    - Pide al historial los totales por marca (compute_sales_by_brand):
       clave: nombre de la marca
       valor: diccionario con 'total_quantity' y 'total_net'.
+    - Así el reporte no recorre el historial completo en Python.
     """
     print("\n=== Sales by Brand ===")
 
@@ -66,17 +233,7 @@ def sales_by_brand(sales_history):
         print("No sales registered yet.\n")
         return
 
-    brand_stats = {}
-
-    for sale in sales_history:
-        brand = sale["brand"]
-        if brand not in brand_stats:
-            brand_stats[brand] = {
-                "total_quantity": 0,
-                "total_net": 0.0,
-            }
-        brand_stats[brand]["total_quantity"] += sale["quantity"]
-        brand_stats[brand]["total_net"] += sale["net_amount"]
+    brand_stats = compute_report("sales_by_brand", sales_history)
 
     for brand, data in brand_stats.items():
         print(
@@ -93,8 +250,10 @@ def income_report(sales_history):
 
     - Gross income: suma de 'gross_amount' de todas las ventas.
     - Net income: suma de 'net_amount' de todas las ventas.
-      Se usa una lambda con map para cumplir el requisito de lambda.
     - Total discounts: diferencia entre bruto y neto.
+
+    Las sumas las resuelve el historial (agregados incrementales en
+    memoria, SUM en SQLite), así que el reporte no recorre las ventas.
     """
     print("\n=== Income Report ===")
 
@@ -102,17 +261,11 @@ def income_report(sales_history):
         print("No sales registered yet.\n")
         return
 
-    # Ingreso bruto: suma directa del campo 'gross_amount'
-    gross_income = sum(sale["gross_amount"] for sale in sales_history)
+    income = compute_report("income", sales_history)
 
-    # Ingreso neto: se usa map + lambda (otra forma funcional)
-    net_income = sum(map(lambda s: s["net_amount"], sales_history))
-
-    total_discounts = gross_income - net_income
-
-    print(f"Total gross income: {gross_income:.2f}")
-    print(f"Total discounts:    {total_discounts:.2f}")
-    print(f"Total net income:   {net_income:.2f}\n")
+    print(f"Total gross income: {income['gross_income']:.2f}")
+    print(f"Total discounts:    {income['total_discounts']:.2f}")
+    print(f"Total net income:   {income['net_income']:.2f}\n")
 
 
 def inventory_performance_report(inventory):
@@ -125,6 +278,7 @@ def inventory_performance_report(inventory):
     - Turnover ratio (índice de rotación):
       turnover = total_sold / (total_sold + stock)
       (si el denominador es 0, se toma 0 para evitar división por cero).
+    - Punto de pedido, marcando los productos en stock bajo.
     """
     print("\n=== Inventory Performance Report ===")
 
@@ -132,19 +286,461 @@ def inventory_performance_report(inventory):
         print_error("Inventory is empty.")
         return
 
-    for product in inventory:
-        stock = product["stock"]
-        sold = product["total_sold"]
-        total_handled = stock + sold
+    for row in compute_report("inventory_performance", inventory):
+        product = row["product"]
+        low = " | LOW STOCK" if row["stock"] <= product.reorder_point else ""
+        print(
+            f"Product: {product.name} | Brand: {product.brand} | "
+            f"Stock: {row['stock']} | Sold: {row['sold']} | "
+            f"Turnover ratio: {row['turnover_ratio']:.2f} | "
+            f"Reorder point: {product.reorder_point}{low}"
+        )
+    print("")
+
+
+def low_stock_report(inventory):
+    """
+    Mostrar los productos en su punto de pedido o por debajo, los que
+    más unidades necesitan primero.
+
+    Se lee del índice de stock bajo del inventario
+    (inventory.below_reorder_point), sin recorrer el catálogo.
+    """
+    print("\n=== Low Stock (at or below reorder point) ===")
+
+    products = inventory.below_reorder_point()
+    if not products:
+        print("No products at or below their reorder point.\n")
+        return
+
+    paginate(
+        products,
+        format_low_stock,
+        f"{len(products)} product(s) need restocking:",
+        "",
+    )
+
+
+def format_low_stock(product):
+    """
+    Devolver la línea de un producto en el reporte de stock bajo.
+    """
+    return (
+        f"ID: {product.id} | Name: {product.name} | "
+        f"Brand: {product.brand} | Stock: {product.stock} | "
+        f"Reorder point: {product.reorder_point} | "
+        f"Missing: {product.reorder_point - product.stock}"
+    )
+
+
+# Productos que muestra el reporte de cobertura (los que antes se
+# quedarán sin stock)
+STOCK_COVER_ROWS = 20
+
+
+def compute_stock_cover(inventory, sales_history, k, when=None):
+    """
+    Proyectar los días de cobertura de todo el catálogo (stock /
+    velocidad de venta; ver velocity.forecast) en el instante 'when'
+    (por defecto, ahora).
+
+    Devuelve un diccionario con:
+    - 'products': productos del catálogo
+    - 'within': ventana en días -> productos que se quedarán sin
+      stock en ese plazo (VELOCITY_WINDOWS)
+    - 'rows': los K productos que antes se quedarán sin stock, con
+      'product', 'stock', 'velocity' (ventana -> unidades/día),
+      'days_of_cover' y 'stockout_date'
+    """
+    if when is None:
+        when = time.time()
+    product_ids, stocks = inventory.stock_levels()
+    result = forecast(
+        sales_history.velocity_state(), product_ids, stocks, when
+    )
+    cover = result["days_of_cover"]
+
+    rows = []
+    for index in lowest_cover(cover, k):
+        product = inventory.get(int(product_ids[index]))
+        if product is None:
+            # Borrado mientras se calculaba
+            continue
+        days = float(cover[index])
+        rows.append(
+            {
+                "product": product,
+                "stock": int(stocks[index]),
+                "velocity": {
+                    window: float(rates[index])
+                    for window, rates in result["velocity"].items()
+                },
+                "days_of_cover": days,
+                "stockout_date": datetime.fromtimestamp(
+                    when + days * DAY
+                ).strftime("%Y-%m-%d"),
+            }
+        )
+    return {
+        "products": len(product_ids),
+        "within": {
+            window: count_within(cover, window) for window in VELOCITY_WINDOWS
+        },
+        "rows": rows,
+    }
+
+
+def stock_cover_report(inventory, sales_history):
+    """
+    Mostrar la velocidad de venta (media móvil exponencial de 7 y 30
+    días) y los días de cobertura del stock de los productos que antes
+    se quedarán sin stock al ritmo actual.
+
+    A diferencia del turnover de inventory_performance_report, aquí
+    pesan más las ventas recientes.
+    """
+    print("\n=== Stock Cover Forecast ===")
+
+    if not inventory:
+        print_error("Inventory is empty.")
+        return
 
-        if total_handled > 0:
-            turnover_ratio = sold / total_handled
+    cover = compute_stock_cover(inventory, sales_history, STOCK_COVER_ROWS)
+    within = " | ".join(
+        f"Out within {window} days: {count}"
+        for window, count in cover["within"].items()
+    )
+    print(f"Products: {cover['products']} | {within}")
+    if not cover["rows"]:
+        print("No recent sales to forecast from.\n")
+        return
+
+    print(
+        f"Days of cover use the {COVER_WINDOW}-day sales velocity "
+        "(units/day):"
+    )
+    for row in cover["rows"]:
+        velocity = " | ".join(
+            f"{window}d: {rate:.2f}/day"
+            for window, rate in row["velocity"].items()
+        )
+        print(
+            f"ID: {row['product'].id} | Name: {row['product'].name} | "
+            f"Stock: {row['stock']} | {velocity} | "
+            f"Cover: {row['days_of_cover']:.1f} days | "
+            f"Out by: {row['stockout_date']}"
+        )
+    print("")
+
+
+def compute_period(sales_history, start, end):
+    """
+    Devolver (ingresos, ventas por marca) de las ventas con
+    start <= timestamp < end.
+
+    En memoria se suman los rollups por mes, día y hora
+    (rollups.SalesRollups); en SQLite se filtra con el índice por
+    timestamp. En ningún caso se recorre el historial completo.
+    """
+    return (
+        sales_history.income_totals_between(start, end),
+        sales_history.brand_totals_between(start, end),
+    )
+
+
+def parse_period(period=None, start=None, end=None):
+    """
+    Convertir un periodo con nombre (ver rollups.PERIODS) o un rango
+    de fechas 'YYYY-MM-DD' (fin incluido) en (inicio, fin) timestamps.
+
+    Lanza ValueError si el periodo o las fechas no son válidos.
+    """
+    if period:
+        return period_bounds(period)
+    if not start or not end:
+        raise ValueError("Give a period name or both start and end dates.")
+    first = datetime.strptime(start, "%Y-%m-%d")
+    last = datetime.strptime(end, "%Y-%m-%d")
+    if last < first:
+        raise ValueError("End date is before start date.")
+    return first.timestamp(), period_bounds("today", last)[1]
+
+
+def period_report(sales_history):
+    """
+    Mostrar ingresos y ventas por marca de un periodo
+    (hoy, esta semana, el mes pasado... o un rango de fechas).
+    """
+    print("\n=== Sales for a Period ===")
+    for idx, name in enumerate(PERIODS, start=1):
+        print(f"{idx}. {name.replace('_', ' ').capitalize()}")
+    print(f"{len(PERIODS) + 1}. Custom dates")
+
+    option = input_int(
+        f"Choose period (1-{len(PERIODS) + 1}): ", min_value=1
+    )
+    try:
+        if option <= len(PERIODS):
+            start, end = parse_period(PERIODS[option - 1])
+        elif option == len(PERIODS) + 1:
+            start, end = parse_period(
+                start=input("Start date (YYYY-MM-DD): ").strip(),
+                end=input("End date (YYYY-MM-DD): ").strip(),
+            )
         else:
-            turnover_ratio = 0
+            print_error("Invalid option.")
+            return
+    except ValueError as error:
+        print_error(str(error))
+        return
+
+    income, brand_stats = compute_period(sales_history, start, end)
+    print(
+        f"\nFrom {datetime.fromtimestamp(start):%Y-%m-%d %H:%M} "
+        f"to {datetime.fromtimestamp(end):%Y-%m-%d %H:%M}"
+    )
+    if not brand_stats:
+        print("No sales in this period.\n")
+        return
+
+    print(f"Total gross income: {income['gross_income']:.2f}")
+    print(f"Total discounts:    {income['total_discounts']:.2f}")
+    print(f"Total net income:   {income['net_income']:.2f}")
+    for brand, data in brand_stats.items():
+        print(
+            f"Brand: {brand} | "
+            f"Total quantity sold: {data['total_quantity']} | "
+            f"Total net sales: {data['total_net']:.2f}"
+        )
+    print("")
+
+
+def customer_type_shares(sales_history):
+    """
+    Devolver tipo de cliente -> totales de sus ventas más 'share', la
+    parte (0..1) de los ingresos netos que aportan.
+
+    Los totales por tipo se mantienen en cada venta (registro de
+    clientes), así que no se recorre el historial.
+    """
+    totals = sales_history.customer_type_totals()
+    net_income = sum(stats["net_amount"] for stats in totals.values())
+    return {
+        customer_type: dict(
+            stats,
+            share=stats["net_amount"] / net_income if net_income else 0.0,
+        )
+        for customer_type, stats in totals.items()
+    }
+
+
+def format_customer(customer):
+    """
+    Devolver la línea con la que se muestra un cliente en los reportes.
+    """
+    return (
+        f"{customer['name']} ({customer['customer_type']}) | "
+        f"Purchases: {customer['sales_count']} | "
+        f"Units: {customer['quantity']} | "
+        f"Net spent: {customer['net_amount']:.2f} | "
+        f"Last purchase: "
+        f"{datetime.fromtimestamp(customer['last_purchase']):%Y-%m-%d}"
+    )
+
 
+def top_customers_report(sales_history):
+    """
+    Mostrar los K clientes que más han gastado (ingresos netos).
+    """
+    print("\n=== Top K Customers ===")
+
+    if not sales_history:
+        print("No sales registered yet.\n")
+        return
+
+    k = input_int("How many customers (K): ", min_value=1)
+    for idx, customer in enumerate(
+        sales_history.top_customers(k), start=1
+    ):
+        print(f"{idx}. {format_customer(customer)}")
+    print("")
+
+
+def customer_report(sales_history):
+    """
+    Mostrar los totales de un cliente (valor de por vida) y sus
+    compras, leyendo solo las ventas de ese cliente.
+    """
+    print("\n=== Customer Report ===")
+
+    name = input_non_empty_string("Customer name: ")
+    customer = sales_history.find_customer(name)
+    if customer is None:
+        print_error(f"No sales found for customer '{name}'.")
+        return
+
+    purchases = customer["sales_count"]
+    print(f"\n{format_customer(customer)}")
+    print(
+        f"Gross: {customer['gross_amount']:.2f} | "
+        f"Discounts: {customer['discount_amount']:.2f} | "
+        f"Average purchase: {customer['net_amount'] / purchases:.2f} | "
+        f"First purchase: "
+        f"{datetime.fromtimestamp(customer['first_purchase']):%Y-%m-%d}"
+    )
+    paginate(
+        sales_history.customer_sales(customer["id"]),
+        format_sale,
+        header="\n--- Purchases ---",
+        footer="",
+    )
+
+
+def customer_type_report(sales_history):
+    """
+    Mostrar clientes, ventas e ingresos por tipo de cliente (regular,
+    vip, wholesale) y la parte de los ingresos netos de cada uno.
+    """
+    print("\n=== Sales by Customer Type ===")
+
+    if not sales_history:
+        print("No sales registered yet.\n")
+        return
+
+    for customer_type, stats in customer_type_shares(sales_history).items():
         print(
-            f"Product: {product['name']} | Brand: {product['brand']} | "
-            f"Stock: {stock} | Sold: {sold} | "
-            f"Turnover ratio: {turnover_ratio:.2f}"
+            f"Type: {customer_type} | "
+            f"Customers: {stats['customers']} | "
+            f"Sales: {stats['sales_count']} | "
+            f"Discounts: {stats['discount_amount']:.2f} | "
+            f"Net sales: {stats['net_amount']:.2f} | "
+            f"Share: {stats['share']:.1%}"
         )
     print("")
+
+
+def check_report_aggregates(inventory, sales_history):
+    """
+    Modo de verificación de los agregados de reportes.
+
+    - Recalcula desde cero los agregados del historial y los compara
+      con los mantenidos en cada venta.
+    - Comprueba que 'total_sold' de cada producto coincida con las
+      unidades vendidas según el historial.
+    - Comprueba que el índice de stock bajo tenga justo los productos
+      con stock <= reorder_point.
+    - Si hay otros backends de reportes disponibles (NumPy), comprueba
+      que den los mismos resultados que el backend 'python'.
+    """
+    print("\n=== Report Aggregates Check ===")
+
+    problems = sales_history.check_aggregates()
+
+    sold_by_product = sales_history.sold_by_product()
+    low_stock = set()
+    for product in inventory:
+        expected = sold_by_product.get(product.id, 0)
+        if product.total_sold != expected:
+            problems.append(
+                f"product {product.id} total_sold: "
+                f"{product.total_sold} != {expected}"
+            )
+        if product.stock <= product.reorder_point:
+            low_stock.add(product.id)
+
+    indexed = {product.id for product in inventory.below_reorder_point()}
+    if indexed != low_stock:
+        problems.append(
+            f"low stock index: {sorted(indexed ^ low_stock)} differ"
+        )
+
+    problems.extend(compare_report_backends(inventory, sales_history))
+
+    if not problems:
+        print("All report aggregates are consistent.\n")
+        return
+
+    for problem in problems:
+        print_error(problem)
+
+
+def compare_report_backends(inventory, sales_history):
+    """
+    Ejecutar los cuatro reportes con todos los backends disponibles y
+    compararlos con el backend 'python'.
+
+    Devuelve una lista de textos con las diferencias encontradas
+    (los importes se comparan con tolerancia de redondeo).
+    """
+    reference = REPORT_BACKENDS["python"]
+    problems = []
+
+    for name, backend in REPORT_BACKENDS.items():
+        if name == "python":
+            continue
+
+        expected = [p.id for p in reference["top_products"](inventory, 3)]
+        actual = [p.id for p in backend["top_products"](inventory, 3)]
+        if expected != actual:
+            problems.append(f"{name} top products: {actual} != {expected}")
+
+        expected = reference["sales_by_brand"](sales_history)
+        actual = backend["sales_by_brand"](sales_history)
+        if not _same_brand_stats(expected, actual):
+            problems.append(f"{name} sales by brand differs")
+
+        expected = reference["income"](sales_history)
+        actual = backend["income"](sales_history)
+        if any(not _close(expected[key], actual[key]) for key in expected):
+            problems.append(f"{name} income: {actual} != {expected}")
+
+        expected = reference["inventory_performance"](inventory)
+        actual = backend["inventory_performance"](inventory)
+        if len(expected) != len(actual) or any(
+            a["product"].id != b["product"].id
+            or a["stock"] != b["stock"]
+            or a["sold"] != b["sold"]
+            or not _close(a["turnover_ratio"], b["turnover_ratio"])
+            for a, b in zip(expected, actual)
+        ):
+            problems.append(f"{name} inventory performance differs")
+
+    return problems
+
+
+def _same_brand_stats(expected, actual):
+    """
+    Comparar dos resultados de ventas por marca (mismo orden de marcas,
+    mismas unidades e importes netos con tolerancia).
+    """
+    if list(expected) != list(actual):
+        return False
+    for brand, data in expected.items():
+        other = actual[brand]
+        if data["total_quantity"] != other["total_quantity"]:
+            return False
+        if not _close(data["total_net"], other["total_net"]):
+            return False
+    return True
+
+
+def choose_report_backend():
+    """
+    Permitir al usuario elegir el backend de cálculo de los reportes.
+    """
+    print("\n=== Report Backend ===")
+    names = list(REPORT_BACKENDS)
+    for idx, name in enumerate(names, start=1):
+        marker = " (active)" if name == _active_backend else ""
+        print(f"{idx}. {name}{marker}")
+
+    if not reports_numpy.is_available():
+        print("(Install NumPy to enable the 'numpy' backend.)")
+
+    option = input_int(f"Choose backend (1-{len(names)}): ", min_value=1)
+    if option > len(names):
+        print_error("Invalid option.")
+        return
+
+    set_report_backend(names[option - 1])
+    print(f"\nReport backend set to '{names[option - 1]}'.\n")
@@ -0,0 +1,176 @@
+"""
+Backend vectorizado de reportes con NumPy (opcional).
+
+Calcula los mismos cuatro reportes que reports.py, pero sobre arrays:
+- Las columnas del libro de ventas (ledger.SalesLedger) se copian con
+  un slice de array.array (memcpy, sin pasar por objetos de Python) y
+  la copia se ve como array de NumPy (np.frombuffer). No se exporta el
+  buffer de las columnas vivas: mientras hubiera una vista, otro hilo
+  que registrara una venta fallaría con BufferError.
+- El agrupado por marca usa np.unique + np.bincount.
+- Los ingresos son sumas vectoriales.
+- El turnover se calcula para todos los productos a la vez.
+
+Si NumPy no está instalado, is_available() devuelve False y el
+backend no se registra en reports.REPORT_BACKENDS.
+"""
+
+try:
+    import numpy as np
+except ImportError:  # NumPy es una dependencia opcional
+    np = None
+
+from ledger import STRING_COLUMNS
+
+
+def is_available():
+    """
+    Indicar si NumPy está instalado.
+    """
+    return np is not None
+
+
+def _column(array_column, count):
+    """
+    Copiar las 'count' primeras posiciones de una columna del libro
+    (array.array) y verlas como array de NumPy.
+    """
+    if not count:
+        return np.empty(0, dtype=array_column.typecode)
+    return np.frombuffer(array_column[:count], dtype=array_column.typecode)
+
+
+def _sales_columns(sales_history, fields):
+    """
+    Devolver (columnas, textos) para los campos pedidos del historial.
+
+    - columnas: campo -> array de NumPy (las de texto, como códigos)
+    - textos: lista código -> texto
+
+    Con el libro columnar en memoria se copian las columnas hasta la
+    última venta que está completa en todas (otro hilo puede estar
+    añadiendo una); con otros stores (por ejemplo sqlite_store) se
+    recorren las ventas una sola vez.
+    """
+    ledger = getattr(sales_history, "ledger", None)
+    if ledger is not None:
+        count = min(len(ledger.columns[field]) for field in fields)
+        columns = {
+            field: _column(ledger.columns[field], count) for field in fields
+        }
+        return columns, ledger.strings.values
+
+    strings = []
+    codes = {}
+    values = {field: [] for field in fields}
+    for sale in sales_history:
+        for field in fields:
+            value = getattr(sale, field)
+            if field in STRING_COLUMNS:
+                code = codes.get(value)
+                if code is None:
+                    code = codes[value] = len(strings)
+                    strings.append(value)
+                value = code
+            values[field].append(value)
+    columns = {field: np.asarray(column) for field, column in values.items()}
+    return columns, strings
+
+
+def _product_column(products, field):
+    """
+    Construir un array de enteros con un campo de cada producto.
+    """
+    return np.fromiter(
+        (getattr(product, field) for product in products),
+        dtype=np.int64,
+        count=len(products),
+    )
+
+
+def top_products(inventory, k):
+    """
+    Devolver los K productos con más unidades vendidas (total_sold > 0).
+
+    El orden es estable: ante empate se respeta el orden del inventario.
+    """
+    products = inventory.products()
+    sold = _product_column(products, "total_sold")
+    order = np.argsort(-sold, kind="stable")[:k]
+    return [products[i] for i in order if sold[i] > 0]
+
+
+def sales_by_brand(sales_history):
+    """
+    Devolver marca -> {'total_quantity', 'total_net'}, con las marcas
+    en orden de primera aparición (igual que el backend 'python').
+    """
+    columns, brands = _sales_columns(
+        sales_history, ("brand", "quantity", "net_amount")
+    )
+    codes = columns["brand"]
+    if not codes.size:
+        return {}
+
+    unique_codes, first_seen = np.unique(codes, return_index=True)
+    unique_codes = unique_codes[np.argsort(first_seen)]
+
+    quantities = np.bincount(codes, weights=columns["quantity"])
+    net = np.bincount(codes, weights=columns["net_amount"])
+
+    return {
+        brands[code]: {
+            "total_quantity": int(quantities[code]),
+            "total_net": float(net[code]),
+        }
+        for code in unique_codes
+    }
+
+
+def income(sales_history):
+    """
+    Devolver 'gross_income', 'total_discounts' y 'net_income'.
+    """
+    columns, _ = _sales_columns(
+        sales_history, ("gross_amount", "net_amount")
+    )
+    gross_income = float(columns["gross_amount"].sum())
+    net_income = float(columns["net_amount"].sum())
+    return {
+        "gross_income": gross_income,
+        "total_discounts": gross_income - net_income,
+        "net_income": net_income,
+    }
+
+
+def inventory_performance(inventory):
+    """
+    Devolver una fila por producto con 'product', 'stock', 'sold'
+    y 'turnover_ratio', calculando el turnover de todos a la vez.
+    """
+    products = inventory.products()
+    stock = _product_column(products, "stock")
+    sold = _product_column(products, "total_sold")
+    total_handled = stock + sold
+
+    turnover = np.zeros(len(products))
+    np.divide(sold, total_handled, out=turnover, where=total_handled > 0)
+
+    return [
+        {
+            "product": product,
+            "stock": int(stock[i]),
+            "sold": int(sold[i]),
+            "turnover_ratio": float(turnover[i]),
+        }
+        for i, product in enumerate(products)
+    ]
+
+
+# Tabla de cálculos con la misma forma que reports.REPORT_BACKENDS
+BACKEND = {
+    "top_products": top_products,
+    "sales_by_brand": sales_by_brand,
+    "income": income,
+    "inventory_performance": inventory_performance,
+}
@@ -0,0 +1,279 @@
+"""
+Backend de reportes en paralelo (varios procesos).
+
+Para historiales muy grandes, 'sales_by_brand' e 'income' recorren
+las ventas repartidas entre un pool de procesos:
+- el libro de ventas (ledger.SalesLedger) se parte en rangos
+  contiguos de posiciones, es decir, en rangos de IDs de venta (las
+  ventas se guardan en orden de registro);
+- cada proceso calcula los totales parciales de su rango (por código
+  de marca, con la posición de la primera venta de cada marca) con
+  operaciones sobre arrays (np.bincount si NumPy está instalado; si
+  no, sum sobre los array.array y un recorrido por marca);
+- los parciales se combinan en el proceso principal, respetando el
+  orden de primera aparición de las marcas (igual que el backend
+  'python').
+
+El pool de procesos se crea la primera vez y se reutiliza en las
+llamadas siguientes (shutdown() lo cierra; también se cierra al
+salir). Se arranca con forkserver (o spawn), no con fork: los reportes
+se calculan a menudo desde hilos (el servicio usa su ThreadPoolExecutor)
+y un fork en un proceso con hilos puede dejar al hijo bloqueado en un
+lock que otro hilo tenía tomado. Cada proceso recibe solo la copia de
+las columnas de su rango. Con pocos datos (menos de MIN_PARALLEL_SALES
+ventas) o un solo proceso, el mismo cálculo se hace en el proceso
+actual.
+
+Los stores sin libro en memoria (sqlite_store) ya agregan en SQL, así
+que con ellos se usa el cálculo del propio historial.
+"""
+
+import atexit
+import multiprocessing
+import os
+import threading
+
+try:
+    import numpy as np
+except ImportError:  # NumPy es una dependencia opcional
+    np = None
+
+# Por debajo de este número de ventas no compensa arrancar procesos
+MIN_PARALLEL_SALES = 200_000
+
+# Columnas del libro que necesitan los reportes de ventas
+_COLUMNS = ("brand", "quantity", "gross_amount", "net_amount")
+
+# Número de procesos (None = os.cpu_count())
+_workers = None
+
+# Pool de procesos reutilizado entre llamadas (ver _run_in_pool), su
+# número de procesos y el lock que serializa su uso
+_pool = None
+_pool_size = 0
+_pool_lock = threading.Lock()
+
+
+def set_workers(count):
+    """
+    Fijar el número de procesos del pool (None = todos los núcleos).
+    """
+    global _workers
+    if count is not None and count < 1:
+        raise ValueError("Worker count must be at least 1.")
+    _workers = count
+
+
+def get_workers():
+    """
+    Devolver el número de procesos que se usará.
+    """
+    return _workers or os.cpu_count() or 1
+
+
+def partition(count, parts):
+    """
+    Partir las posiciones 0..count en 'parts' rangos contiguos
+    (start, end) de tamaño parecido, sin rangos vacíos.
+    """
+    parts = max(1, min(parts, count))
+    size, extra = divmod(count, parts)
+    ranges = []
+    start = 0
+    for index in range(parts):
+        end = start + size + (1 if index < extra else 0)
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def _slice_columns(columns, start, end):
+    """
+    Copiar las posiciones start..end de las columnas.
+
+    Slices de array.array (copias, memcpy): una vista de memoria sobre
+    las columnas vivas haría fallar con BufferError a quien registre
+    una venta mientras tanto.
+    """
+    return {name: column[start:end] for name, column in columns.items()}
+
+
+def _partial_totals(columns, start):
+    """
+    Totales de un rango de ventas ('columns', ya copiadas; la primera
+    es la venta 'start' del libro).
+
+    Devuelve (por_marca, bruto, neto), donde por_marca es
+    código de marca -> [unidades, neto, posición de la primera venta].
+    """
+    brands = columns["brand"]
+    quantities = columns["quantity"]
+    net_amounts = columns["net_amount"]
+
+    if np is not None and len(brands):
+        codes = np.frombuffer(brands, dtype=brands.typecode)
+        unique_codes, first_seen = np.unique(codes, return_index=True)
+        unit_sums = np.bincount(
+            codes, weights=np.frombuffer(quantities, dtype=np.int64)
+        )
+        net_sums = np.bincount(
+            codes, weights=np.frombuffer(net_amounts, dtype=np.float64)
+        )
+        by_brand = {
+            int(code): [
+                int(unit_sums[code]),
+                float(net_sums[code]),
+                start + int(first),
+            ]
+            for code, first in zip(unique_codes, first_seen)
+        }
+        gross = float(np.frombuffer(columns["gross_amount"]).sum())
+        return by_brand, gross, float(net_sums.sum())
+
+    by_brand = {}
+    for position, (code, quantity, net_amount) in enumerate(
+        zip(brands, quantities, net_amounts), start=start
+    ):
+        totals = by_brand.get(code)
+        if totals is None:
+            by_brand[code] = [quantity, net_amount, position]
+        else:
+            totals[0] += quantity
+            totals[1] += net_amount
+    return by_brand, sum(columns["gross_amount"]), sum(net_amounts)
+
+
+def _worker_totals(task):
+    return _partial_totals(*task)
+
+
+def _pool_context():
+    # forkserver/spawn: los hijos no heredan los hilos ni los locks del
+    # proceso principal (ver la explicación al principio del módulo)
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
+
+def _run_in_pool(size, tasks):
+    """
+    Repartir las tareas en el pool de 'size' procesos (se crea la
+    primera vez, o si cambia el tamaño).
+    """
+    global _pool, _pool_size
+    with _pool_lock:
+        if _pool is None or _pool_size != size:
+            if _pool is not None:
+                _pool.terminate()
+            _pool = _pool_context().Pool(size)
+            _pool_size = size
+        return _pool.map(_worker_totals, tasks)
+
+
+def shutdown():
+    """
+    Cerrar el pool de procesos (la siguiente llamada crea otro).
+    """
+    global _pool, _pool_size
+    with _pool_lock:
+        if _pool is not None:
+            _pool.terminate()
+            _pool.join()
+        _pool = None
+        _pool_size = 0
+
+
+atexit.register(shutdown)
+
+
+def ledger_totals(ledger, workers=None):
+    """
+    Calcular los totales del libro repartiendo el trabajo entre
+    'workers' procesos (por defecto, get_workers()).
+
+    Devuelve (por_marca, bruto, neto) ya combinados; por_marca va en
+    orden de primera aparición.
+    """
+    workers = workers or get_workers()
+    columns = {name: ledger.columns[name] for name in _COLUMNS}
+    # Hasta la última venta que está completa en todas las columnas
+    count = min(len(column) for column in columns.values())
+
+    if workers == 1 or count < MIN_PARALLEL_SALES:
+        partials = [_partial_totals(_slice_columns(columns, 0, count), 0)]
+    else:
+        ranges = partition(count, workers)
+        partials = _run_in_pool(
+            len(ranges),
+            [
+                (_slice_columns(columns, start, end), start)
+                for start, end in ranges
+            ],
+        )
+
+    return _merge(partials)
+
+
+def _merge(partials):
+    """
+    Combinar los totales parciales de varios rangos.
+    """
+    by_brand = {}
+    gross = 0.0
+    net = 0.0
+    for partial_brands, partial_gross, partial_net in partials:
+        gross += partial_gross
+        net += partial_net
+        for code, (quantity, net_amount, first) in partial_brands.items():
+            totals = by_brand.get(code)
+            if totals is None:
+                by_brand[code] = [quantity, net_amount, first]
+            else:
+                totals[0] += quantity
+                totals[1] += net_amount
+                totals[2] = min(totals[2], first)
+
+    ordered = sorted(by_brand.items(), key=lambda item: item[1][2])
+    return dict(ordered), gross, net
+
+
+def sales_by_brand(sales_history):
+    """
+    Devolver marca -> {'total_quantity', 'total_net'}, calculado
+    en paralelo sobre el libro de ventas.
+    """
+    ledger = getattr(sales_history, "ledger", None)
+    if ledger is None:
+        return sales_history.brand_totals()
+
+    by_brand, _, _ = ledger_totals(ledger)
+    names = ledger.strings.values
+    return {
+        names[code]: {"total_quantity": quantity, "total_net": net_amount}
+        for code, (quantity, net_amount, _) in by_brand.items()
+    }
+
+
+def income(sales_history):
+    """
+    Devolver 'gross_income', 'total_discounts' y 'net_income',
+    calculados en paralelo sobre el libro de ventas.
+    """
+    ledger = getattr(sales_history, "ledger", None)
+    if ledger is None:
+        return sales_history.income_totals()
+
+    _, gross_income, net_income = ledger_totals(ledger)
+    return {
+        "gross_income": gross_income,
+        "total_discounts": gross_income - net_income,
+        "net_income": net_income,
+    }
+
+
+# Cálculos de ventas de este backend; reports.py completa los de
+# inventario con los del backend 'python'
+BACKEND = {
+    "sales_by_brand": sales_by_brand,
+    "income": income,
+}
@@ -0,0 +1,333 @@
+"""
+Agregados de ventas por intervalos de tiempo (rollups).
+
+Cada venta guarda su fecha como timestamp numérico (columna
+'timestamp' del libro de ventas, segundos desde epoch), así que no hace
+falta interpretar textos de fecha para consultar por periodos.
+
+SalesRollups mantiene, en cada venta registrada:
+- un índice temporal (TimeIndex) con las posiciones de las ventas
+  ordenadas por timestamp;
+- un aggregates.SalesAggregates por hora, por día y por mes (hora
+  local), identificado por el timestamp de inicio del intervalo.
+
+Una consulta entre dos instantes suma los meses, días y horas
+completos que caben en el rango y solo recorre las ventas de los
+extremos (como mucho dos horas incompletas), así que "ingresos del mes
+pasado" o "ventas por marca de esta semana" no recorren el historial.
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, time, timedelta
+
+from aggregates import SalesAggregates
+
+# Granularidades, de la más gruesa a la más fina
+GRANULARITIES = ("month", "day", "hour")
+
+# Periodos con nombre para period_bounds
+PERIODS = (
+    "today",
+    "yesterday",
+    "this_week",
+    "last_week",
+    "this_month",
+    "last_month",
+    "this_year",
+)
+
+
+def bucket_start(timestamp, granularity):
+    """
+    Devolver el timestamp de inicio de la hora, el día o el mes
+    (hora local) que contiene 'timestamp'.
+    """
+    moment = datetime.fromtimestamp(timestamp)
+    if granularity == "hour":
+        moment = moment.replace(minute=0, second=0, microsecond=0)
+    elif granularity == "day":
+        moment = datetime.combine(moment.date(), time())
+    else:
+        moment = datetime.combine(moment.date().replace(day=1), time())
+    return moment.timestamp()
+
+
+def next_bucket(start, granularity):
+    """
+    Devolver el inicio del intervalo siguiente a 'start'.
+    """
+    if granularity == "hour":
+        return bucket_start(start + 3600, "hour")
+    day = datetime.fromtimestamp(start).date()
+    if granularity == "day":
+        day += timedelta(days=1)
+    else:
+        day = _add_months(day, 1)
+    return datetime.combine(day, time()).timestamp()
+
+
+def _add_months(day, months):
+    month_index = day.year * 12 + day.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def period_bounds(period, now=None):
+    """
+    Devolver (inicio, fin) en timestamps de un periodo con nombre
+    (ver PERIODS), relativo a 'now' (datetime, por defecto ahora).
+
+    Las semanas empiezan el lunes. El fin no se incluye en el periodo.
+    """
+    today = (now or datetime.now()).date()
+    if period in ("today", "yesterday"):
+        first = today - timedelta(days=1 if period == "yesterday" else 0)
+        last = first + timedelta(days=1)
+    elif period in ("this_week", "last_week"):
+        first = today - timedelta(days=today.weekday())
+        if period == "last_week":
+            first -= timedelta(days=7)
+        last = first + timedelta(days=7)
+    elif period in ("this_month", "last_month"):
+        first = today.replace(day=1)
+        if period == "last_month":
+            first = _add_months(first, -1)
+        last = _add_months(first, 1)
+    elif period == "this_year":
+        first = date(today.year, 1, 1)
+        last = date(today.year + 1, 1, 1)
+    else:
+        raise ValueError(f"Unknown period: {period}")
+    return (
+        datetime.combine(first, time()).timestamp(),
+        datetime.combine(last, time()).timestamp(),
+    )
+
+
+class TimeIndex:
+    """
+    Posiciones de las ventas del libro ordenadas por timestamp.
+
+    Normalmente las ventas llegan en orden de fecha y la propia columna
+    'timestamp' del libro ya está ordenada: no se guarda nada más y las
+    búsquedas son bisect sobre la columna. Si llega una venta anterior
+    a la última (por ejemplo, al importar un CSV), las posiciones desde
+    esa venta se apuntan como pendientes y se ordenan todas juntas en
+    la siguiente búsqueda (una ordenación por consulta, no una
+    inserción en medio del array por venta).
+    """
+
+    def __init__(self, timestamps):
+        self._timestamps = timestamps
+        # None mientras la columna esté ordenada
+        self._positions = None
+        self._sorted_times = None
+        # Posiciones añadidas fuera de orden que aún no están en
+        # _positions (si _positions es None, las anteriores a la
+        # primera pendiente están en orden en la columna)
+        self._pending = []
+
+    def add(self, position):
+        """
+        Registrar la venta guardada en 'position' del libro.
+        """
+        if self._positions is None and not self._pending:
+            timestamps = self._timestamps
+            if position == 0 or (
+                timestamps[position] >= timestamps[position - 1]
+            ):
+                return
+        self._pending.append(position)
+
+    def _sort_pending(self):
+        """
+        Llevar las posiciones pendientes al orden explícito.
+        """
+        pending = self._pending
+        if not pending:
+            return
+        timestamps = self._timestamps
+        if self._positions is None:
+            order = list(range(pending[0]))
+        else:
+            order = self._positions.tolist()
+        # El principio ya está ordenado: sort (timsort) lo aprovecha y
+        # el coste es sobre todo el de ordenar las pendientes
+        order.extend(pending)
+        order.sort(key=timestamps.__getitem__)
+        self._positions = array("q", order)
+        self._sorted_times = array("d", map(timestamps.__getitem__, order))
+        self._pending = []
+
+    def rebuild(self):
+        """
+        Recalcular el orden con todas las ventas del libro (una sola
+        ordenación, por ejemplo después de cargar muchas de golpe).
+        """
+        timestamps = self._timestamps
+        self._pending = []
+        if all(a <= b for a, b in zip(timestamps, timestamps[1:])):
+            self._positions = None
+            self._sorted_times = None
+            return
+        order = sorted(range(len(timestamps)), key=timestamps.__getitem__)
+        self._positions = array("q", order)
+        self._sorted_times = array("d", (timestamps[i] for i in order))
+
+    def bounds(self):
+        """
+        Devolver (primer timestamp, último timestamp), o None si no
+        hay ventas.
+        """
+        self._sort_pending()
+        times = self._sorted_times
+        if times is None:
+            times = self._timestamps
+        if not times:
+            return None
+        return times[0], times[-1]
+
+    def positions_between(self, start, end):
+        """
+        Devolver las posiciones de las ventas con start <= timestamp < end.
+        """
+        self._sort_pending()
+        if self._positions is None:
+            timestamps = self._timestamps
+            return range(
+                bisect_left(timestamps, start), bisect_left(timestamps, end)
+            )
+        times = self._sorted_times
+        return self._positions[
+            bisect_left(times, start):bisect_left(times, end)
+        ]
+
+
+class SalesRollups:
+    """
+    Agregados por hora, día y mes de un libro de ventas
+    (ledger.SalesLedger), actualizados en cada venta.
+
+    - buckets[granularidad]: inicio del intervalo -> SalesAggregates
+    """
+
+    def __init__(self, ledger):
+        self.ledger = ledger
+        self.index = TimeIndex(ledger.columns["timestamp"])
+        self.buckets = {granularity: {} for granularity in GRANULARITIES}
+        # Hora de la última venta: (inicio, fin, inicios por granularidad)
+        self._last_hour = None
+
+    def add(self, position, sale):
+        """
+        Añadir la venta guardada en 'position' del libro.
+        """
+        timestamp = self.ledger.columns["timestamp"][position]
+        self.index.add(position)
+
+        last_hour = self._last_hour
+        if last_hour is None or not last_hour[0] <= timestamp < last_hour[1]:
+            starts = {
+                granularity: bucket_start(timestamp, granularity)
+                for granularity in GRANULARITIES
+            }
+            hour = starts["hour"]
+            last_hour = self._last_hour = (
+                hour,
+                next_bucket(hour, "hour"),
+                starts,
+            )
+
+        for granularity, start in last_hour[2].items():
+            bucket = self.buckets[granularity].get(start)
+            if bucket is None:
+                bucket = self.buckets[granularity][start] = SalesAggregates()
+            bucket.add(sale)
+
+    def rebuild(self, sales):
+        """
+        Recalcular el índice temporal y los rollups desde cero con todas
+        las ventas del libro ('sales', en el mismo orden que el libro).
+
+        Cada venta se suma solo a su hora; los días se obtienen sumando
+        horas y los meses sumando días, mucho más rápido que add venta
+        a venta (por ejemplo, al cargar un snapshot).
+        """
+        self.index.rebuild()
+        hours = {}
+        current = None
+        for timestamp, sale in zip(self.ledger.columns["timestamp"], sales):
+            if current is None or not current[0] <= timestamp < current[1]:
+                start = bucket_start(timestamp, "hour")
+                bucket = hours.get(start)
+                if bucket is None:
+                    bucket = hours[start] = SalesAggregates()
+                current = start, next_bucket(start, "hour"), bucket
+            current[2].add(sale)
+
+        self.buckets = {"hour": hours}
+        finer = hours
+        for granularity in ("day", "month"):
+            coarser = {}
+            for start, bucket in finer.items():
+                key = bucket_start(start, granularity)
+                total = coarser.get(key)
+                if total is None:
+                    total = coarser[key] = SalesAggregates()
+                total.merge(bucket)
+            self.buckets[granularity] = finer = coarser
+        self._last_hour = None
+
+    def between(self, start, end):
+        """
+        Devolver un SalesAggregates con las ventas de start <= t < end
+        (timestamps).
+        """
+        result = SalesAggregates()
+        bounds = self.index.bounds()
+        if bounds is None:
+            return result
+        first_sale, last_sale = bounds
+        if start > last_sale or end <= first_sale:
+            return result
+        # Si el rango empieza antes de la primera venta o termina después
+        # de la última, las horas de esas ventas entran enteras: se suman
+        # sus intervalos en lugar de recorrer sus ventas (la hora actual
+        # puede tener muchas)
+        if start <= first_sale:
+            start = bucket_start(first_sale, "hour")
+        if end > last_sale:
+            end = next_bucket(bucket_start(last_sale, "hour"), "hour")
+
+        first_hour = bucket_start(start, "hour")
+        if first_hour < start:
+            first_hour = next_bucket(first_hour, "hour")
+        last_hour = bucket_start(end, "hour")
+        if first_hour >= last_hour:
+            self._scan(result, start, end)
+            return result
+
+        # Extremos: horas incompletas, desde el índice temporal
+        self._scan(result, start, first_hour)
+        self._scan(result, last_hour, end)
+
+        # Centro: el intervalo más grueso que empiece en 'cursor' y
+        # quepa entero en el rango
+        cursor = first_hour
+        while cursor < last_hour:
+            for granularity in GRANULARITIES:
+                if bucket_start(cursor, granularity) != cursor:
+                    continue
+                following = next_bucket(cursor, granularity)
+                if following <= last_hour or granularity == "hour":
+                    break
+            bucket = self.buckets[granularity].get(cursor)
+            if bucket is not None:
+                result.merge(bucket)
+            cursor = following
+        return result
+
+    def _scan(self, result, start, end):
+        ledger = self.ledger
+        for position in self.index.positions_between(start, end):
+            result.add(ledger[position])
@@ -4,10 +4,16 @@ Módulo de ventas: registrar y consultar ventas, validar stock
 y actualizar el inventario automáticamente.
 """
 
-from models import CUSTOMER_DISCOUNTS, create_sale_record
+from contextlib import ExitStack
+
+from instrumentation import instrumented
+from models import CUSTOMER_DISCOUNTS, create_sale_record, sale_time
+from pricing import get_pricing_engine
 from utils import (
+    PAGE_SIZE,
     input_non_empty_string,
     input_int,
+    paginate,
     print_error,
     print_success,
 )
@@ -23,24 +29,32 @@ def choose_customer_type():
     2. VIP
     3. Wholesale
 
+    con el descuento que da a cada tipo el motor de reglas activo
+    (pricing.get_pricing_engine; por defecto, CUSTOMER_DISCOUNTS).
+
     Devuelve:
     - customer_type: cadena ('regular', 'vip', 'wholesale')
-    - discount_rate: valor decimal del descuento según la constante
-      CUSTOMER_DISCOUNTS.
+    - discount_rate: valor decimal de ese descuento (en cada venta
+      otras reglas del motor pueden dar más).
     """
+    engine = get_pricing_engine()
+    rates = {
+        customer_type: engine.customer_discount(customer_type)
+        for customer_type in CUSTOMER_DISCOUNTS
+    }
     print("\nCustomer types:")
-    print("1. Regular (0% discount)")
-    print("2. VIP (10% discount)")
-    print("3. Wholesale (15% discount)")
+    print(f"1. Regular ({rates['regular'] * 100:g}% discount)")
+    print(f"2. VIP ({rates['vip'] * 100:g}% discount)")
+    print(f"3. Wholesale ({rates['wholesale'] * 100:g}% discount)")
 
     while True:
         option = input_int("Choose customer type (1-3): ")
         if option == 1:
-            return "regular", CUSTOMER_DISCOUNTS["regular"]
+            return "regular", rates["regular"]
         elif option == 2:
-            return "vip", CUSTOMER_DISCOUNTS["vip"]
+            return "vip", rates["vip"]
         elif option == 3:
-            return "wholesale", CUSTOMER_DISCOUNTS["wholesale"]
+            return "wholesale", rates["wholesale"]
         else:
             print_error("Invalid option. Please choose 1, 2, or 3.")
 
@@ -50,29 +64,320 @@ def get_next_sale_id(sales_history):
     Obtener el siguiente ID disponible para una venta.
 
     - Si no hay ventas, devuelve 1.
-    - Si ya hay, toma el máximo id y suma 1.
+    - Si ya hay, devuelve el mayor ID usado más 1 (en O(1), usando
+      el IdAllocator del historial).
     """
-    if not sales_history:
-        return 1
-    max_id = max(sale["id"] for sale in sales_history)
-    return max_id + 1
+    return sales_history.next_id()
+
+
+@instrumented("sale.complete")
+def complete_sale(
+    inventory,
+    sales_history,
+    customer_name,
+    customer_type,
+    product,
+    quantity,
+):
+    """
+    Registrar una venta y devolver su registro.
+
+    - Vuelve a comprobar el stock con el lock del producto tomado
+      (inventory.product_lock) y lo mantiene hasta descontarlo, para
+      que varios hilos no puedan vender las mismas unidades. Si ya no
+      hay stock suficiente lanza ValueError y no se registra nada.
+    - Genera el ID de venta.
+    - Crea el registro con create_sale_record, con el descuento que
+      da el motor de reglas activo (pricing.get_pricing_engine; por
+      defecto, el de CUSTOMER_DISCOUNTS según el tipo de cliente) en
+      el instante de la venta.
+    - Actualiza el inventario: reduce stock y aumenta total_sold e
+      ingresos (para reportes y rankings).
+    - Guarda la venta en el historial.
+
+    El inventario y el historial se actualizan con el lock tomado y
+    dentro de inventory.transaction() (como en complete_order): en
+    SQLite ambos cambios se confirman juntos, y con persistencia en
+    disco no se escribe un snapshot con la venta aplicada al inventario
+    pero todavía sin anotar en el diario.
+    """
+    with inventory.product_lock(product.id):
+        available = inventory.current_stock(product)
+        if quantity > available:
+            raise ValueError(
+                f"Not enough stock. Available: {available}, "
+                f"Requested: {quantity}"
+            )
+        with inventory.transaction():
+            # El descuento se calcula en el mismo instante que se
+            # guarda como fecha de la venta
+            now = sale_time()
+            sale = create_sale_record(
+                sale_id=get_next_sale_id(sales_history),
+                customer_name=customer_name,
+                customer_type=customer_type,
+                product=product,
+                quantity=quantity,
+                discount_rate=get_pricing_engine().discount_rate(
+                    customer_type, product, quantity, now[1]
+                ),
+                now=now,
+            )
+            inventory.record_sale(product, quantity, sale.net_amount)
+            sales_history.append(sale)
+    return sale
+
+
+@instrumented("order.complete")
+def complete_order(
+    inventory,
+    sales_history,
+    customer_name,
+    customer_type,
+    lines,
+):
+    """
+    Registrar un pedido de varias líneas como una sola operación y
+    devolver su resumen (ver order_summary).
+
+    - lines: lista de (producto, cantidad); un producto puede repetirse.
+
+    Todo o nada:
+    - se toman los locks de todos los productos del pedido (en orden de
+      ID, para que dos pedidos no se bloqueen entre sí) y se comprueba
+      el stock de todas las líneas antes de modificar nada. Si alguna
+      no tiene stock suficiente se lanza ValueError y no se registra
+      ninguna;
+    - los IDs de venta se reservan de una vez (next_ids) y las ventas,
+      una por línea y con la misma fecha, se añaden juntas al historial
+      (extend);
+    - todo ocurre dentro de inventory.transaction(): en SQLite es una
+      transacción (si algo falla se deshace entero) y con persistencia
+      en disco el pedido se escribe con un solo fsync.
+    """
+    if not lines:
+        raise ValueError("The order has no lines.")
+
+    requested = {}
+    products = {}
+    for product, quantity in lines:
+        requested[product.id] = requested.get(product.id, 0) + quantity
+        products[product.id] = product
+
+    engine = get_pricing_engine()
+    with ExitStack() as locks:
+        for product_id in sorted(requested):
+            locks.enter_context(inventory.product_lock(product_id))
+
+        for product_id, quantity in requested.items():
+            available = inventory.current_stock(products[product_id])
+            if quantity > available:
+                raise ValueError(
+                    f"Not enough stock for "
+                    f"'{products[product_id].name}'. "
+                    f"Available: {available}, Requested: {quantity}"
+                )
+
+        with inventory.transaction():
+            sale_ids = sales_history.next_ids(len(lines))
+            # Todas las líneas del pedido con la misma fecha
+            now = sale_time()
+            # Primero se calculan todas las líneas y después se aplican,
+            # así un error al calcular una no deja otras ya descontadas
+            sales = [
+                create_sale_record(
+                    sale_id=sale_id,
+                    customer_name=customer_name,
+                    customer_type=customer_type,
+                    product=product,
+                    quantity=quantity,
+                    discount_rate=engine.discount_rate(
+                        customer_type, product, quantity, now[1]
+                    ),
+                    now=now,
+                )
+                for sale_id, (product, quantity) in zip(sale_ids, lines)
+            ]
+            for sale, (product, quantity) in zip(sales, lines):
+                inventory.record_sale(product, quantity, sale.net_amount)
+            sales_history.extend(sales)
+    return order_summary(sales)
+
+
+def order_summary(sales):
+    """
+    Resumen de un pedido: cliente, sus ventas (una por línea) y los
+    totales del pedido.
+    """
+    return {
+        "customer_name": sales[0].customer_name,
+        "customer_type": sales[0].customer_type,
+        "sales": sales,
+        "quantity": sum(sale.quantity for sale in sales),
+        "gross_amount": sum(sale.gross_amount for sale in sales),
+        "discount_amount": sum(sale.discount_amount for sale in sales),
+        "net_amount": sum(sale.net_amount for sale in sales),
+    }
+
+
+def validate_order_lines(inventory, order):
+    """
+    Validar un pedido de varias líneas sin interacción con el usuario.
+
+    - order: diccionario con 'customer_name', 'customer_type' y
+      'lines' (lista de diccionarios con 'product_id' y 'quantity').
+
+    Devuelve (lista de (producto, cantidad), None) si es válido o
+    (None, mensaje de error). El stock se comprueba en complete_order.
+    """
+    customer_name = str(order.get("customer_name", "")).strip()
+    if not customer_name:
+        return None, "Customer name cannot be empty."
+
+    if order.get("customer_type") not in CUSTOMER_DISCOUNTS:
+        return None, f"Invalid customer type: {order.get('customer_type')}"
+
+    raw_lines = order.get("lines")
+    if not isinstance(raw_lines, list) or not raw_lines:
+        return None, "The order must have a non-empty list of lines."
+
+    lines = []
+    for number, line in enumerate(raw_lines, start=1):
+        try:
+            product_id = int(line.get("product_id"))
+            quantity = int(line.get("quantity"))
+        except (AttributeError, TypeError, ValueError):
+            return None, (
+                f"Line {number}: product ID and quantity must be integers."
+            )
+        if quantity < 1:
+            return None, f"Line {number}: quantity must be at least 1."
+        product = find_product_by_id(inventory, product_id)
+        if not product:
+            return None, f"Line {number}: product not found: {product_id}"
+        lines.append((product, quantity))
+    return lines, None
+
+
+def process_order(inventory, sales_history, order):
+    """
+    Registrar un pedido de varias líneas sin prompts (API no
+    interactiva).
+
+    Devuelve {'ok': True, 'order': resumen} o {'ok': False, 'error':
+    texto}; si hay error no se registra ninguna línea.
+    """
+    lines, error = validate_order_lines(inventory, order)
+    if error:
+        return {"ok": False, "error": error}
+    try:
+        summary = complete_order(
+            inventory,
+            sales_history,
+            str(order["customer_name"]).strip(),
+            order["customer_type"],
+            lines,
+        )
+    except ValueError as error:
+        return {"ok": False, "error": str(error)}
+    return {"ok": True, "order": summary}
+
+
+def validate_order(inventory, order):
+    """
+    Validar un pedido sin interacción con el usuario.
+
+    - order: diccionario con 'customer_name', 'customer_type',
+      'product_id' y 'quantity'.
+
+    Devuelve (producto, None) si es válido o (None, mensaje de error).
+    """
+    customer_name = str(order.get("customer_name", "")).strip()
+    if not customer_name:
+        return None, "Customer name cannot be empty."
+
+    if order.get("customer_type") not in CUSTOMER_DISCOUNTS:
+        return None, f"Invalid customer type: {order.get('customer_type')}"
+
+    try:
+        product_id = int(order.get("product_id"))
+        quantity = int(order.get("quantity"))
+    except (TypeError, ValueError):
+        return None, "Product ID and quantity must be integers."
+
+    if quantity < 1:
+        return None, "Quantity must be at least 1."
+
+    product = find_product_by_id(inventory, product_id)
+    if not product:
+        return None, f"Product not found: {product_id}"
+
+    if quantity > product.stock:
+        return None, (
+            f"Not enough stock. Available: {product.stock}, "
+            f"Requested: {quantity}"
+        )
+
+    return product, None
+
+
+def process_sales(inventory, sales_history, batch):
+    """
+    Procesar un lote de pedidos sin prompts (API no interactiva).
+
+    - batch: iterable de pedidos (ver validate_order). Un pedido con
+      'lines' tiene varias líneas y se registra entero o nada (ver
+      process_order).
+
+    Cada pedido se valida y, si es correcto, se registra en el acto,
+    así que los pedidos siguientes ya ven el stock actualizado. Se puede
+    llamar desde varios hilos con el mismo inventario: el stock se
+    comprueba de nuevo de forma atómica en complete_sale.
+
+    Devuelve una lista de resultados, uno por pedido y en el mismo
+    orden: {'ok': True, 'sale': venta}, {'ok': True, 'order': resumen}
+    (pedidos con 'lines') o {'ok': False, 'error': texto}.
+    """
+    results = []
+    for order in batch:
+        if "lines" in order:
+            results.append(process_order(inventory, sales_history, order))
+            continue
+
+        product, error = validate_order(inventory, order)
+        if error:
+            results.append({"ok": False, "error": error})
+            continue
+
+        try:
+            sale = complete_sale(
+                inventory,
+                sales_history,
+                str(order["customer_name"]).strip(),
+                order["customer_type"],
+                product,
+                int(order["quantity"]),
+            )
+        except ValueError as error:
+            results.append({"ok": False, "error": str(error)})
+            continue
+        results.append({"ok": True, "sale": sale})
+    return results
 
 
 def register_sale(inventory, sales_history):
     """
-    Registrar una nueva venta.
+    Registrar una nueva venta (un pedido con uno o varios productos).
 
     Tareas principales:
     - Pedir nombre del cliente.
     - Permitir elegir tipo de cliente (y por tanto descuento).
     - Mostrar productos disponibles.
-    - Validar que el producto exista y que tenga stock suficiente.
-    - Pedir cantidad.
-    - Crear el registro de venta (create_sale_record).
-    - Actualizar el inventario:
-      - reducir stock
-      - aumentar total_sold
-    - Agregar la venta al historial.
+    - Pedir producto y cantidad de cada línea, validando que el
+      producto exista y que tenga stock suficiente (contando las
+      líneas anteriores del mismo producto).
+    - Registrar todas las líneas a la vez con complete_order (todo o
+      nada: registro, inventario e historial).
     """
     print("\n=== Register New Sale ===")
 
@@ -83,74 +388,127 @@ def register_sale(inventory, sales_history):
     # Se pide el nombre del cliente
     customer_name = input_non_empty_string("Customer name: ")
 
-    # Se elige el tipo de cliente y se obtiene el descuento asociado
-    customer_type, discount_rate = choose_customer_type()
+    # Se elige el tipo de cliente (el descuento se aplica en complete_order)
+    customer_type, _ = choose_customer_type()
 
-    # Mostrar productos para que se seleccione uno
-    list_products(inventory)
+    # Mostrar productos para que se seleccione uno (primera página)
+    list_products(inventory, interactive=False)
 
-    product_id = input_int("Enter product ID to sell: ", min_value=1)
-    product = find_product_by_id(inventory, product_id)
-
-    if not product:
-        print_error("Product not found.")
-        return
+    lines = []
+    # Unidades ya pedidas de cada producto en este pedido
+    in_basket = {}
+    while True:
+        product_id = input_int("Enter product ID to sell: ", min_value=1)
+        product = find_product_by_id(inventory, product_id)
+        available = 0
+        if not product:
+            print_error("Product not found.")
+        else:
+            available = product.stock - in_basket.get(product.id, 0)
+            # Validar que haya stock disponible
+            if available <= 0:
+                print_error("This product has no stock available.")
 
-    # Validar que haya stock disponible
-    if product["stock"] <= 0:
-        print_error("This product has no stock available.")
-        return
+        if available > 0:
+            quantity = input_int("Quantity to sell: ", min_value=1)
+            # Validar que la cantidad pedida no supere el stock
+            if quantity > available:
+                print_error(
+                    f"Not enough stock. Available: {available}, "
+                    f"Requested: {quantity}"
+                )
+            else:
+                lines.append((product, quantity))
+                in_basket[product.id] = (
+                    in_basket.get(product.id, 0) + quantity
+                )
 
-    quantity = input_int("Quantity to sell: ", min_value=1)
+        if not lines:
+            return
+        another = input("Add another product? (y/n): ").strip().lower()
+        if another != "y":
+            break
 
-    # Validar que la cantidad pedida no supere el stock
-    if quantity > product["stock"]:
-        print_error(
-            f"Not enough stock. Available: {product['stock']}, "
-            f"Requested: {quantity}"
+    # Crear las ventas, actualizar inventario y guardarlas en el
+    # historial (el stock se vuelve a comprobar por si otra caja
+    # vendió antes)
+    try:
+        order = complete_order(
+            inventory,
+            sales_history,
+            customer_name,
+            customer_type,
+            lines,
         )
+    except ValueError as error:
+        print_error(str(error))
         return
 
-    # Generar ID de venta
-    sale_id = get_next_sale_id(sales_history)
-
-    # Crear el registro de venta con el modelo
-    sale = create_sale_record(
-        sale_id=sale_id,
-        customer_name=customer_name,
-        customer_type=customer_type,
-        product=product,
-        quantity=quantity,
-        discount_rate=discount_rate,
-    )
-
-    # Actualizar inventario:
-    # - reducir stock
-    # - aumentar total_sold (para reportes)
-    product["stock"] -= quantity
-    product["total_sold"] += quantity
+    print_success("Sale registered successfully.")
+    # Mostrar resumen corto de cada línea
+    engine = get_pricing_engine()
+    for sale, (product, quantity) in zip(order["sales"], lines):
+        print(
+            f"Sale ID: {sale.id} | Customer: {sale.customer_name} | "
+            f"Product: {sale.product_name} | Qty: {sale.quantity} | "
+            f"Gross: {sale.gross_amount:.2f} | "
+            f"Discount: {sale.discount_amount:.2f} | "
+            f"Net: {sale.net_amount:.2f}"
+        )
+        rules = engine.explain(
+            customer_type, product, quantity, when=sale.timestamp
+        )
+        if rules:
+            print(f"  Discount rules applied: {', '.join(rules)}")
+    if len(lines) > 1:
+        print(
+            f"Order total: {len(lines)} lines | "
+            f"Qty: {order['quantity']} | "
+            f"Gross: {order['gross_amount']:.2f} | "
+            f"Discount: {order['discount_amount']:.2f} | "
+            f"Net: {order['net_amount']:.2f}"
+        )
 
-    # Guardar la venta en el historial
-    sales_history.append(sale)
 
-    print_success("Sale registered successfully.")
-    # Mostrar resumen corto de la venta
-    print(
-        f"Sale ID: {sale['id']} | Customer: {sale['customer_name']} | "
-        f"Product: {sale['product_name']} | Qty: {sale['quantity']} | "
-        f"Gross: {sale['gross_amount']:.2f} | "
-        f"Discount: {sale['discount_amount']:.2f} | "
-        f"Net: {sale['net_amount']:.2f}"
+def format_sale(sale):
+    """
+    Devolver la línea con la que se muestra una venta en el historial.
+    """
+    return (
+        f"ID: {sale.id} | Date: {sale.date} | "
+        f"Customer: {sale.customer_name} ({sale.customer_type}) | "
+        f"Product: {sale.product_name} | Brand: {sale.brand} | "
+        f"Qty: {sale.quantity} | "
+        f"Gross: {sale.gross_amount:.2f} | "
+        f"Discount: {sale.discount_amount:.2f} | "
+        f"Net: {sale.net_amount:.2f}"
     )
 
 
+def filter_sales(sales_history, brand=None, min_id=None, max_id=None):
+    """
+    Devolver las ventas que cumplen los filtros, o el propio historial
+    si no hay filtros (así paginate solo lee las filas de cada página).
+    """
+    if brand is None and min_id is None and max_id is None:
+        return sales_history
+    return [
+        sale
+        for sale in sales_history
+        if (brand is None or sale.brand == brand)
+        and (min_id is None or sale.id >= min_id)
+        and (max_id is None or sale.id <= max_id)
+    ]
+
+
 def show_sales_history(sales_history):
     """
-    Mostrar el historial de ventas.
+    Mostrar el historial de ventas por páginas.
 
     Si no hay ventas, muestra un mensaje indicándolo.
     Cada venta incluye información de cliente, producto, marca, cantidades
-    y montos (bruto, descuento y neto).
+    y montos (bruto, descuento y neto). Si el historial no cabe en una
+    página, primero se ofrece filtrar por marca o rango de IDs.
     """
     print("\n=== Sales History ===")
 
@@ -158,14 +516,22 @@ def show_sales_history(sales_history):
         print("No sales registered yet.\n")
         return
 
-    for sale in sales_history:
-        print(
-            f"ID: {sale['id']} | Date: {sale['date']} | "
-            f"Customer: {sale['customer_name']} ({sale['customer_type']}) | "
-            f"Product: {sale['product_name']} | Brand: {sale['brand']} | "
-            f"Qty: {sale['quantity']} | "
-            f"Gross: {sale['gross_amount']:.2f} | "
-            f"Discount: {sale['discount_amount']:.2f} | "
-            f"Net: {sale['net_amount']:.2f}"
-        )
-    print("")
+    filters = {}
+    if len(sales_history) > PAGE_SIZE:
+        print("Filter sales:")
+        print("1. All sales")
+        print("2. By brand")
+        print("3. By sale ID range")
+        option = input_int("Choose an option (1-3): ", min_value=1)
+        if option == 2:
+            filters["brand"] = input_non_empty_string("Brand: ")
+        elif option == 3:
+            filters["min_id"] = input_int("From ID: ", min_value=1)
+            filters["max_id"] = input_int("To ID: ", min_value=1)
+
+    sales = filter_sales(sales_history, **filters)
+    if not sales:
+        print("No sales match the filter.\n")
+        return
+
+    paginate(sales, format_sale, footer="")
@@ -0,0 +1,280 @@
+"""
+Búsqueda de productos por texto (nombre, marca y categoría).
+
+ProductSearchIndex es un índice invertido en memoria:
+- cada texto se parte en palabras en minúsculas (tokens);
+- token -> productos que lo contienen (en orden de alta);
+- lista ordenada de tokens distintos, para buscar por prefijo con
+  bisect;
+- trigramas (3 letras seguidas) -> tokens que los contienen, para
+  buscar palabras que contengan el texto buscado en cualquier posición.
+
+Los trigramas se guardan por token distinto, no por producto: en un
+catálogo las mismas palabras se repiten mucho, así que el índice crece
+con el vocabulario y no con el número de productos.
+
+Los resultados se ordenan por calidad de coincidencia:
+1. palabra completa ("tv" encuentra "Smart TV")
+2. comienzo de palabra ("head" encuentra "Headphones")
+3. dentro de una palabra ("phone" encuentra "Smartphone"; solo para
+   textos de 3 letras o más)
+Con varias palabras en la consulta, cada producto debe contenerlas
+todas y cuenta la peor coincidencia. Como los grupos se recorren en
+ese orden y la búsqueda para al llegar al límite, una consulta muy
+común no recorre todos los productos que coinciden.
+
+El índice se mantiene al día como listener de store.Inventory
+(on_product_added / on_product_updated / on_product_removed).
+"""
+
+import re
+from bisect import bisect_left, insort
+
+# Campos del producto que se indexan
+SEARCH_FIELDS = ("name", "brand", "category")
+
+# Resultados por defecto de una búsqueda
+DEFAULT_LIMIT = 20
+
+# Calidad de coincidencia (menor es mejor)
+WORD, PREFIX, SUBSTRING = 0, 1, 2
+
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text):
+    """
+    Partir un texto en palabras en minúsculas.
+    """
+    return _TOKEN.findall(text.lower())
+
+
+def _product_tokens(product):
+    tokens = set()
+    for field in SEARCH_FIELDS:
+        tokens.update(tokenize(getattr(product, field)))
+    return frozenset(tokens)
+
+
+def _trigrams(token):
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+
+class ProductSearchIndex:
+    """
+    Índice de búsqueda de productos.
+
+    - search(texto, limit): productos que coinciden, mejores primero
+    - add / update / remove: mantener el índice (o usarlo como
+      listener del inventario)
+    """
+
+    def __init__(self, products=()):
+        self._products = {}
+        self._product_tokens = {}
+        self._postings = {}
+        self._sorted_tokens = []
+        self._grams = {}
+
+        # Carga inicial: la lista ordenada de tokens se ordena una sola
+        # vez al final en lugar de insertar cada token en su sitio
+        self._bulk = True
+        for product in products:
+            self.add(product)
+        self._bulk = False
+        self._sorted_tokens = sorted(self._postings)
+
+    def __len__(self):
+        return len(self._products)
+
+    # --------------------------------------------------------
+    # Mantenimiento
+    # --------------------------------------------------------
+
+    def add(self, product):
+        """
+        Indexar un producto nuevo.
+        """
+        product_id = product.id
+        tokens = _product_tokens(product)
+        self._products[product_id] = product
+        self._product_tokens[product_id] = tokens
+        for token in tokens:
+            self._add_posting(token, product_id)
+
+    def remove(self, product_id):
+        """
+        Quitar un producto del índice (si está).
+        """
+        tokens = self._product_tokens.pop(product_id, None)
+        if tokens is None:
+            return
+        del self._products[product_id]
+        for token in tokens:
+            self._remove_posting(token, product_id)
+
+    def update(self, product):
+        """
+        Reindexar un producto cuyos textos pueden haber cambiado.
+
+        Solo se tocan las palabras que cambian: una venta (que solo
+        cambia el stock) no modifica el índice.
+        """
+        product_id = product.id
+        old_tokens = self._product_tokens.get(product_id)
+        if old_tokens is None:
+            self.add(product)
+            return
+
+        tokens = _product_tokens(product)
+        self._products[product_id] = product
+        if tokens == old_tokens:
+            return
+        self._product_tokens[product_id] = tokens
+        for token in old_tokens - tokens:
+            self._remove_posting(token, product_id)
+        for token in tokens - old_tokens:
+            self._add_posting(token, product_id)
+
+    def _add_posting(self, token, product_id):
+        posting = self._postings.get(token)
+        if posting is None:
+            posting = self._postings[token] = {}
+            self._add_token(token)
+        posting[product_id] = None
+
+    def _remove_posting(self, token, product_id):
+        posting = self._postings[token]
+        del posting[product_id]
+        if not posting:
+            del self._postings[token]
+            self._remove_token(token)
+
+    def _add_token(self, token):
+        if not self._bulk:
+            insort(self._sorted_tokens, token)
+        for gram in _trigrams(token):
+            self._grams.setdefault(gram, set()).add(token)
+
+    def _remove_token(self, token):
+        index = bisect_left(self._sorted_tokens, token)
+        del self._sorted_tokens[index]
+        for gram in _trigrams(token):
+            tokens = self._grams[gram]
+            tokens.discard(token)
+            if not tokens:
+                del self._grams[gram]
+
+    # Eventos de store.Inventory
+
+    def on_product_added(self, product):
+        self.add(product)
+
+    def on_product_updated(self, product):
+        self.update(product)
+
+    def on_product_removed(self, product):
+        self.remove(product.id)
+
+    # --------------------------------------------------------
+    # Consultas
+    # --------------------------------------------------------
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        """
+        Devolver hasta 'limit' productos que contienen todas las
+        palabras de la consulta, las mejores coincidencias primero.
+        """
+        terms = tokenize(query)
+        if not terms or limit < 1:
+            return []
+
+        found = {}
+        for quality in (WORD, PREFIX, SUBSTRING):
+            # Se recorren los productos de la palabra más selectiva y se
+            # comprueban las demás en cada candidato
+            driver, tokens = self._driver(terms, quality)
+            others = [term for term in terms if term is not driver]
+            for token in tokens:
+                for product_id in self._postings[token]:
+                    if product_id in found:
+                        continue
+                    if self._matches(product_id, others, quality):
+                        found[product_id] = self._products[product_id]
+                        if len(found) == limit:
+                            return list(found.values())
+        return list(found.values())
+
+    def _driver(self, terms, quality):
+        """
+        Elegir la palabra de la consulta con menos productos para esa
+        calidad de coincidencia.
+
+        Devuelve (palabra, tokens del índice que coinciden con ella).
+        Se empieza por la más larga, que suele ser la más selectiva, y
+        se deja de contar una palabra en cuanto supera a la mejor.
+        """
+        ordered = sorted(terms, key=len, reverse=True)
+        if len(ordered) == 1:
+            return ordered[0], self._matching_tokens(ordered[0], quality)
+
+        best = None
+        for term in ordered:
+            tokens = []
+            count = 0
+            for token in self._matching_tokens(term, quality):
+                tokens.append(token)
+                count += len(self._postings[token])
+                if best is not None and count >= best[0]:
+                    break
+            else:
+                best = (count, term, tokens)
+        return best[1], best[2]
+
+    def _matching_tokens(self, term, quality):
+        """
+        Tokens del índice que coinciden con 'term' con esa calidad o
+        mejor (un producto descartado en un grupo anterior por las
+        otras palabras puede entrar en uno posterior).
+        """
+        if quality == WORD:
+            if term in self._postings:
+                yield term
+        elif quality == PREFIX:
+            tokens = self._sorted_tokens
+            index = bisect_left(tokens, term)
+            while index < len(tokens) and tokens[index].startswith(term):
+                yield tokens[index]
+                index += 1
+        elif len(term) >= 3:
+            candidates = None
+            for gram in sorted(
+                _trigrams(term), key=lambda g: len(self._grams.get(g, ()))
+            ):
+                tokens = self._grams.get(gram)
+                if not tokens:
+                    return
+                candidates = (
+                    set(tokens) if candidates is None else candidates & tokens
+                )
+            for token in sorted(candidates):
+                if term in token:
+                    yield token
+
+    def _matches(self, product_id, terms, quality):
+        """
+        Comprobar que el producto contiene cada término con al menos
+        la calidad indicada.
+        """
+        tokens = self._product_tokens[product_id]
+        for term in terms:
+            if term in tokens:
+                continue
+            if quality == WORD:
+                return False
+            if quality == PREFIX:
+                if not any(token.startswith(term) for token in tokens):
+                    return False
+            elif not any(term in token for token in tokens):
+                return False
+        return True
@@ -0,0 +1,646 @@
+"""
+Servicio HTTP/JSON local (asyncio) para el inventario y las ventas.
+
+Un solo bucle de eventos atiende a muchos clientes a la vez
+(asyncio.start_server, conexiones keep-alive). Las operaciones son las
+mismas del menú de consola, sin prompts:
+
+    GET    /products              ?offset=0&limit=100
+                                  &brand=...&category=... (opcionales)
+                                  ?q=texto&limit=20 (búsqueda)
+    POST   /products              crear (inventory.create_product)
+    GET    /products/{id}
+    PATCH  /products/{id}         modificar (inventory.change_product)
+    DELETE /products/{id}
+    POST   /sales                 un pedido o una lista de pedidos
+                                  (con 'lines', pedido de varias líneas)
+    GET    /sales                 ?offset=0&limit=100
+    GET    /reports/top           ?k=3&by=units&brand=...&category=...
+    GET    /reports/sales-by-brand  ?period=last_month o
+    GET    /reports/income            ?start=YYYY-MM-DD&end=YYYY-MM-DD
+    GET    /reports/performance
+    GET    /reports/customers     ?k=10 (top K) o ?name=... (un cliente)
+    GET    /reports/customer-types
+    GET    /reports/low-stock     ?limit=... (en su punto de pedido)
+    GET    /alerts/low-stock      últimas alertas de stock bajo
+    GET    /reports/stock-cover   ?k=20 (velocidad y días de cobertura)
+
+Las ventas que llegan a la vez se agrupan (SaleBatcher): se procesan
+con sales.process_sales, pedido a pedido, dentro de una transacción
+del almacenamiento (un COMMIT en SQLite, un fsync del diario con
+--data-dir), así muchas ventas concurrentes comparten el coste de E/S.
+Los lotes y los cambios de productos se registran en el
+ThreadPoolExecutor del bucle, como los reportes, para que el COMMIT o
+el fsync no detengan al resto de conexiones.
+
+Para arrancarlo:
+    python main.py --serve --port 8080
+"""
+
+import asyncio
+import json
+import re
+from collections.abc import Mapping
+from contextlib import nullcontext
+from functools import partial
+from urllib.parse import parse_qs, urlsplit
+
+from alerts import LowStockAlerts
+from inventory import change_product, create_product, find_product_by_id
+from reports import (
+    STOCK_COVER_ROWS,
+    compute_period,
+    compute_report,
+    compute_stock_cover,
+    customer_type_shares,
+    parse_period,
+    top_k_products,
+)
+from sales import process_sales
+from search import DEFAULT_LIMIT
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+
+# Agrupado de ventas: como mucho MAX_BATCH pedidos por lote, esperando
+# como mucho BATCH_DELAY segundos a que lleguen más
+MAX_BATCH = 256
+BATCH_DELAY = 0.002
+
+# Tamaño de página por defecto de GET /products y GET /sales
+PAGE_SIZE = 100
+
+# Tamaño máximo del cuerpo de una petición (bytes)
+MAX_BODY = 1_000_000
+
+# Rutas: (método, patrón de la ruta, método de InventoryService)
+ROUTES = (
+    ("GET", r"/products", "list_products"),
+    ("POST", r"/products", "add_product"),
+    ("GET", r"/products/(\d+)", "get_product"),
+    ("PATCH", r"/products/(\d+)", "update_product"),
+    ("PUT", r"/products/(\d+)", "update_product"),
+    ("DELETE", r"/products/(\d+)", "delete_product"),
+    ("GET", r"/sales", "list_sales"),
+    ("POST", r"/sales", "register_sales"),
+    ("GET", r"/reports/top", "top_products"),
+    ("GET", r"/reports/sales-by-brand", "sales_by_brand"),
+    ("GET", r"/reports/income", "income"),
+    ("GET", r"/reports/performance", "performance"),
+    ("GET", r"/reports/customers", "customers"),
+    ("GET", r"/reports/customer-types", "customer_types"),
+    ("GET", r"/reports/low-stock", "low_stock"),
+    ("GET", r"/alerts/low-stock", "low_stock_alerts"),
+    ("GET", r"/reports/stock-cover", "stock_cover"),
+)
+
+_REASONS = {
+    200: "OK",
+    201: "Created",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    409: "Conflict",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+
+class HTTPError(Exception):
+    """
+    Error que se devuelve al cliente como {'error': mensaje}.
+    """
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class SaleBatcher:
+    """
+    Junta los pedidos de venta que llegan casi a la vez y los registra
+    en lotes con sales.process_sales.
+
+    Cada petición espera su resultado en un Future; el orden de
+    registro es el orden de llegada.
+    """
+
+    def __init__(
+        self,
+        inventory,
+        sales_history,
+        storage=None,
+        max_batch=MAX_BATCH,
+        delay=BATCH_DELAY,
+    ):
+        self.inventory = inventory
+        self.sales_history = sales_history
+        self.storage = storage
+        self.max_batch = max_batch
+        self.delay = delay
+        self.batches = 0
+        self._queue = asyncio.Queue()
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def submit(self, orders):
+        """
+        Encolar pedidos y esperar sus resultados (uno por pedido).
+        """
+        loop = asyncio.get_running_loop()
+        futures = []
+        for order in orders:
+            future = loop.create_future()
+            self._queue.put_nowait((order, future))
+            futures.append(future)
+        return await asyncio.gather(*futures)
+
+    async def _run(self):
+        while True:
+            pending = [await self._queue.get()]
+            deadline = asyncio.get_running_loop().time() + self.delay
+            while len(pending) < self.max_batch:
+                timeout = deadline - asyncio.get_running_loop().time()
+                if timeout <= 0:
+                    break
+                try:
+                    pending.append(
+                        await asyncio.wait_for(self._queue.get(), timeout)
+                    )
+                except asyncio.TimeoutError:
+                    break
+            await self._process(pending)
+
+    async def _process(self, pending):
+        """
+        Registrar un lote en un hilo aparte (_register) y resolver los
+        Futures después de confirmarlo; si falla la confirmación,
+        fallan todos. Hasta que termina no se empieza el lote
+        siguiente, así se registran en orden de llegada.
+        """
+        try:
+            outcomes = await _in_thread(
+                self._register, [order for order, _ in pending]
+            )
+        except Exception as error:
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        self.batches += 1
+        for (_, future), (ok, outcome) in zip(pending, outcomes):
+            if future.done():
+                continue
+            if ok:
+                future.set_result(outcome)
+            else:
+                future.set_exception(outcome)
+
+    def _register(self, orders):
+        """
+        Registrar los pedidos de un lote y devolver (ok, resultado o
+        excepción) de cada uno. Cada pedido va en su propia transacción
+        anidada dentro de la del lote: si uno lanza una excepción solo
+        falla ese pedido (en SQLite se deshacen sus cambios) y el resto
+        del lote se registra igual.
+        """
+        outcomes = []
+        with self._transaction():
+            for order in orders:
+                try:
+                    with self._transaction():
+                        (result,) = process_sales(
+                            self.inventory, self.sales_history, [order]
+                        )
+                except Exception as error:
+                    outcomes.append((False, error))
+                else:
+                    outcomes.append((True, result))
+        return outcomes
+
+    def _transaction(self):
+        # persistence.Persistence y sqlite_store.SQLiteDatabase ofrecen
+        # transaction(); sin almacenamiento en disco no hace falta
+        if self.storage is None:
+            return nullcontext()
+        return self.storage.transaction()
+
+
+class InventoryService:
+    """
+    Rutas HTTP sobre un inventario y un historial de ventas (los
+    stores en memoria, con o sin persistencia, o los de SQLite).
+    """
+
+    def __init__(self, inventory, sales_history, storage=None, **batching):
+        self.inventory = inventory
+        self.sales_history = sales_history
+        self.batcher = SaleBatcher(
+            inventory, sales_history, storage, **batching
+        )
+        # Alertas de stock bajo de las ventas y cambios del servicio
+        self.alerts = LowStockAlerts()
+        inventory.listeners.append(self.alerts)
+        self.requests = 0
+        self.routes = [
+            (method, re.compile(pattern + "$"), getattr(self, handler))
+            for method, pattern, handler in ROUTES
+        ]
+
+    # --------------------------------------------------------
+    # Productos
+    # --------------------------------------------------------
+
+    async def list_products(self, query, body):
+        text = _param(query, "q")
+        if text is not None:
+            limit = _int_param(query, "limit", DEFAULT_LIMIT)
+            return 200, self.inventory.search(text, limit)
+
+        offset = _int_param(query, "offset", 0)
+        limit = _int_param(query, "limit", PAGE_SIZE)
+        brand = _param(query, "brand")
+        category = _param(query, "category")
+        if brand is None and category is None:
+            return 200, self.inventory.products(offset, limit)
+        if brand is not None:
+            products = self.inventory.by_brand(brand)
+        else:
+            products = self.inventory.by_category(category)
+        products = [
+            product
+            for product in products
+            if category is None or product.category == category
+        ]
+        return 200, products[offset:offset + limit]
+
+    async def add_product(self, query, body):
+        product, error = await _in_thread(
+            create_product, self.inventory, _json_object(body)
+        )
+        if error:
+            raise HTTPError(400, error)
+        return 201, product
+
+    async def get_product(self, query, body, product_id):
+        return 200, self._product(product_id)
+
+    async def update_product(self, query, body, product_id):
+        product = self._product(product_id)
+        error = await _in_thread(
+            change_product, self.inventory, product, _json_object(body)
+        )
+        if error:
+            raise HTTPError(400, error)
+        return 200, product
+
+    async def delete_product(self, query, body, product_id):
+        product = self._product(product_id)
+        await _in_thread(self.inventory.remove, product)
+        return 200, {"deleted": product.id}
+
+    def _product(self, product_id):
+        product = find_product_by_id(self.inventory, int(product_id))
+        if not product:
+            raise HTTPError(404, f"Product not found: {product_id}")
+        return product
+
+    # --------------------------------------------------------
+    # Ventas
+    # --------------------------------------------------------
+
+    async def list_sales(self, query, body):
+        offset = _int_param(query, "offset", 0)
+        limit = _int_param(query, "limit", PAGE_SIZE)
+        # Una sola lectura de la página (en SQLite, una consulta)
+        sales = self.sales_history[offset:offset + limit]
+        return 200, {
+            "total": len(self.sales_history),
+            "sales": [dict(sale) for sale in sales],
+        }
+
+    async def register_sales(self, query, body):
+        """
+        Registrar un pedido (objeto JSON) o varios (lista).
+
+        Con un solo pedido responde 201 con la venta (o el resumen del
+        pedido, si tiene 'lines'), o 409 con el error; con una lista
+        responde 200 con un resultado por pedido (ver
+        sales.process_sales).
+        """
+        data = _json(body)
+        if isinstance(data, dict):
+            (result,) = await self.batcher.submit([data])
+            if not result["ok"]:
+                raise HTTPError(409, result["error"])
+            return 201, result["sale"] if "sale" in result else result["order"]
+        if not isinstance(data, list) or not all(
+            isinstance(order, dict) for order in data
+        ):
+            raise HTTPError(400, "Expected an order or a list of orders.")
+        return 200, await self.batcher.submit(data)
+
+    # --------------------------------------------------------
+    # Reportes (se calculan en un hilo aparte, ver _in_thread)
+    # --------------------------------------------------------
+
+    async def top_products(self, query, body):
+        k = _int_param(query, "k", 3)
+        by = _param(query, "by") or "units"
+        brand = _param(query, "brand")
+        category = _param(query, "category")
+        if by == "units" and brand is None and category is None:
+            products = await _in_thread(
+                compute_report, "top_products", self.inventory, k
+            )
+        else:
+            try:
+                products = await _in_thread(
+                    partial(
+                        top_k_products,
+                        self.inventory,
+                        k,
+                        by=by,
+                        brand=brand,
+                        category=category,
+                    )
+                )
+            except ValueError as error:
+                raise HTTPError(400, str(error)) from None
+        return 200, products
+
+    async def sales_by_brand(self, query, body):
+        bounds = _period(query)
+        if bounds is not None:
+            _, brand_stats = await _in_thread(
+                compute_period, self.sales_history, *bounds
+            )
+            return 200, brand_stats
+        return 200, await _in_thread(
+            compute_report, "sales_by_brand", self.sales_history
+        )
+
+    async def income(self, query, body):
+        bounds = _period(query)
+        if bounds is not None:
+            income, _ = await _in_thread(
+                compute_period, self.sales_history, *bounds
+            )
+            return 200, income
+        return 200, await _in_thread(
+            compute_report, "income", self.sales_history
+        )
+
+    async def performance(self, query, body):
+        return 200, await _in_thread(
+            compute_report, "inventory_performance", self.inventory
+        )
+
+    async def customers(self, query, body):
+        name = _param(query, "name")
+        if name is None:
+            k = _int_param(query, "k", 10)
+            return 200, await _in_thread(self.sales_history.top_customers, k)
+        customer = self.sales_history.find_customer(name)
+        if customer is None:
+            raise HTTPError(404, f"Customer not found: {name}")
+        return 200, customer
+
+    async def customer_types(self, query, body):
+        return 200, await _in_thread(
+            customer_type_shares, self.sales_history
+        )
+
+    async def low_stock(self, query, body):
+        limit = _int_param(query, "limit", None)
+        return 200, await _in_thread(
+            self.inventory.below_reorder_point, limit
+        )
+
+    async def low_stock_alerts(self, query, body):
+        return 200, self.alerts.recent()
+
+    async def stock_cover(self, query, body):
+        k = _int_param(query, "k", STOCK_COVER_ROWS)
+        return 200, await _in_thread(
+            compute_stock_cover, self.inventory, self.sales_history, k
+        )
+
+    # --------------------------------------------------------
+    # HTTP
+    # --------------------------------------------------------
+
+    async def dispatch(self, method, target, body):
+        """
+        Resolver una petición y devolver (estado, datos JSON).
+        """
+        self.requests += 1
+        url = urlsplit(target)
+        query = parse_qs(url.query)
+        allowed = False
+        for route_method, pattern, handler in self.routes:
+            match = pattern.match(url.path)
+            if not match:
+                continue
+            allowed = True
+            if route_method == method:
+                try:
+                    return await handler(query, body, *match.groups())
+                except HTTPError as error:
+                    return error.status, {"error": str(error)}
+        if allowed:
+            return 405, {"error": f"Method not allowed: {method}"}
+        return 404, {"error": f"Not found: {url.path}"}
+
+    async def handle_client(self, reader, writer):
+        """
+        Atender una conexión (varias peticiones si es keep-alive).
+        """
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, target, headers, body = request
+                try:
+                    status, payload = await self.dispatch(
+                        method, target, body
+                    )
+                except Exception as error:
+                    status, payload = 500, {"error": str(error)}
+                keep_alive = headers.get("connection", "").lower() != "close"
+                writer.write(_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except HTTPError as error:
+            writer.write(_response(error.status, {"error": str(error)}))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def _read_request(reader):
+    """
+    Leer una petición HTTP/1.1: (método, destino, cabeceras, cuerpo),
+    o None si el cliente cerró la conexión.
+    """
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+    try:
+        method, target, _ = request_line.decode("latin-1").split()
+    except ValueError:
+        raise HTTPError(400, "Malformed request line.") from None
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        raise HTTPError(400, "Invalid Content-Length.") from None
+    if length > MAX_BODY:
+        raise HTTPError(413, "Request body too large.")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), target, headers, body
+
+
+def _response(status, payload, keep_alive=False):
+    body = json.dumps(payload, default=_encode).encode("utf-8")
+    head = (
+        f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+        "Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+        "\r\n"
+    )
+    return head.encode("latin-1") + body
+
+
+def _encode(value):
+    # Productos y ventas (models.Record, ledger.SaleRow) como objetos JSON
+    if isinstance(value, Mapping):
+        return dict(value)
+    raise TypeError(f"Cannot encode {type(value).__name__} as JSON")
+
+
+async def _in_thread(func, *args):
+    """
+    Ejecutar un cálculo o un registro en el ThreadPoolExecutor del
+    bucle (también los del backend 'parallel', que usan su pool de
+    procesos) para no bloquear al resto de clientes mientras dura.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, func, *args)
+
+
+def _json(body):
+    try:
+        return json.loads(body or b"null")
+    except ValueError:
+        raise HTTPError(400, "Invalid JSON body.") from None
+
+
+def _json_object(body):
+    data = _json(body)
+    if not isinstance(data, dict):
+        raise HTTPError(400, "Expected a JSON object.")
+    return data
+
+
+def _param(query, name):
+    values = query.get(name)
+    return values[0] if values else None
+
+
+def _period(query):
+    """
+    Leer ?period=... o ?start=...&end=... y devolver (inicio, fin)
+    en timestamps, o None si la petición no pide un periodo.
+    """
+    period = _param(query, "period")
+    start = _param(query, "start")
+    end = _param(query, "end")
+    if period is None and start is None and end is None:
+        return None
+    try:
+        return parse_period(period, start, end)
+    except ValueError as error:
+        raise HTTPError(400, str(error)) from None
+
+
+def _int_param(query, name, default):
+    value = _param(query, name)
+    if value is None:
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise HTTPError(
+            400, f"Parameter '{name}' must be an integer."
+        ) from None
+    if number < 0:
+        raise HTTPError(400, f"Parameter '{name}' cannot be negative.")
+    return number
+
+
+async def serve(
+    inventory,
+    sales_history,
+    storage=None,
+    host=DEFAULT_HOST,
+    port=DEFAULT_PORT,
+    ready=None,
+):
+    """
+    Arrancar el servicio y atender peticiones hasta que se cancele.
+
+    - storage: persistence.Persistence o sqlite_store.SQLiteDatabase
+      (opcional) para agrupar cada lote de ventas en una transacción.
+    - ready (opcional): asyncio.Event que se activa al empezar a
+      escuchar (útil para pruebas de carga en el mismo proceso).
+    """
+    service = InventoryService(inventory, sales_history, storage)
+    service.batcher.start()
+    server = await asyncio.start_server(service.handle_client, host, port)
+    print(f"Serving on http://{host}:{port} (Ctrl+C to stop)")
+    if ready is not None:
+        ready.set()
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.batcher.stop()
+
+
+def run(
+    inventory,
+    sales_history,
+    storage=None,
+    host=DEFAULT_HOST,
+    port=DEFAULT_PORT,
+):
+    """
+    Ejecutar serve() hasta Ctrl+C.
+    """
+    try:
+        asyncio.run(serve(inventory, sales_history, storage, host, port))
+    except KeyboardInterrupt:
+        print("\nService stopped.")
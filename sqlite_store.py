@@ -0,0 +1,981 @@
+"""
+Backend de almacenamiento en SQLite.
+
+SQLiteInventory y SQLiteSalesHistory ofrecen la misma interfaz que
+store.Inventory y store.SalesHistory, así que inventory.py, sales.py y
+reports.py funcionan igual con cualquiera de los dos. La diferencia es
+que aquí las búsquedas y los reportes son consultas SQL apoyadas en
+índices (id, marca, categoría, fecha de venta, cliente), sin bucles en
+Python sobre todo el catálogo o el historial.
+
+La base de datos usa el modo WAL para que las escrituras no bloqueen
+las lecturas.
+"""
+
+import sqlite3
+import threading
+from array import array
+from contextlib import contextmanager
+
+from aggregates import SalesAggregates
+from customers import (
+    CUSTOMER_FIELDS,
+    CustomerRegistry,
+    compare_totals,
+    customer_key,
+)
+from ledger import SALE_FIELDS
+from models import DEFAULT_REORDER_POINT, PRODUCT_FIELDS, Product, Sale
+from search import DEFAULT_LIMIT, tokenize
+from store import RANKING_METRICS, IdAllocator, notify_listeners
+from velocity import VELOCITY_WINDOWS, SalesVelocity, add_to_rate
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    brand TEXT NOT NULL,
+    category TEXT NOT NULL,
+    unit_price REAL NOT NULL,
+    stock INTEGER NOT NULL,
+    warranty_months INTEGER NOT NULL,
+    total_sold INTEGER NOT NULL DEFAULT 0,
+    revenue REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS products_units
+    ON products (total_sold);
+CREATE INDEX IF NOT EXISTS products_revenue
+    ON products (revenue);
+CREATE INDEX IF NOT EXISTS products_brand_units
+    ON products (brand, total_sold);
+CREATE INDEX IF NOT EXISTS products_brand_revenue
+    ON products (brand, revenue);
+CREATE INDEX IF NOT EXISTS products_category_units
+    ON products (category, total_sold);
+CREATE INDEX IF NOT EXISTS products_category_revenue
+    ON products (category, revenue);
+
+CREATE TABLE IF NOT EXISTS sales (
+    id INTEGER PRIMARY KEY,
+    customer_name TEXT NOT NULL,
+    customer_type TEXT NOT NULL,
+    product_id INTEGER NOT NULL,
+    product_name TEXT NOT NULL,
+    brand TEXT NOT NULL,
+    quantity INTEGER NOT NULL,
+    unit_price REAL NOT NULL,
+    discount_rate REAL NOT NULL,
+    discount_amount REAL NOT NULL,
+    gross_amount REAL NOT NULL,
+    net_amount REAL NOT NULL,
+    date TEXT NOT NULL,
+    timestamp REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sales_timestamp ON sales (timestamp);
+CREATE INDEX IF NOT EXISTS sales_customer ON sales (customer_name);
+CREATE INDEX IF NOT EXISTS sales_brand ON sales (brand);
+CREATE INDEX IF NOT EXISTS sales_product ON sales (product_id);
+
+-- Registro de clientes (customers.py): totales por cliente, sus
+-- ventas y totales por tipo de cliente, actualizados en cada venta
+CREATE TABLE IF NOT EXISTS customers (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    customer_type TEXT NOT NULL,
+    sales_count INTEGER NOT NULL DEFAULT 0,
+    quantity INTEGER NOT NULL DEFAULT 0,
+    gross_amount REAL NOT NULL DEFAULT 0,
+    discount_amount REAL NOT NULL DEFAULT 0,
+    net_amount REAL NOT NULL DEFAULT 0,
+    first_purchase REAL NOT NULL,
+    last_purchase REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS customers_net ON customers (net_amount);
+CREATE TABLE IF NOT EXISTS customer_sales (
+    customer_id INTEGER NOT NULL,
+    sale_id INTEGER NOT NULL,
+    PRIMARY KEY (customer_id, sale_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS customer_type_members (
+    customer_type TEXT NOT NULL,
+    customer_id INTEGER NOT NULL,
+    PRIMARY KEY (customer_type, customer_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS customer_types (
+    customer_type TEXT PRIMARY KEY,
+    customers INTEGER NOT NULL,
+    sales_count INTEGER NOT NULL,
+    quantity INTEGER NOT NULL,
+    gross_amount REAL NOT NULL,
+    discount_amount REAL NOT NULL,
+    net_amount REAL NOT NULL
+);
+
+-- Velocidad de venta por producto y ventana (velocity.py): unidades
+-- por día en el instante de la última venta, actualizada en cada venta
+CREATE TABLE IF NOT EXISTS product_velocity (
+    product_id INTEGER NOT NULL,
+    days REAL NOT NULL,
+    rate REAL NOT NULL,
+    last_sale REAL NOT NULL,
+    PRIMARY KEY (product_id, days)
+) WITHOUT ROWID;
+
+-- Último ID entregado por tabla, para no reutilizar IDs borrados
+CREATE TABLE IF NOT EXISTS id_counters (
+    name TEXT PRIMARY KEY,
+    last_id INTEGER NOT NULL
+);
+"""
+
+# Columnas añadidas después de la primera versión del esquema:
+# (tabla, columna, definición). Se añaden al abrir una base que no las
+# tenga (ALTER TABLE), así que también sirven en bases nuevas.
+ADDED_COLUMNS = (
+    (
+        "products",
+        "reorder_point",
+        f"INTEGER NOT NULL DEFAULT {DEFAULT_REORDER_POINT}",
+    ),
+)
+
+# Índices sobre las columnas añadidas. products_shortfall ordena los
+# productos por lo que les falta para su punto de pedido: la consulta
+# de stock bajo (below_reorder_point) es un rango de ese índice.
+ADDED_INDEXES = """
+CREATE INDEX IF NOT EXISTS products_shortfall
+    ON products (reorder_point - stock);
+"""
+
+# Columna de ordenación para cada métrica de ranking
+_RANKING_COLUMNS = {"units": "total_sold", "revenue": "revenue"}
+
+
+class SQLiteDatabase:
+    """
+    Conexión a la base de datos y acceso a los dos stores.
+
+    - inventory: SQLiteInventory
+    - sales_history: SQLiteSalesHistory
+    """
+
+    def __init__(self, path):
+        self.connection = sqlite3.connect(
+            path, isolation_level=None, check_same_thread=False
+        )
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+        self._add_missing_columns()
+        self._depth = 0
+        # La conexión es una sola: las transacciones de distintos
+        # hilos se serializan con este lock (reentrante)
+        self.lock = threading.RLock()
+
+        self.inventory = SQLiteInventory(self)
+        self.sales_history = SQLiteSalesHistory(self)
+
+    def _add_missing_columns(self):
+        for table, column, definition in ADDED_COLUMNS:
+            existing = {
+                row["name"]
+                for row in self.execute(f"PRAGMA table_info({table})")
+            }
+            if column not in existing:
+                self.execute(
+                    f"ALTER TABLE {table} ADD COLUMN {column} {definition}"
+                )
+        self.connection.executescript(ADDED_INDEXES)
+
+    def execute(self, sql, params=()):
+        return self.connection.execute(sql, params)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Agrupar varias operaciones en una transacción (anidable: solo la
+        más externa hace COMMIT o ROLLBACK; las internas son SAVEPOINT,
+        así que si una falla solo se deshacen los cambios de su bloque y
+        quien la envuelve puede seguir con la transacción).
+        """
+        with self.lock:
+            depth = self._depth
+            savepoint = f"level_{depth}"
+            self.execute(f"SAVEPOINT {savepoint}" if depth else "BEGIN")
+            self._depth += 1
+            try:
+                yield
+            except BaseException:
+                self._depth -= 1
+                if depth:
+                    self.execute(f"ROLLBACK TO {savepoint}")
+                    self.execute(f"RELEASE {savepoint}")
+                else:
+                    self.execute("ROLLBACK")
+                raise
+            self._depth -= 1
+            self.execute(f"RELEASE {savepoint}" if depth else "COMMIT")
+
+    def allocator(self, name, table):
+        """
+        Crear un IdAllocator persistente para una tabla, inicializado
+        con el mayor de (contador guardado, MAX(id) de la tabla).
+        """
+        row = self.execute(
+            "SELECT last_id FROM id_counters WHERE name = ?", (name,)
+        ).fetchone()
+        counter = row["last_id"] if row else 0
+        max_id = self.execute(f"SELECT MAX(id) FROM {table}").fetchone()[0]
+        return IdAllocator(max(counter, max_id or 0))
+
+    def save_counter(self, name, last_id):
+        self.execute(
+            "INSERT INTO id_counters (name, last_id) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET last_id = excluded.last_id",
+            (name, last_id),
+        )
+
+    def close(self):
+        self.connection.close()
+
+
+class SQLiteInventory:
+    """
+    Inventario guardado en la tabla 'products'.
+
+    Los productos se devuelven como models.Product nuevos en cada
+    consulta; después de modificarlos hay que llamar a update(product),
+    igual que con store.Inventory.
+    """
+
+    def __init__(self, database):
+        self.db = database
+        self.ids = database.allocator("products", "products")
+        self.listeners = []
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+
+    def __iter__(self):
+        cursor = self.db.execute(
+            f"SELECT {', '.join(PRODUCT_FIELDS)} FROM products ORDER BY id"
+        )
+        for row in cursor:
+            yield _product(row)
+
+    def __contains__(self, product):
+        return self.get(product.id) is not None
+
+    def products(self, offset=0, limit=None):
+        """
+        Devolver una lista con los productos, o solo una página (ver
+        store.Inventory.products).
+        """
+        if not offset and limit is None:
+            return list(self)
+        return self._many(
+            "SELECT * FROM products ORDER BY id LIMIT ? OFFSET ?",
+            (-1 if limit is None else limit, offset),
+        )
+
+    def append(self, product):
+        """
+        Insertar un producto nuevo (un diccionario se convierte a
+        models.Product); se devuelve el producto.
+        """
+        product = Product.from_dict(product)
+        try:
+            self.db.execute(
+                f"INSERT INTO products ({', '.join(PRODUCT_FIELDS)}) "
+                f"VALUES ({', '.join('?' * len(PRODUCT_FIELDS))})",
+                [getattr(product, field) for field in PRODUCT_FIELDS],
+            )
+        except sqlite3.IntegrityError:
+            raise ValueError(
+                f"Duplicate product ID: {product.id}"
+            ) from None
+        self._observe_id(product.id)
+        notify_listeners(self.listeners, "on_product_added", product)
+        return product
+
+    def remove(self, product):
+        """
+        Borrar un producto.
+        """
+        cursor = self.db.execute(
+            "DELETE FROM products WHERE id = ?", (product.id,)
+        )
+        if cursor.rowcount == 0:
+            raise ValueError(f"Product not in inventory: {product.id}")
+        notify_listeners(self.listeners, "on_product_removed", product)
+
+    def get(self, product_id):
+        """
+        Devolver el producto con ese ID, o None si no existe.
+        """
+        return self._one(
+            "SELECT * FROM products WHERE id = ?", (product_id,)
+        )
+
+    def by_brand(self, brand):
+        return self._many(
+            "SELECT * FROM products WHERE brand = ? ORDER BY id", (brand,)
+        )
+
+    def by_category(self, category):
+        return self._many(
+            "SELECT * FROM products WHERE category = ? ORDER BY id",
+            (category,),
+        )
+
+    def brands(self):
+        cursor = self.db.execute(
+            "SELECT brand FROM products GROUP BY brand ORDER BY MIN(id)"
+        )
+        return [row[0] for row in cursor]
+
+    def categories(self):
+        cursor = self.db.execute(
+            "SELECT category FROM products GROUP BY category "
+            "ORDER BY MIN(id)"
+        )
+        return [row[0] for row in cursor]
+
+    def revenue(self, product_id):
+        row = self.db.execute(
+            "SELECT revenue FROM products WHERE id = ?", (product_id,)
+        ).fetchone()
+        return row[0] if row else 0.0
+
+    def stock_levels(self):
+        """
+        Devolver (ids, stocks) de todos los productos como columnas
+        alineadas (ver store.Inventory.stock_levels).
+        """
+        ids = array("q")
+        stocks = array("q")
+        for product_id, stock in self.db.execute(
+            "SELECT id, stock FROM products ORDER BY id"
+        ):
+            ids.append(product_id)
+            stocks.append(stock)
+        return ids, stocks
+
+    def revenues(self):
+        cursor = self.db.execute(
+            "SELECT id, revenue FROM products WHERE revenue != 0"
+        )
+        return {row[0]: row[1] for row in cursor}
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        """
+        Buscar productos por nombre, marca o categoría con LIKE, con las
+        mismas reglas que search.ProductSearchIndex: primero palabra
+        completa, luego comienzo de palabra y luego dentro de una
+        palabra (cuenta la peor coincidencia de las palabras de la
+        consulta); dentro de cada grupo, por ID.
+        """
+        terms = tokenize(query)
+        if not terms or limit < 1:
+            return []
+
+        # Texto con espacios a los lados para buscar límites de palabra
+        text = (
+            "(' ' || lower(name) || ' ' || lower(brand) || ' ' || "
+            "lower(category) || ' ')"
+        )
+        escaped = [
+            term.replace("\\", "\\\\").replace("_", "\\_") for term in terms
+        ]
+        conditions = []
+        qualities = []
+        params = []
+        for term, escaped_term in zip(terms, escaped):
+            # Dentro de una palabra solo con 3 letras o más
+            pattern = (
+                f"%{escaped_term}%" if len(term) >= 3 else f"% {escaped_term}%"
+            )
+            conditions.append(f"{text} LIKE ? ESCAPE '\\'")
+            qualities.append(
+                f"CASE WHEN {text} LIKE ? ESCAPE '\\' THEN 0 "
+                f"WHEN {text} LIKE ? ESCAPE '\\' THEN 1 ELSE 2 END"
+            )
+            params.append(pattern)
+        for escaped_term in escaped:
+            params.extend([f"% {escaped_term} %", f"% {escaped_term}%"])
+        params.append(limit)
+
+        quality = (
+            qualities[0]
+            if len(qualities) == 1
+            else f"MAX({', '.join(qualities)})"
+        )
+        return self._many(
+            f"SELECT * FROM products WHERE {' AND '.join(conditions)} "
+            f"ORDER BY {quality}, id LIMIT ?",
+            params,
+        )
+
+    def top_products(self, k, by="units", brand=None, category=None):
+        """
+        Devolver los K productos más vendidos (ORDER BY ... LIMIT K
+        sobre los índices de unidades o ingresos).
+        """
+        if by not in RANKING_METRICS:
+            raise ValueError(f"Unknown ranking metric: {by}")
+
+        conditions = ["total_sold > 0"]
+        params = []
+        if brand is not None:
+            conditions.append("brand = ?")
+            params.append(brand)
+        if category is not None:
+            conditions.append("category = ?")
+            params.append(category)
+        params.append(k)
+
+        return self._many(
+            f"SELECT * FROM products WHERE {' AND '.join(conditions)} "
+            f"ORDER BY {_RANKING_COLUMNS[by]} DESC, id LIMIT ?",
+            params,
+        )
+
+    def below_reorder_point(self, limit=None):
+        """
+        Devolver los productos con stock <= reorder_point, los que más
+        unidades necesitan primero (rango del índice
+        products_shortfall; ver store.Inventory.below_reorder_point).
+        """
+        return self._many(
+            "SELECT * FROM products WHERE reorder_point - stock >= 0 "
+            "ORDER BY reorder_point - stock DESC, id LIMIT ?",
+            (-1 if limit is None else limit,),
+        )
+
+    def performance_rows(self):
+        """
+        Reporte de rendimiento calculado en SQL (ver
+        store.Inventory.performance_rows).
+        """
+        cursor = self.db.execute(
+            f"SELECT {', '.join(PRODUCT_FIELDS)}, "
+            "CASE WHEN stock + total_sold > 0 "
+            "THEN CAST(total_sold AS REAL) / (stock + total_sold) "
+            "ELSE 0 END AS turnover_ratio "
+            "FROM products ORDER BY id"
+        )
+        rows = []
+        for row in cursor:
+            product = _product(row)
+            rows.append(
+                {
+                    "product": product,
+                    "stock": product.stock,
+                    "sold": product.total_sold,
+                    "turnover_ratio": row["turnover_ratio"],
+                }
+            )
+        return rows
+
+    def next_id(self):
+        with self.db.transaction():
+            product_id = self.ids.next_id()
+            self.db.save_counter("products", product_id)
+        return product_id
+
+    def record_sale(self, product, quantity, net_amount):
+        """
+        Aplicar una venta: stock, total_sold e ingresos en un solo UPDATE.
+        Si la venta deja el producto en su punto de pedido, avisa a los
+        listeners (on_low_stock).
+        """
+        with self.db.lock:
+            self.db.execute(
+                "UPDATE products SET stock = stock - ?, "
+                "total_sold = total_sold + ?, revenue = revenue + ? "
+                "WHERE id = ?",
+                (quantity, quantity, net_amount, product.id),
+            )
+            row = self.db.execute(
+                "SELECT stock, reorder_point FROM products WHERE id = ?",
+                (product.id,),
+            ).fetchone()
+        product.stock -= quantity
+        product.total_sold += quantity
+        if row is None:
+            return
+        shortfall = row["reorder_point"] - row["stock"]
+        if shortfall >= 0 > shortfall - quantity:
+            product.stock = row["stock"]
+            product.reorder_point = row["reorder_point"]
+            notify_listeners(self.listeners, "on_low_stock", product)
+
+    def product_lock(self, product_id):
+        """
+        Lock para vender un producto sin carreras entre hilos
+        (ver store.Inventory.product_lock). Con una sola conexión se
+        usa el lock de la base de datos para todos los productos.
+        """
+        return self.db.lock
+
+    def current_stock(self, product):
+        """
+        Leer el stock actual del producto en la tabla (el objeto
+        puede estar desactualizado si otro hilo vendió después).
+        """
+        row = self.db.execute(
+            "SELECT stock FROM products WHERE id = ?", (product.id,)
+        ).fetchone()
+        return row["stock"] if row else 0
+
+    def transaction(self):
+        """
+        Transacción de la base de datos (ver store.Inventory.transaction):
+        si algo falla, se deshacen todos los cambios del bloque.
+        """
+        return self.db.transaction()
+
+    def update(self, product):
+        """
+        Guardar los cambios hechos en los campos de un producto (si lo
+        dejan en su punto de pedido, avisa con on_low_stock).
+        """
+        fields = PRODUCT_FIELDS[1:]
+        with self.db.lock:
+            before = self.db.execute(
+                "SELECT reorder_point - stock FROM products WHERE id = ?",
+                (product.id,),
+            ).fetchone()
+            if before is None:
+                raise ValueError(f"Product not in inventory: {product.id}")
+            self.db.execute(
+                f"UPDATE products SET "
+                f"{', '.join(f + ' = ?' for f in fields)} WHERE id = ?",
+                [getattr(product, field) for field in fields] + [product.id],
+            )
+        notify_listeners(self.listeners, "on_product_updated", product)
+        if before[0] < 0 <= product.reorder_point - product.stock:
+            notify_listeners(self.listeners, "on_low_stock", product)
+
+    def restore_revenue(self, revenues):
+        with self.db.transaction():
+            for product_id, amount in revenues.items():
+                self.db.execute(
+                    "UPDATE products SET revenue = ? WHERE id = ?",
+                    (amount, product_id),
+                )
+
+    def _observe_id(self, product_id):
+        if product_id > self.ids.last_id:
+            self.ids.observe(product_id)
+            self.db.save_counter("products", product_id)
+
+    def _one(self, sql, params):
+        row = self.db.execute(sql, params).fetchone()
+        if row is None:
+            return None
+        return _product(row)
+
+    def _many(self, sql, params):
+        return [_product(row) for row in self.db.execute(sql, params)]
+
+
+def _product(row):
+    """
+    Convertir una fila de 'products' en models.Product.
+    """
+    return Product(**{field: row[field] for field in PRODUCT_FIELDS})
+
+
+def _sale(row):
+    """
+    Convertir una fila de 'sales' en models.Sale.
+    """
+    return Sale(**{field: row[field] for field in SALE_FIELDS})
+
+
+class SQLiteSalesHistory:
+    """
+    Historial de ventas guardado en la tabla 'sales'.
+
+    Los totales de los reportes se calculan con agregados SQL
+    (SUM / GROUP BY) en lugar de mantenerse en memoria. Los de clientes
+    (tablas customers, customer_sales y customer_types) se actualizan
+    en cada venta, como customers.CustomerRegistry, y también la
+    velocidad de venta por producto (tabla product_velocity, como
+    velocity.SalesVelocity).
+    """
+
+    def __init__(self, database):
+        self.db = database
+        self.ids = database.allocator("sales", "sales")
+        self.listeners = []
+
+        # Bases creadas antes del registro de clientes: rellenarlo
+        if self.db.execute(
+            "SELECT NOT EXISTS (SELECT 1 FROM customers) "
+            "AND EXISTS (SELECT 1 FROM sales)"
+        ).fetchone()[0]:
+            with self.db.transaction():
+                for sale in list(self):
+                    self._add_customer_sale(sale)
+        # Bases creadas antes de la velocidad de venta: rellenarla
+        if self.db.execute(
+            "SELECT NOT EXISTS (SELECT 1 FROM product_velocity) "
+            "AND EXISTS (SELECT 1 FROM sales)"
+        ).fetchone()[0]:
+            with self.db.transaction():
+                for sale in list(self):
+                    self._add_velocity_sale(sale)
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM sales").fetchone()[0]
+
+    def __iter__(self):
+        for row in self.db.execute("SELECT * FROM sales ORDER BY id"):
+            yield _sale(row)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            positions = range(len(self))[index]
+            if positions.step != 1:
+                return [self[i] for i in positions]
+            # Una sola consulta para un rango contiguo (una página)
+            cursor = self.db.execute(
+                "SELECT * FROM sales ORDER BY id LIMIT ? OFFSET ?",
+                (len(positions), positions.start),
+            )
+            return [_sale(row) for row in cursor]
+        if index < 0:
+            index += len(self)
+        row = None
+        if index >= 0:
+            row = self.db.execute(
+                "SELECT * FROM sales ORDER BY id LIMIT 1 OFFSET ?", (index,)
+            ).fetchone()
+        if row is None:
+            raise IndexError("sale index out of range")
+        return _sale(row)
+
+    def append(self, sale, applied_to_stock=True):
+        """
+        Insertar una venta (un diccionario se convierte a models.Sale).
+        applied_to_stock se pasa a los listeners, como en
+        store.SalesHistory.append.
+        """
+        sale = Sale.from_dict(sale)
+        with self.db.transaction():
+            self.db.execute(
+                f"INSERT INTO sales ({', '.join(SALE_FIELDS)}) "
+                f"VALUES ({', '.join('?' * len(SALE_FIELDS))})",
+                [getattr(sale, field) for field in SALE_FIELDS],
+            )
+            self._add_customer_sale(sale)
+            self._add_velocity_sale(sale)
+            if sale.id > self.ids.last_id:
+                self.ids.observe(sale.id)
+                self.db.save_counter("sales", sale.id)
+            notify_listeners(
+                self.listeners, "on_sale_added", sale, applied_to_stock
+            )
+
+    def _add_customer_sale(self, sale):
+        """
+        Sumar una venta a las tablas de clientes (ver
+        customers.CustomerRegistry.add).
+        """
+        db = self.db
+        timestamp = sale.timestamp
+        row = db.execute(
+            "SELECT id FROM customers WHERE key = ?",
+            (customer_key(sale.customer_name),),
+        ).fetchone()
+        if row is None:
+            customer_id = db.execute(
+                "INSERT INTO customers (key, name, customer_type, "
+                "first_purchase, last_purchase) VALUES (?, ?, ?, ?, ?)",
+                (
+                    customer_key(sale.customer_name),
+                    sale.customer_name,
+                    sale.customer_type,
+                    timestamp,
+                    timestamp,
+                ),
+            ).lastrowid
+        else:
+            customer_id = row[0]
+
+        amounts = (
+            sale.quantity,
+            sale.gross_amount,
+            sale.discount_amount,
+            sale.net_amount,
+        )
+        db.execute(
+            "UPDATE customers SET sales_count = sales_count + 1, "
+            "quantity = quantity + ?, gross_amount = gross_amount + ?, "
+            "discount_amount = discount_amount + ?, "
+            "net_amount = net_amount + ?, "
+            "customer_type = CASE WHEN ? >= last_purchase "
+            "THEN ? ELSE customer_type END, "
+            "first_purchase = MIN(first_purchase, ?), "
+            "last_purchase = MAX(last_purchase, ?) WHERE id = ?",
+            amounts
+            + (timestamp, sale.customer_type, timestamp, timestamp)
+            + (customer_id,),
+        )
+        db.execute(
+            "INSERT INTO customer_sales (customer_id, sale_id) "
+            "VALUES (?, ?)",
+            (customer_id, sale.id),
+        )
+        new_member = db.execute(
+            "INSERT OR IGNORE INTO customer_type_members "
+            "(customer_type, customer_id) VALUES (?, ?)",
+            (sale.customer_type, customer_id),
+        ).rowcount
+        db.execute(
+            "INSERT INTO customer_types VALUES (?, ?, 1, ?, ?, ?, ?) "
+            "ON CONFLICT(customer_type) DO UPDATE SET "
+            "customers = customers + excluded.customers, "
+            "sales_count = sales_count + 1, "
+            "quantity = quantity + excluded.quantity, "
+            "gross_amount = gross_amount + excluded.gross_amount, "
+            "discount_amount = discount_amount + excluded.discount_amount, "
+            "net_amount = net_amount + excluded.net_amount",
+            (sale.customer_type, new_member) + amounts,
+        )
+
+    def _add_velocity_sale(self, sale):
+        """
+        Sumar una venta a la velocidad de su producto en cada ventana
+        (ver velocity.SalesVelocity.add).
+        """
+        db = self.db
+        stored = {
+            days: (rate, last)
+            for days, rate, last in db.execute(
+                "SELECT days, rate, last_sale FROM product_velocity "
+                "WHERE product_id = ?",
+                (sale.product_id,),
+            )
+        }
+        timestamp = sale.timestamp
+        rows = []
+        for window in VELOCITY_WINDOWS:
+            rate, last = stored.get(window, (0.0, timestamp))
+            rows.append(
+                (
+                    sale.product_id,
+                    window,
+                    add_to_rate(rate, last, sale.quantity, timestamp, window),
+                    max(last, timestamp),
+                )
+            )
+        db.connection.executemany(
+            "INSERT OR REPLACE INTO product_velocity VALUES (?, ?, ?, ?)",
+            rows,
+        )
+
+    def extend(self, sales):
+        """
+        Insertar varias ventas en una sola transacción.
+        """
+        with self.db.transaction():
+            for sale in sales:
+                self.append(sale)
+
+    def next_id(self):
+        with self.db.transaction():
+            sale_id = self.ids.next_id()
+            self.db.save_counter("sales", sale_id)
+        return sale_id
+
+    def next_ids(self, count):
+        with self.db.transaction():
+            sale_ids = self.ids.next_ids(count)
+            self.db.save_counter("sales", sale_ids[-1])
+        return sale_ids
+
+    def has_sale(self, sale_id):
+        row = self.db.execute(
+            "SELECT 1 FROM sales WHERE id = ?", (sale_id,)
+        ).fetchone()
+        return row is not None
+
+    def brand_totals(self):
+        return self._brand_totals("", ())
+
+    def income_totals(self):
+        return self._income_totals("", ())
+
+    def brand_totals_between(self, start, end):
+        """
+        Totales por marca de las ventas de start <= timestamp < end
+        (usa el índice sales_timestamp).
+        """
+        return self._brand_totals(*_time_range(start, end))
+
+    def income_totals_between(self, start, end):
+        """
+        Ingresos de las ventas de start <= timestamp < end.
+        """
+        return self._income_totals(*_time_range(start, end))
+
+    def _brand_totals(self, where, params):
+        cursor = self.db.execute(
+            "SELECT brand, SUM(quantity), SUM(net_amount) FROM sales "
+            f"{where} GROUP BY brand ORDER BY MIN(id)",
+            params,
+        )
+        return {
+            brand: {"total_quantity": quantity, "total_net": net}
+            for brand, quantity, net in cursor
+        }
+
+    def _income_totals(self, where, params):
+        gross, net = self.db.execute(
+            "SELECT TOTAL(gross_amount), TOTAL(net_amount) FROM sales "
+            f"{where}",
+            params,
+        ).fetchone()
+        return {
+            "gross_income": gross,
+            "total_discounts": gross - net,
+            "net_income": net,
+        }
+
+    def sold_by_product(self):
+        cursor = self.db.execute(
+            "SELECT product_id, SUM(quantity) FROM sales GROUP BY product_id"
+        )
+        return {product_id: quantity for product_id, quantity in cursor}
+
+    def find_customer(self, name):
+        """
+        Devolver los totales de un cliente o None (ver
+        store.SalesHistory.find_customer).
+        """
+        row = self.db.execute(
+            f"SELECT {', '.join(CUSTOMER_FIELDS)} FROM customers "
+            "WHERE key = ?",
+            (customer_key(name),),
+        ).fetchone()
+        return dict(row) if row is not None else None
+
+    def customer_sales(self, customer_id):
+        """
+        Devolver las ventas de un cliente (índice customer_sales).
+        """
+        cursor = self.db.execute(
+            "SELECT sales.* FROM customer_sales "
+            "JOIN sales ON sales.id = customer_sales.sale_id "
+            "WHERE customer_id = ? ORDER BY sale_id",
+            (customer_id,),
+        )
+        return [_sale(row) for row in cursor]
+
+    def top_customers(self, k):
+        """
+        Devolver los K clientes con más ingresos netos (ORDER BY ...
+        LIMIT K sobre el índice customers_net).
+        """
+        cursor = self.db.execute(
+            f"SELECT {', '.join(CUSTOMER_FIELDS)} FROM customers "
+            "ORDER BY net_amount DESC, id LIMIT ?",
+            (k,),
+        )
+        return [dict(row) for row in cursor]
+
+    def customer_type_totals(self):
+        """
+        Devolver tipo de cliente -> totales de sus ventas.
+        """
+        cursor = self.db.execute(
+            "SELECT * FROM customer_types ORDER BY rowid"
+        )
+        totals = {}
+        for row in cursor:
+            stats = dict(row)
+            totals[stats.pop("customer_type")] = stats
+        return totals
+
+    def velocity_state(self):
+        """
+        Leer la tabla product_velocity como velocity.SalesVelocity.
+        """
+        velocity = SalesVelocity()
+        stored = {}
+        for product_id, days, rate, last in self.db.execute(
+            "SELECT product_id, days, rate, last_sale "
+            "FROM product_velocity ORDER BY product_id"
+        ):
+            _, rates = stored.setdefault(product_id, (last, {}))
+            rates[days] = rate
+        for product_id, (last, rates) in stored.items():
+            velocity.set(
+                product_id,
+                last,
+                [rates.get(window, 0.0) for window in velocity.windows],
+            )
+        return velocity
+
+    def check_aggregates(self):
+        """
+        Comparar los agregados SQL, las tablas de clientes y la
+        velocidad de venta con un recálculo en Python.
+        """
+        aggregates = SalesAggregates()
+        aggregates.brand_stats = self.brand_totals()
+        income = self.income_totals()
+        aggregates.gross_income = income["gross_income"]
+        aggregates.net_income = income["net_income"]
+        aggregates.total_discounts = self.db.execute(
+            "SELECT TOTAL(discount_amount) FROM sales"
+        ).fetchone()[0]
+        aggregates.sold_by_product = self.sold_by_product()
+        aggregates.sales_count = len(self)
+        problems = aggregates.differences(SalesAggregates.from_sales(self))
+
+        cursor = self.db.execute(
+            f"SELECT {', '.join(CUSTOMER_FIELDS)} FROM customers"
+        )
+        problems.extend(
+            f"customers: {problem}"
+            for problem in compare_totals(
+                (dict(row) for row in cursor),
+                self.customer_type_totals(),
+                CustomerRegistry.from_sales(self),
+            )
+        )
+        problems.extend(
+            f"velocity: {problem}"
+            for problem in self.velocity_state().differences(
+                SalesVelocity.from_sales(self)
+            )
+        )
+        return problems
+
+
+def _time_range(start, end):
+    return "WHERE timestamp >= ? AND timestamp < ?", (start, end)
+
+
+def open_database(path, initial_products):
+    """
+    Abrir (o crear) la base de datos SQLite.
+
+    - initial_products: productos a insertar si la base está vacía y
+      nunca se ha usado (por ejemplo, models.create_initial_inventory()).
+
+    Devuelve (inventory, sales_history, database).
+    """
+    database = SQLiteDatabase(path)
+    inventory = database.inventory
+    if inventory.ids.last_id == 0 and len(inventory) == 0:
+        with database.transaction():
+            for product in initial_products:
+                inventory.append(product)
+    return inventory, database.sales_history, database
@@ -0,0 +1,944 @@
+"""
+Almacenes en memoria para el sistema de inventario y ventas.
+
+- IdAllocator: asignador de IDs monótonos (sin recorrer la colección).
+- Inventory: envuelve la lista de productos (models.Product, la misma
+  que devuelve models.create_initial_inventory) y mantiene índices
+  auxiliares para que las búsquedas no recorran toda la lista.
+- SalesHistory: historial de ventas (libro columnar) con su propio
+  asignador de IDs, agregados para reportes
+  (aggregates.SalesAggregates), registro de clientes
+  (customers.CustomerRegistry) y velocidad de venta por producto
+  (velocity.SalesVelocity).
+
+Los tres se pueden compartir entre hilos (por ejemplo, varias cajas
+registrando ventas a la vez): cada uno protege su estado con locks y
+Inventory ofrece un lock por producto (product_lock) para que comprobar
+el stock y descontarlo sea una sola operación atómica.
+"""
+
+import threading
+from array import array
+from collections import namedtuple
+from bisect import bisect_left
+from contextlib import ExitStack
+from itertools import islice
+from operator import attrgetter
+
+from aggregates import SalesAggregates
+from customers import CustomerRegistry
+from ledger import SalesLedger
+from models import Product, Sale
+from ranking import Ranking
+from rollups import SalesRollups
+from search import DEFAULT_LIMIT, ProductSearchIndex
+from velocity import SalesVelocity
+
+# Métricas por las que se puede pedir un top de productos:
+# - units: unidades vendidas (total_sold)
+# - revenue: ingresos netos acumulados del producto
+RANKING_METRICS = ("units", "revenue")
+
+# Campos de una venta que usan los agregados, los clientes y las
+# velocidades (ver SalesHistory.from_columns)
+_SaleTotals = namedtuple(
+    "_SaleTotals",
+    (
+        "customer_name",
+        "customer_type",
+        "product_id",
+        "brand",
+        "quantity",
+        "gross_amount",
+        "discount_amount",
+        "net_amount",
+    ),
+)
+
+
+class IdAllocator:
+    """
+    Asignador de IDs numéricos consecutivos.
+
+    Se inicializa una sola vez con el mayor ID existente y después
+    entrega IDs en O(1). Nunca reutiliza un ID, aunque el registro
+    que lo tenía se haya borrado. Es seguro usarlo desde varios hilos.
+    """
+
+    def __init__(self, last_id=0):
+        self.last_id = last_id
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_records(cls, records, key=lambda record: record["id"]):
+        """
+        Crear un asignador a partir de registros existentes.
+
+        - key: función que extrae el ID numérico de cada registro.
+        """
+        return cls(max((key(record) for record in records), default=0))
+
+    def next_id(self):
+        """
+        Reservar y devolver el siguiente ID.
+        """
+        with self._lock:
+            self.last_id += 1
+            return self.last_id
+
+    def next_ids(self, count):
+        """
+        Reservar 'count' IDs consecutivos de una vez y devolverlos
+        como range.
+        """
+        with self._lock:
+            first = self.last_id + 1
+            self.last_id += count
+            return range(first, self.last_id + 1)
+
+    def observe(self, used_id):
+        """
+        Avisar de que un ID ya está en uso (por ejemplo, un registro
+        cargado con su ID original) para no entregarlo nunca.
+        """
+        with self._lock:
+            if used_id > self.last_id:
+                self.last_id = used_id
+
+
+class Inventory:
+    """
+    Inventario de productos con índices en memoria.
+
+    Índices que se mantienen sincronizados en add / update / remove:
+    - _by_id: id -> producto (búsqueda O(1))
+    - _by_brand: marca -> {id: producto}
+    - _by_category: categoría -> {id: producto}
+    - _rankings: (métrica, grupo) -> Ranking de productos vendidos,
+      donde grupo es None (global), ('brand', marca) o
+      ('category', categoría). Se construyen todos de una vez la
+      primera vez que se consultan (top_products) y desde entonces se
+      mantienen en cada venta; hasta entonces es None, así cargar un
+      catálogo grande (por ejemplo, desde un snapshot) no paga una
+      inserción ordenada por producto y ranking
+    - _shortfalls: id -> lo que le falta al producto para su punto de
+      pedido (reorder_point - stock); >= 0 es stock bajo
+    - _low_stock: Ranking por ese valor, solo con los productos en
+      stock bajo (pocos), para que las ventas de los demás no muevan
+      una lista del tamaño del catálogo
+
+    Los productos se guardan en un diccionario ordenado por inserción,
+    así que recorrer el inventario conserva el mismo orden que la
+    lista original.
+
+    listeners: objetos avisados de cada cambio (por ejemplo, el diario
+    de persistence.Persistence). Cada uno puede definir los métodos
+    on_product_added / on_product_updated / on_product_removed
+    (reciben el producto) y on_low_stock (recibe el producto cuando
+    una venta o una modificación lo deja en su punto de pedido o por
+    debajo; ver alerts.LowStockAlerts).
+
+    Concurrencia:
+    - product_lock(id): lock (reentrante) de un producto. Quien lea el
+      stock para decidir si vende debe tenerlo hasta record_sale, así
+      dos hilos no pueden vender las mismas unidades.
+    - _lock: protege los índices y rankings, que comparten todos los
+      productos; se toma solo el tiempo justo para actualizarlos.
+    """
+
+    def __init__(self, products=None):
+        self._by_id = {}
+        self._by_brand = {}
+        self._by_category = {}
+        # Marca y categoría con las que se indexó cada producto,
+        # para poder moverlo de índice si cambian.
+        self._indexed_keys = {}
+        self._revenue = {}
+        self._rankings = None
+        self._shortfalls = {}
+        self._low_stock = Ranking()
+        self._lock = threading.RLock()
+        self._product_locks = {}
+        self._search_index = None
+        self.ids = IdAllocator()
+        self.listeners = []
+
+        self.extend(products or [])
+
+    # --------------------------------------------------------
+    # Compatibilidad con la lista de productos
+    # --------------------------------------------------------
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def __iter__(self):
+        return iter(self._by_id.values())
+
+    def __contains__(self, product):
+        return self._by_id.get(product.id) is product
+
+    def append(self, product):
+        """
+        Añadir un producto al inventario y a todos los índices.
+
+        Un diccionario con el formato anterior se convierte a
+        models.Product; se devuelve el producto guardado.
+        """
+        product = Product.from_dict(product)
+        product_id = product.id
+        with self._lock:
+            if product_id in self._by_id:
+                raise ValueError(f"Duplicate product ID: {product_id}")
+            self._by_id[product_id] = product
+            self.ids.observe(product_id)
+            self._index(product)
+            self._track_stock(product)
+        notify_listeners(self.listeners, "on_product_added", product)
+        return product
+
+    def extend(self, products):
+        """
+        Añadir varios productos (por ejemplo, un catálogo entero al
+        cargarlo) tomando el lock una sola vez. Si algún ID está
+        repetido no se añade ninguno.
+        """
+        products = [Product.from_dict(product) for product in products]
+        with self._lock:
+            seen = set()
+            for product in products:
+                product_id = product.id
+                if product_id in self._by_id or product_id in seen:
+                    raise ValueError(f"Duplicate product ID: {product_id}")
+                seen.add(product_id)
+            for product in products:
+                self._by_id[product.id] = product
+                self._index(product)
+                self._track_stock(product)
+            if seen:
+                self.ids.observe(max(seen))
+        for product in products:
+            notify_listeners(self.listeners, "on_product_added", product)
+
+    def remove(self, product):
+        """
+        Eliminar un producto del inventario y de todos los índices.
+        """
+        product_id = product.id
+        with self._lock:
+            if self._by_id.get(product_id) is not product:
+                raise ValueError(f"Product not in inventory: {product_id}")
+            self._unindex(product_id)
+            del self._shortfalls[product_id]
+            self._low_stock.remove(product_id)
+            del self._by_id[product_id]
+            self._revenue.pop(product_id, None)
+        notify_listeners(self.listeners, "on_product_removed", product)
+
+    # --------------------------------------------------------
+    # Consultas
+    # --------------------------------------------------------
+
+    def get(self, product_id):
+        """
+        Devolver el producto con ese ID, o None si no existe.
+        """
+        return self._by_id.get(product_id)
+
+    def products(self, offset=0, limit=None):
+        """
+        Devolver una lista con los productos, copiada con el lock (se
+        puede recorrer desde otro hilo, por ejemplo en un reporte,
+        mientras se añaden o se borran productos).
+
+        - offset / limit: devolver solo esa página (en el orden del
+          inventario), sin copiar el resto.
+        """
+        stop = None if limit is None else offset + limit
+        with self._lock:
+            if not offset and stop is None:
+                return list(self._by_id.values())
+            return list(islice(self._by_id.values(), offset, stop))
+
+    def by_brand(self, brand):
+        """
+        Devolver la lista de productos de una marca.
+        """
+        return list(self._by_brand.get(brand, {}).values())
+
+    def by_category(self, category):
+        """
+        Devolver la lista de productos de una categoría.
+        """
+        return list(self._by_category.get(category, {}).values())
+
+    def brands(self):
+        """
+        Devolver las marcas presentes en el inventario.
+        """
+        return list(self._by_brand)
+
+    def categories(self):
+        """
+        Devolver las categorías presentes en el inventario.
+        """
+        return list(self._by_category)
+
+    def revenue(self, product_id):
+        """
+        Devolver los ingresos netos acumulados de un producto.
+        """
+        return self._revenue.get(product_id, 0.0)
+
+    def performance_rows(self):
+        """
+        Devolver una fila por producto con 'product', 'stock', 'sold'
+        y 'turnover_ratio':
+          turnover = total_sold / (total_sold + stock)
+          (si el denominador es 0, se toma 0 para evitar división por cero).
+        """
+        products = self.products()
+        rows = []
+        for product in products:
+            stock = product.stock
+            sold = product.total_sold
+            total_handled = stock + sold
+
+            if total_handled > 0:
+                turnover_ratio = sold / total_handled
+            else:
+                turnover_ratio = 0
+
+            rows.append(
+                {
+                    "product": product,
+                    "stock": stock,
+                    "sold": sold,
+                    "turnover_ratio": turnover_ratio,
+                }
+            )
+        return rows
+
+    def stock_levels(self):
+        """
+        Devolver (ids, stocks) de todos los productos como columnas
+        alineadas (array.array), para cálculos vectorizados (ver
+        velocity.forecast).
+        """
+        with self._lock:
+            return (
+                array("q", self._by_id),
+                array("q", [product.stock for product in self]),
+            )
+
+    def rows(self, fields):
+        """
+        Devolver una copia de los campos 'fields' de cada producto
+        (una tupla por producto) con sus ingresos netos al final,
+        tomada con el lock (por ejemplo, para escribir un snapshot
+        desde otro hilo mientras se sigue vendiendo).
+        """
+        values = attrgetter(*fields)
+        revenue = self._revenue.get
+        with self._lock:
+            return [
+                values(product) + (revenue(product.id, 0.0),)
+                for product in self._by_id.values()
+            ]
+
+    def revenues(self):
+        """
+        Devolver una copia de id -> ingresos netos acumulados.
+        """
+        return dict(self._revenue)
+
+    def below_reorder_point(self, limit=None):
+        """
+        Devolver los productos con stock <= reorder_point, los que más
+        unidades necesitan para llegar a su punto de pedido primero
+        (ante empate, por ID).
+
+        El índice _low_stock se mantiene en cada venta y modificación,
+        así que la consulta cuesta en proporción al resultado, sin
+        recorrer el catálogo.
+        """
+        with self._lock:
+            if limit is None:
+                product_ids = list(self._low_stock.iter_desc())
+            else:
+                product_ids = self._low_stock.top(limit)
+            return [self._by_id[product_id] for product_id in product_ids]
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        """
+        Buscar productos por nombre, marca o categoría
+        (ver search.ProductSearchIndex).
+
+        El índice de búsqueda se construye la primera vez que se usa y
+        desde entonces se mantiene como un listener más.
+        """
+        if self._search_index is None:
+            with self._lock:
+                if self._search_index is None:
+                    self._search_index = ProductSearchIndex(self)
+                    self.listeners.append(self._search_index)
+        return self._search_index.search(query, limit)
+
+    def top_products(self, k, by="units", brand=None, category=None):
+        """
+        Devolver los K productos más vendidos, de mayor a menor.
+
+        - by: 'units' (unidades vendidas) o 'revenue' (ingresos netos)
+        - brand / category (opcionales): limitar a una marca o categoría
+
+        Solo se consideran productos con total_sold > 0. El ranking se
+        mantiene en cada venta, así que la consulta cuesta O(K) en vez
+        de ordenar todo el inventario.
+        """
+        if by not in RANKING_METRICS:
+            raise ValueError(f"Unknown ranking metric: {by}")
+
+        if brand is not None:
+            group = ("brand", brand)
+        elif category is not None:
+            group = ("category", category)
+        else:
+            group = None
+
+        with self._lock:
+            if self._rankings is None:
+                self._build_rankings()
+            ranking = self._rankings.get((by, group))
+            if ranking is None:
+                return []
+
+            if brand is not None and category is not None:
+                # Marca y categoría a la vez: se recorre el ranking de la
+                # marca hasta encontrar K productos de esa categoría.
+                product_ids = islice(
+                    (
+                        product_id
+                        for product_id in ranking.iter_desc()
+                        if self._by_id[product_id].category == category
+                    ),
+                    k,
+                )
+            else:
+                product_ids = ranking.top(k)
+
+            return [self._by_id[product_id] for product_id in product_ids]
+
+    # --------------------------------------------------------
+    # Actualizaciones
+    # --------------------------------------------------------
+
+    def next_id(self):
+        """
+        Reservar el siguiente ID de producto.
+        """
+        return self.ids.next_id()
+
+    def record_sale(self, product, quantity, net_amount):
+        """
+        Aplicar una venta a un producto del inventario.
+
+        - reduce el stock
+        - aumenta total_sold y los ingresos netos del producto
+        - mueve el producto en los rankings de top ventas y en el
+          índice de stock bajo; si la venta lo deja en su punto de
+          pedido, avisa a los listeners (on_low_stock)
+
+        No valida el stock: para vender desde varios hilos, comprobarlo
+        y llamar a record_sale con product_lock(id) tomado
+        (ver sales.complete_sale).
+        """
+        product_id = product.id
+        with self.product_lock(product_id):
+            product.stock -= quantity
+            product.total_sold += quantity
+            with self._lock:
+                self._revenue[product_id] = (
+                    self.revenue(product_id) + net_amount
+                )
+                self._rank(product)
+                crossed = self._track_stock(product)
+            if crossed:
+                notify_listeners(self.listeners, "on_low_stock", product)
+
+    def product_lock(self, product_id):
+        """
+        Devolver el lock (reentrante) de un producto.
+
+        Se crea la primera vez que se pide y se conserva aunque el
+        producto se borre, para que todos los hilos usen siempre el
+        mismo lock para el mismo ID.
+        """
+        lock = self._product_locks.get(product_id)
+        if lock is None:
+            with self._lock:
+                lock = self._product_locks.setdefault(
+                    product_id, threading.RLock()
+                )
+        return lock
+
+    def current_stock(self, product):
+        """
+        Devolver el stock actual del producto (llamar con su
+        product_lock tomado para que no cambie antes de vender).
+        """
+        return product.stock
+
+    def transaction(self):
+        """
+        Agrupar varios cambios (por ejemplo, las líneas de un pedido en
+        sales.complete_order).
+
+        En memoria no hay nada que confirmar ni deshacer: quien agrupa
+        valida todo antes de modificar nada. Los listeners que ofrecen
+        transaction() (persistence.Persistence) agrupan sus escrituras
+        en disco mientras dura el bloque.
+        """
+        stack = ExitStack()
+        for listener in self.listeners:
+            group = getattr(listener, "transaction", None)
+            if group is not None:
+                stack.enter_context(group())
+        return stack
+
+    def update(self, product):
+        """
+        Registrar que los campos de un producto cambiaron.
+
+        Debe llamarse después de modificar los campos del producto
+        (por ejemplo en inventory.update_product) para que los índices
+        de marca y categoría reflejen los nuevos valores (y el índice
+        de stock bajo, el nuevo stock o punto de pedido).
+        """
+        product_id = product.id
+        with self._lock:
+            if self._by_id.get(product_id) is not product:
+                raise ValueError(f"Product not in inventory: {product_id}")
+            if self._indexed_keys[product_id] != (
+                product.brand,
+                product.category,
+            ):
+                self._unindex(product_id)
+                self._index(product)
+            crossed = self._track_stock(product)
+        notify_listeners(self.listeners, "on_product_updated", product)
+        if crossed:
+            notify_listeners(self.listeners, "on_low_stock", product)
+
+    def restore_revenue(self, revenues):
+        """
+        Restaurar los ingresos netos por producto (por ejemplo, desde
+        un snapshot) y recolocar los productos en los rankings.
+        """
+        if self._rankings is None:
+            # Sin rankings que recolocar todavía
+            by_id = self._by_id
+            self._revenue.update(
+                (product_id, amount)
+                for product_id, amount in revenues.items()
+                if product_id in by_id
+            )
+            return
+        for product_id, amount in revenues.items():
+            product = self._by_id.get(product_id)
+            if product is None:
+                continue
+            self._revenue[product_id] = amount
+            self._rank(product)
+
+    def _index(self, product):
+        product_id = product.id
+        brand = product.brand
+        category = product.category
+        self._by_brand.setdefault(brand, {})[product_id] = product
+        self._by_category.setdefault(category, {})[product_id] = product
+        self._indexed_keys[product_id] = (brand, category)
+        self._rank(product)
+
+    def _unindex(self, product_id):
+        brand, category = self._indexed_keys.pop(product_id)
+        _discard(self._by_brand, brand, product_id)
+        _discard(self._by_category, category, product_id)
+        self._unrank(product_id, brand, category)
+
+    def _build_rankings(self):
+        """
+        Construir todos los rankings desde cero (con self._lock tomado).
+        """
+        scores = {}
+        for product_id, product in self._by_id.items():
+            if product.total_sold <= 0:
+                continue
+            metrics = {
+                "units": product.total_sold,
+                "revenue": self.revenue(product_id),
+            }
+            groups = _ranking_groups(*self._indexed_keys[product_id])
+            for metric, score in metrics.items():
+                for group in groups:
+                    key = (metric, group)
+                    scores.setdefault(key, {})[product_id] = score
+        self._rankings = {
+            key: Ranking.from_scores(group_scores)
+            for key, group_scores in scores.items()
+        }
+
+    def _rank(self, product):
+        """
+        Insertar o mover un producto vendido en todos sus rankings
+        (si ya se han construido).
+        """
+        if self._rankings is None or product.total_sold <= 0:
+            return
+        product_id = product.id
+        scores = {
+            "units": product.total_sold,
+            "revenue": self.revenue(product_id),
+        }
+        groups = _ranking_groups(product.brand, product.category)
+        for metric, score in scores.items():
+            for group in groups:
+                key = (metric, group)
+                if key not in self._rankings:
+                    self._rankings[key] = Ranking()
+                self._rankings[key].set(product_id, score)
+
+    def _track_stock(self, product):
+        """
+        Mover un producto en el índice de stock bajo. Devuelve True si
+        acaba de llegar a su punto de pedido (antes estaba por encima).
+        """
+        product_id = product.id
+        shortfall = product.reorder_point - product.stock
+        before = self._shortfalls.get(product_id)
+        self._shortfalls[product_id] = shortfall
+        if shortfall >= 0:
+            if shortfall != before:
+                self._low_stock.set(product_id, shortfall)
+        elif before is not None and before >= 0:
+            self._low_stock.remove(product_id)
+        return shortfall >= 0 and before is not None and before < 0
+
+    def _unrank(self, product_id, brand, category):
+        """
+        Quitar un producto de todos sus rankings.
+        """
+        if self._rankings is None:
+            return
+        for metric in RANKING_METRICS:
+            for group in _ranking_groups(brand, category):
+                key = (metric, group)
+                ranking = self._rankings.get(key)
+                if ranking is None:
+                    continue
+                ranking.remove(product_id)
+                if not ranking:
+                    del self._rankings[key]
+
+
+def notify_listeners(listeners, event, *args):
+    """
+    Avisar de un evento a los listeners que lo implementen.
+    """
+    for listener in listeners:
+        handler = getattr(listener, event, None)
+        if handler is not None:
+            handler(*args)
+
+
+def _ranking_groups(brand, category):
+    """
+    Grupos de ranking a los que pertenece un producto.
+    """
+    return (None, ("brand", brand), ("category", category))
+
+
+def _discard(index, key, product_id):
+    """
+    Quitar un producto de un índice secundario y borrar la clave
+    si queda vacía.
+    """
+    bucket = index[key]
+    del bucket[product_id]
+    if not bucket:
+        del index[key]
+
+
+class SalesHistory:
+    """
+    Historial de ventas.
+
+    Se comporta como la lista de ventas original (len, iteración,
+    acceso por posición). Las ventas se guardan en un libro columnar
+    (ledger.SalesLedger) y se leen como vistas de solo lectura con las
+    mismas claves que create_sale_record. Además lleva:
+    - un IdAllocator para que generar el ID de una venta nueva sea O(1);
+    - SalesAggregates actualizados en cada append, para que los
+      reportes no recorran el historial;
+    - rollups por hora, día y mes (rollups.SalesRollups) para los
+      reportes de un periodo (brand_totals_between,
+      income_totals_between);
+    - el registro de clientes (customers.CustomerRegistry) para los
+      reportes por cliente y por tipo de cliente;
+    - la velocidad de venta de cada producto (velocity.SalesVelocity)
+      para el reporte de días de cobertura.
+
+    listeners: objetos avisados de cada venta nueva mediante
+    on_sale_added(sale, applied_to_stock), igual que en Inventory.
+
+    append se serializa con un lock (incluido el aviso a los
+    listeners), así el libro, los agregados y el diario reciben las
+    ventas de todos los hilos en el mismo orden.
+    """
+
+    def __init__(self, sales=None):
+        self.ledger = SalesLedger()
+        self.ids = IdAllocator()
+        self.aggregates = SalesAggregates()
+        self.rollups = SalesRollups(self.ledger)
+        self.customers = CustomerRegistry()
+        self.velocity = SalesVelocity()
+        self.listeners = []
+        self._lock = threading.Lock()
+        # IDs de venta en un set, solo si llegan fuera de orden (si no,
+        # la columna de IDs está ordenada y has_sale usa bisect)
+        self._id_set = None
+
+        for sale in sales or []:
+            self.append(sale)
+
+    @classmethod
+    def from_columns(cls, columns):
+        """
+        Construir un historial a partir de columnas (campo -> lista de
+        valores, con los campos de ledger.NUMERIC_COLUMNS y
+        STRING_COLUMNS), por ejemplo desde un snapshot binario.
+
+        El libro se llena columna a columna y los agregados, rollups,
+        clientes y velocidades se calculan en una sola pasada, sin crear
+        un models.Sale por venta ni avisar a listeners.
+        """
+        history = cls()
+        history.ledger.extend_columns(columns)
+        ids = history.ledger.columns["id"]
+        if ids:
+            history.ids.observe(max(ids))
+            if not all(a < b for a, b in zip(ids, ids[1:])):
+                history._id_set = set(ids)
+
+        timestamps = history.ledger.columns["timestamp"]
+        sales = [
+            _SaleTotals._make(values)
+            for values in zip(*(columns[name] for name in _SaleTotals._fields))
+        ]
+        history.rollups.rebuild(sales)
+        for bucket in history.rollups.buckets["month"].values():
+            history.aggregates.merge(bucket)
+        history.customers.add_many(sales, timestamps)
+        velocity = history.velocity
+        for sale, timestamp in zip(sales, timestamps):
+            velocity.add(sale.product_id, sale.quantity, timestamp)
+        return history
+
+    def __len__(self):
+        return len(self.ledger)
+
+    def __iter__(self):
+        return iter(self.ledger)
+
+    def __getitem__(self, index):
+        return self.ledger[index]
+
+    def append(self, sale, applied_to_stock=True):
+        """
+        Añadir una venta al historial (un diccionario con el formato
+        anterior se convierte a models.Sale).
+
+        - applied_to_stock: False si la venta no descontó stock del
+          inventario (por ejemplo, csv_io.import_sales sin
+          apply_to_stock); se pasa a los listeners para que el diario
+          no la vuelva a aplicar al stock al arrancar.
+        """
+        with self._lock:
+            self._add(Sale.from_dict(sale), applied_to_stock)
+
+    def _add(self, sale, applied_to_stock=True):
+        """
+        Registrar una venta ya convertida (con self._lock tomado).
+        """
+        ids = self.ledger.columns["id"]
+        if self._id_set is not None:
+            self._id_set.add(sale.id)
+        elif ids and sale.id <= ids[-1]:
+            self._id_set = set(ids)
+            self._id_set.add(sale.id)
+        self.ledger.append(sale)
+        self.ids.observe(sale.id)
+        self.aggregates.add(sale)
+        position = len(self.ledger) - 1
+        self.rollups.add(position, sale)
+        timestamp = self.ledger.columns["timestamp"][position]
+        self.customers.add(position, sale, timestamp)
+        self.velocity.add(sale.product_id, sale.quantity, timestamp)
+        notify_listeners(
+            self.listeners, "on_sale_added", sale, applied_to_stock
+        )
+
+    def extend(self, sales):
+        """
+        Añadir varias ventas seguidas (por ejemplo, las líneas de un
+        pedido) tomando el lock una sola vez, así quedan juntas en el
+        historial aunque otros hilos estén vendiendo.
+        """
+        sales = [Sale.from_dict(sale) for sale in sales]
+        with self._lock:
+            for sale in sales:
+                self._add(sale)
+
+    def next_id(self):
+        """
+        Reservar el siguiente ID de venta.
+        """
+        return self.ids.next_id()
+
+    def next_ids(self, count):
+        """
+        Reservar 'count' IDs de venta consecutivos (range).
+        """
+        return self.ids.next_ids(count)
+
+    def has_sale(self, sale_id):
+        """
+        Indicar si ya hay una venta con ese ID. Un ID mayor que el
+        último asignado se descarta en O(1); si no, se busca con bisect
+        en la columna de IDs del libro (O(log n), está ordenada) o en
+        el set de IDs si alguna venta llegó fuera de orden.
+        """
+        if sale_id > self.ids.last_id:
+            return False
+        with self._lock:
+            if self._id_set is not None:
+                return sale_id in self._id_set
+            ids = self.ledger.columns["id"]
+            position = bisect_left(ids, sale_id)
+            return position < len(ids) and ids[position] == sale_id
+
+    def brand_totals(self):
+        """
+        Devolver marca -> {'total_quantity', 'total_net'} (una copia,
+        tomada con el lock: se puede leer mientras se sigue vendiendo).
+        """
+        with self._lock:
+            return {
+                brand: dict(stats)
+                for brand, stats in self.aggregates.brand_stats.items()
+            }
+
+    def income_totals(self):
+        """
+        Devolver 'gross_income', 'total_discounts' y 'net_income' (O(1)).
+        """
+        return self.aggregates.income()
+
+    def brand_totals_between(self, start, end):
+        """
+        Como brand_totals, pero solo con las ventas de
+        start <= timestamp < end (desde los rollups).
+        """
+        with self._lock:
+            return self.rollups.between(start, end).brand_stats
+
+    def income_totals_between(self, start, end):
+        """
+        Como income_totals, pero solo con las ventas de
+        start <= timestamp < end (desde los rollups).
+        """
+        with self._lock:
+            return self.rollups.between(start, end).income()
+
+    def sold_by_product(self):
+        """
+        Devolver id de producto -> unidades vendidas según el historial.
+        """
+        return self.aggregates.sold_by_product
+
+    def find_customer(self, name):
+        """
+        Devolver los totales de un cliente (ver customers.CUSTOMER_FIELDS)
+        o None si no ha comprado nada (O(1)).
+        """
+        with self._lock:
+            return self.customers.find(name)
+
+    def customer_sales(self, customer_id):
+        """
+        Devolver las ventas de un cliente, en el orden en que se
+        registraron (solo se leen sus ventas).
+        """
+        ledger = self.ledger
+        return [ledger[i] for i in self.customers.positions(customer_id)]
+
+    def top_customers(self, k):
+        """
+        Devolver los K clientes con más ingresos netos (sin ordenar
+        todos los clientes).
+        """
+        with self._lock:
+            return self.customers.top(k)
+
+    def customer_type_totals(self):
+        """
+        Devolver tipo de cliente -> totales de sus ventas (una copia,
+        tomada con el lock, como brand_totals).
+        """
+        with self._lock:
+            return {
+                tier: dict(stats)
+                for tier, stats in self.customers.tier_stats.items()
+            }
+
+    def velocity_state(self):
+        """
+        Devolver una copia de las velocidades de venta por producto
+        (velocity.SalesVelocity), para calcular sin bloquear las ventas.
+        """
+        with self._lock:
+            return self.velocity.copy()
+
+    def check_aggregates(self):
+        """
+        Recalcular los agregados desde cero y compararlos con los
+        mantenidos de forma incremental (totales, rollups, clientes y
+        velocidades de venta).
+
+        Devuelve la lista de diferencias (vacía si son consistentes).
+        """
+        recomputed = SalesAggregates.from_sales(self.ledger)
+        problems = self.aggregates.differences(recomputed)
+
+        # Los rollups mensuales, sumados, deben dar el total
+        monthly = SalesAggregates()
+        for bucket in self.rollups.buckets["month"].values():
+            monthly.merge(bucket)
+        problems.extend(
+            f"monthly rollups: {problem}"
+            for problem in monthly.differences(recomputed)
+        )
+
+        problems.extend(
+            f"customers: {problem}"
+            for problem in self.customers.differences(
+                CustomerRegistry.from_sales(self.ledger)
+            )
+        )
+        problems.extend(
+            f"velocity: {problem}"
+            for problem in self.velocity.differences(
+                SalesVelocity.from_sales(self.ledger)
+            )
+        )
+        return problems
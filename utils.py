@@ -3,6 +3,11 @@
 Funciones utilitarias para validación de entradas y ayuda de interfaz.
 """
 
+import sys
+
+# Filas por página en los listados (paginate)
+PAGE_SIZE = 20
+
 
 def input_non_empty_string(prompt):
     """
@@ -79,3 +84,72 @@ def pause():
     Espera que el usuario presione ENTER.
     """
     input("Press ENTER to continue...")
+
+
+def write_lines(lines):
+    """
+    Escribir varias líneas con una sola escritura a la salida estándar
+    (mucho más rápido que un print por línea en terminales y tuberías).
+    """
+    sys.stdout.write("".join(f"{line}\n" for line in lines))
+    sys.stdout.flush()
+
+
+def paginate(
+    items,
+    format_row,
+    header=None,
+    footer=None,
+    page_size=PAGE_SIZE,
+    interactive=True,
+):
+    """
+    Mostrar una secuencia por páginas, una escritura por página.
+
+    - items: secuencia con len() y slicing (lista, store.SalesHistory...);
+      solo se formatean las filas de la página que se muestra.
+    - format_row: función que convierte un elemento en una línea.
+    - header / footer (opcionales): líneas antes y después de las filas.
+    - interactive: si es False solo se muestra la primera página.
+
+    Si todo cabe en una página se muestra sin preguntar nada. Si no,
+    se pide: ENTER (siguiente), p (anterior), un número de página o
+    q (terminar).
+    """
+    total = len(items)
+    pages = max(1, -(-total // page_size))
+    page = 0
+
+    while True:
+        start = page * page_size
+        rows = items[start:start + page_size]
+        lines = [] if header is None else [header]
+        lines.extend(format_row(row) for row in rows)
+        if pages > 1:
+            lines.append(
+                f"Page {page + 1}/{pages} | "
+                f"Rows {start + 1}-{start + len(rows)} of {total}"
+            )
+        if footer is not None:
+            lines.append(footer)
+        write_lines(lines)
+
+        if pages == 1:
+            return
+        if not interactive:
+            print("(Showing the first page only.)\n")
+            return
+
+        command = input(
+            "ENTER next page, 'p' previous, page number, 'q' to stop: "
+        ).strip().lower()
+        if command == "q":
+            return
+        if command == "p":
+            page = max(0, page - 1)
+        elif command.isdigit():
+            page = min(max(int(command), 1), pages) - 1
+        elif page == pages - 1:
+            return
+        else:
+            page += 1
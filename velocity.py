@@ -0,0 +1,305 @@
+"""
+Velocidad de venta por producto y días de cobertura del stock.
+
+El turnover del reporte de rendimiento (total_sold / (total_sold +
+stock)) no tiene en cuenta el tiempo: un producto que vendió 100
+unidades hace un año y otro que las vendió ayer dan lo mismo.
+Aquí la velocidad de venta (unidades por día) es una media móvil
+exponencial en el tiempo: cada venta suma quantity / ventana y ese
+aporte se va reduciendo con exp(-edad / ventana). Con ventas
+constantes de r unidades al día la media vale r; una venta de hace
+varias ventanas ya casi no cuenta. Se calculan varias ventanas a la
+vez (VELOCITY_WINDOWS, en días).
+
+SalesVelocity se actualiza con cada venta registrada (coste O(1), sin
+volver a leer el historial) y guarda su estado en columnas
+(array.array): por producto, la velocidad de cada ventana en el
+instante de su última venta. Para consultar en otro instante basta con
+reducirla por el tiempo transcurrido, así que forecast calcula la
+velocidad y los días de cobertura (stock / velocidad) de todo el
+catálogo de una vez con NumPy (opcional; sin NumPy, con un bucle).
+"""
+
+import heapq
+import math
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # NumPy es una dependencia opcional
+    np = None
+
+# Segundos de un día
+DAY = 86400.0
+
+# Ventanas de la velocidad de venta, en días (constante de tiempo de
+# cada media móvil exponencial)
+VELOCITY_WINDOWS = (7, 30)
+
+# Ventana con la que se proyectan los días de cobertura (la más corta
+# reacciona antes a un cambio de ritmo)
+COVER_WINDOW = VELOCITY_WINDOWS[0]
+
+
+def add_to_rate(rate, last, quantity, timestamp, window):
+    """
+    Sumar una venta a una velocidad (unidades/día) guardada en el
+    instante 'last' y devolver la nueva velocidad en
+    max(last, timestamp). Una venta anterior a 'last' (importada fuera
+    de orden) entra ya reducida por su edad, así que el resultado no
+    depende del orden de las ventas.
+    """
+    scale = window * DAY
+    if timestamp >= last:
+        rate *= math.exp((last - timestamp) / scale)
+        return rate + quantity / window
+    return rate + quantity / window * math.exp((timestamp - last) / scale)
+
+
+def rate_at(rate, last, when, window):
+    """
+    Velocidad guardada en el instante 'last', vista en 'when'.
+    """
+    return rate * math.exp(min(last - when, 0.0) / (window * DAY))
+
+
+class SalesVelocity:
+    """
+    Velocidad de venta de cada producto vendido, por ventana.
+
+    Columnas (un hueco por producto, en el orden de su primera venta):
+    - ids: id de producto
+    - last: timestamp de su venta más reciente
+    - rates: una columna por ventana (windows) con la velocidad en
+      unidades/día en el instante 'last'
+    """
+
+    def __init__(self, windows=VELOCITY_WINDOWS):
+        self.windows = tuple(windows)
+        self.ids = array("q")
+        self.last = array("d")
+        self.rates = [array("d") for _ in self.windows]
+        self._slots = {}
+
+    @classmethod
+    def from_sales(cls, sales, windows=VELOCITY_WINDOWS):
+        """
+        Recalcular las velocidades desde cero recorriendo las ventas.
+        """
+        velocity = cls(windows)
+        for sale in sales:
+            velocity.add(sale.product_id, sale.quantity, sale.timestamp)
+        return velocity
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, product_id, quantity, timestamp):
+        """
+        Sumar una venta de 'quantity' unidades hecha en 'timestamp'.
+        """
+        slot = self._slots.get(product_id)
+        if slot is None:
+            slot = self._slots[product_id] = len(self.ids)
+            self.ids.append(product_id)
+            self.last.append(timestamp)
+            for rates in self.rates:
+                rates.append(0.0)
+        last = self.last[slot]
+        for rates, window in zip(self.rates, self.windows):
+            rates[slot] = add_to_rate(
+                rates[slot], last, quantity, timestamp, window
+            )
+        if timestamp > last:
+            self.last[slot] = timestamp
+
+    def set(self, product_id, last, rates):
+        """
+        Fijar el estado guardado de un producto (por ejemplo, leído de
+        la tabla product_velocity de sqlite_store).
+        """
+        slot = self._slots.get(product_id)
+        if slot is None:
+            slot = self._slots[product_id] = len(self.ids)
+            self.ids.append(product_id)
+            self.last.append(last)
+            for column, rate in zip(self.rates, rates):
+                column.append(rate)
+            return
+        self.last[slot] = last
+        for column, rate in zip(self.rates, rates):
+            column[slot] = rate
+
+    def rates_at(self, product_id, when):
+        """
+        Devolver la velocidad (unidades/día) de cada ventana en 'when';
+        ceros si el producto no se ha vendido nunca.
+        """
+        slot = self._slots.get(product_id)
+        if slot is None:
+            return tuple(0.0 for _ in self.windows)
+        last = self.last[slot]
+        return tuple(
+            rate_at(rates[slot], last, when, window)
+            for rates, window in zip(self.rates, self.windows)
+        )
+
+    def copy(self):
+        """
+        Copia independiente (para calcular sin bloquear las ventas).
+        """
+        velocity = type(self)(self.windows)
+        velocity.ids = array("q", self.ids)
+        velocity.last = array("d", self.last)
+        velocity.rates = [array("d", rates) for rates in self.rates]
+        velocity._slots = dict(self._slots)
+        return velocity
+
+    def differences(self, other):
+        """
+        Comparar con otras velocidades (por ejemplo, recalculadas desde
+        cero) y devolver la lista de diferencias.
+        """
+        problems = []
+        if self.windows != other.windows:
+            return [f"windows: {self.windows} != {other.windows}"]
+        for product_id in self._slots.keys() | other._slots.keys():
+            slot = self._slots.get(product_id)
+            theirs = other._slots.get(product_id)
+            if slot is None or theirs is None:
+                problems.append(f"product {product_id}: missing velocity")
+                continue
+            mine = [self.last[slot]] + [r[slot] for r in self.rates]
+            reference = [other.last[theirs]] + [
+                r[theirs] for r in other.rates
+            ]
+            if not all(
+                math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-9)
+                for a, b in zip(mine, reference)
+            ):
+                problems.append(
+                    f"product {product_id}: velocity {mine} != {reference}"
+                )
+        return problems
+
+
+def forecast(velocity, product_ids, stocks, when):
+    """
+    Calcular la velocidad de venta y los días de cobertura de una lista
+    de productos en el instante 'when'.
+
+    - velocity: SalesVelocity
+    - product_ids / stocks: secuencias alineadas (array.array, listas
+      o arrays de NumPy), por ejemplo de inventory.stock_levels()
+
+    Devuelve un diccionario con:
+    - 'velocity': ventana -> velocidades (unidades/día) por producto
+    - 'days_of_cover': stock / velocidad de COVER_WINDOW por producto
+      (infinito si no hay ventas recientes)
+
+    Con NumPy son arrays y el cálculo se hace de una vez para todo el
+    catálogo; sin NumPy, listas.
+    """
+    if np is None:
+        return _forecast_python(velocity, product_ids, stocks, when)
+
+    product_ids = np.asarray(product_ids, dtype=np.int64)
+    stocks = np.asarray(stocks, dtype=np.float64)
+    count = len(product_ids)
+    found = np.zeros(count, dtype=bool)
+    slots = np.zeros(count, dtype=np.int64)
+    if len(velocity) and count:
+        slots, found = _find_slots(
+            np.frombuffer(velocity.ids, dtype=np.int64), product_ids
+        )
+
+    ages = np.zeros(count)
+    if found.any():
+        last = np.frombuffer(velocity.last, dtype=np.float64)[slots]
+        ages = np.where(found, np.maximum(when - last, 0.0), 0.0)
+    rates = {}
+    for column, window in zip(velocity.rates, velocity.windows):
+        values = np.zeros(count)
+        if found.any():
+            stored = np.frombuffer(column, dtype=np.float64)[slots]
+            values = np.where(
+                found, stored * np.exp(-ages / (window * DAY)), 0.0
+            )
+        rates[window] = values
+
+    current = rates[COVER_WINDOW]
+    cover = np.full(count, np.inf)
+    np.divide(stocks, current, out=cover, where=current > 0)
+    return {"velocity": rates, "days_of_cover": cover}
+
+
+def _find_slots(sold_ids, product_ids):
+    """
+    Devolver (huecos, encontrado) de cada producto en las columnas de
+    SalesVelocity. Con IDs densos (los que entrega store.IdAllocator)
+    se usa una tabla id -> hueco; si no, una búsqueda binaria.
+    """
+    largest = max(int(sold_ids.max()), int(product_ids.max()))
+    smallest = min(int(sold_ids.min()), int(product_ids.min()))
+    if smallest >= 0 and largest < 4 * (len(sold_ids) + len(product_ids)):
+        table = np.full(largest + 1, -1, dtype=np.int64)
+        table[sold_ids] = np.arange(len(sold_ids))
+        slots = table[product_ids]
+        found = slots >= 0
+        return np.maximum(slots, 0), found
+
+    order = np.argsort(sold_ids, kind="stable")
+    positions = np.searchsorted(sold_ids[order], product_ids)
+    slots = order[np.minimum(positions, len(sold_ids) - 1)]
+    return slots, sold_ids[slots] == product_ids
+
+
+def _forecast_python(velocity, product_ids, stocks, when):
+    """
+    forecast sin NumPy: un bucle por producto.
+    """
+    rates = {window: [] for window in velocity.windows}
+    cover = []
+    for product_id, stock in zip(product_ids, stocks):
+        current = velocity.rates_at(product_id, when)
+        for window, rate in zip(velocity.windows, current):
+            rates[window].append(rate)
+        rate = current[velocity.windows.index(COVER_WINDOW)]
+        cover.append(stock / rate if rate > 0 else math.inf)
+    return {"velocity": rates, "days_of_cover": cover}
+
+
+def lowest_cover(days_of_cover, k):
+    """
+    Devolver las posiciones de los K productos con menos días de
+    cobertura (los que antes se quedarán sin stock), de menos a más.
+    Los productos sin ventas recientes (cobertura infinita) no cuentan.
+    """
+    if k <= 0:
+        return []
+    if np is None:
+        finite = (
+            (cover, index)
+            for index, cover in enumerate(days_of_cover)
+            if cover != math.inf
+        )
+        return [index for _, index in heapq.nsmallest(k, finite)]
+
+    cover = np.asarray(days_of_cover)
+    candidates = np.flatnonzero(np.isfinite(cover))
+    if len(candidates) > k:
+        # Solo se ordenan los K menores, no todo el catálogo
+        nearest = np.argpartition(cover[candidates], k - 1)[:k]
+        candidates = candidates[nearest]
+    order = np.lexsort((candidates, cover[candidates]))
+    return candidates[order].tolist()
+
+
+def count_within(days_of_cover, days):
+    """
+    Contar los productos que se quedarán sin stock en 'days' días o
+    menos.
+    """
+    if np is None:
+        return sum(1 for cover in days_of_cover if cover <= days)
+    return int(np.count_nonzero(np.asarray(days_of_cover) <= days))